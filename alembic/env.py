@@ -11,7 +11,10 @@ from alembic import context
 
 config = context.config
 
-if config.config_file_name is not None:
+# app.cli.migrate настраивает логирование сам и передаёт своё соединение
+if config.config_file_name is not None and config.attributes.get(
+    "configure_logger", True
+):
     fileConfig(config.config_file_name)
 
 from app.db.base import Base
@@ -23,7 +26,8 @@ target_metadata = Base.metadata
 # Alembic не умеет работать с синхронными движками
 config.set_main_option(
     "sqlalchemy.url", 
-    f'postgresql+psycopg2://{se.db_user}:{se.db_pass}@{se.db_host}:{se.db_port}/{se.db_name}'
+    # Напрямую в PostgreSQL, даже если DB_HOST указывает на PgBouncer
+    f'postgresql+psycopg2://{se.db_user}:{se.db_pass}@{se.db_direct_host or se.db_host}:{se.db_direct_port or se.db_port}/{se.db_name}'
     )
 
 def run_migrations_offline() -> None:
@@ -57,6 +61,14 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Соединение app.cli.migrate, на котором уже взят advisory lock
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
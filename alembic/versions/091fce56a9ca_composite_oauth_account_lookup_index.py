@@ -0,0 +1,38 @@
+"""composite oauth account lookup index
+
+Revision ID: 091fce56a9ca
+Revises: 6a4f3cd19c8f
+Create Date: 2026-10-19 12:24:53.807115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.db.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '091fce56a9ca'
+down_revision: Union[str, Sequence[str], None] = '6a4f3cd19c8f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_concurrently(
+        'ix_oauth_account_provider_live', 'oauth_account', ['oauth_name', 'account_id'],
+        unique=True,
+        include=['user_id'],
+        where='deleted_at IS NULL',
+    )
+    drop_index_concurrently(op.f('ix_oauth_account_oauth_name'), 'oauth_account')
+    drop_index_concurrently(op.f('ix_oauth_account_account_id'), 'oauth_account')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    create_index_concurrently(op.f('ix_oauth_account_account_id'), 'oauth_account', ['account_id'])
+    create_index_concurrently(op.f('ix_oauth_account_oauth_name'), 'oauth_account', ['oauth_name'])
+    drop_index_concurrently('ix_oauth_account_provider_live', 'oauth_account')
@@ -0,0 +1,51 @@
+"""auth events partitioned log
+
+Revision ID: 5c2e8f1a9b47
+Revises: e41b9d2c7a53
+Create Date: 2026-10-19 16:24:51.903114
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.crud.audit import create_default_partition, create_partition, months_from
+from config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8f1a9b47'
+down_revision: Union[str, Sequence[str], None] = 'e41b9d2c7a53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('auth_events',
+    sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('event', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('email', sa.String(length=320), nullable=True),
+    sa.Column('ip', postgresql.INET(), nullable=True),
+    sa.Column('user_agent', sa.String(length=512), nullable=True),
+    sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    # Индекс на родителе создаётся и на каждой новой секции
+    op.create_index('ix_auth_events_user_id_created_at', 'auth_events', ['user_id', 'created_at'], unique=False)
+    # Дальнейшие секции создаёт python -m app.cli.audit_partitions
+    op.execute(create_default_partition())
+    for start in months_from(datetime.now(timezone.utc), settings.audit_partitions_ahead + 1):
+        op.execute(create_partition(start))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Секции удаляются вместе с родительской таблицей
+    op.drop_table('auth_events')
@@ -0,0 +1,97 @@
+"""partial indexes and archive tables
+
+Revision ID: 6a4f3cd19c8f
+Revises: 7b53e251353e
+Create Date: 2026-10-19 11:02:17.504861
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a4f3cd19c8f'
+down_revision: Union[str, Sequence[str], None] = '7b53e251353e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SOFT_DELETE_TABLES = ('user', 'oauth_account', 'refresh_tokens')
+
+
+def _audit_columns() -> list[sa.Column]:
+    return [
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Полные индексы по deleted_at заменяем частичными: живые строки
+    # в них не попадают, индекс содержит только кандидатов в архив.
+    for table in SOFT_DELETE_TABLES:
+        op.drop_index(op.f(f'ix_{table}_deleted_at'), table_name=table)
+        op.create_index(
+            f'ix_{table}_deleted_at', table, ['deleted_at'], unique=False,
+            postgresql_where=sa.text('deleted_at IS NOT NULL'),
+        )
+
+    # Уникальность email — только среди живых пользователей и без учёта регистра.
+    # Старый индекс удаляется после сборки нового, чтобы уникальность не
+    # пропадала; адреса, различающиеся только регистром, остановят миграцию
+    create_index_concurrently(
+        'ix_user_email_lower_live', 'user', [sa.text('lower(email)')], unique=True,
+        where='deleted_at IS NULL',
+    )
+    drop_index_concurrently(op.f('ix_user_email'), 'user')
+
+    op.create_table('user_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('email', sa.String(length=320), nullable=False),
+    sa.Column('hashed_password', sa.String(length=1024), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('is_superuser', sa.Boolean(), nullable=False),
+    sa.Column('is_verified', sa.Boolean(), nullable=False),
+    *_audit_columns(),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('oauth_account_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('oauth_name', sa.String(length=100), nullable=False),
+    sa.Column('access_token', sa.String(length=1024), nullable=False),
+    sa.Column('expires_at', sa.Integer(), nullable=True),
+    sa.Column('refresh_token', sa.String(length=1024), nullable=True),
+    sa.Column('account_id', sa.String(length=320), nullable=False),
+    sa.Column('account_email', sa.String(length=320), nullable=False),
+    *_audit_columns(),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('refresh_tokens_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('token', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    *_audit_columns(),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('refresh_tokens_archive')
+    op.drop_table('oauth_account_archive')
+    op.drop_table('user_archive')
+
+    create_index_concurrently(op.f('ix_user_email'), 'user', ['email'], unique=True)
+    drop_index_concurrently('ix_user_email_lower_live', 'user')
+
+    for table in SOFT_DELETE_TABLES:
+        op.drop_index(f'ix_{table}_deleted_at', table_name=table)
+        op.create_index(op.f(f'ix_{table}_deleted_at'), table, ['deleted_at'], unique=False)
@@ -0,0 +1,28 @@
+"""add user created_at id index
+
+Revision ID: 7b53e251353e
+Revises: cb17001d6de5
+Create Date: 2026-10-19 10:12:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b53e251353e'
+down_revision: Union[str, Sequence[str], None] = 'cb17001d6de5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_user_created_at_id', 'user', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_created_at_id', table_name='user')
@@ -0,0 +1,44 @@
+"""refresh token session_started_at
+
+Revision ID: 7de6c037d936
+Revises: 091fce56a9ca
+Create Date: 2026-10-19 13:41:08.218305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import DDL_LOCK_TIMEOUT, add_column, backfill, set_not_null
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7de6c037d936'
+down_revision: Union[str, Sequence[str], None] = '091fce56a9ca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # refresh_tokens — самая нагруженная на запись таблица: один UPDATE всех
+    # строк в транзакции миграции держал бы блокировки до её конца. Колонка
+    # добавляется nullable, default ставится отдельно (только каталог, новые
+    # строки старой версии приложения получают now()), существующие строки
+    # заполняются пачками, NOT NULL — через проверенный CHECK
+    for table in ('refresh_tokens', 'refresh_tokens_archive'):
+        add_column(table, sa.Column('session_started_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(f"SET lock_timeout = '{DDL_LOCK_TIMEOUT}'")
+    op.alter_column('refresh_tokens', 'session_started_at', server_default=sa.text('now()'))
+    op.execute('RESET lock_timeout')
+    for table in ('refresh_tokens', 'refresh_tokens_archive'):
+        # Для выданных токенов начало сессии неизвестно: считаем им момент выдачи
+        backfill(table, 'session_started_at', 'created_at')
+        set_not_null(table, 'session_started_at')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('refresh_tokens_archive', 'session_started_at')
+    op.drop_column('refresh_tokens', 'session_started_at')
@@ -0,0 +1,36 @@
+"""user last_login_at and last_seen_at
+
+Revision ID: e41b9d2c7a53
+Revises: 7de6c037d936
+Create Date: 2026-10-19 15:02:37.481920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import add_column
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41b9d2c7a53'
+down_revision: Union[str, Sequence[str], None] = '7de6c037d936'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable без значения по умолчанию: только изменение каталога, без
+    # перезаписи таблицы. Архив повторяет колонки user для app.cli.archive
+    for table in ('user', 'user_archive'):
+        add_column(table, sa.Column('last_login_at', sa.DateTime(timezone=True), nullable=True))
+        add_column(table, sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('user_archive', 'user'):
+        op.drop_column(table, 'last_seen_at')
+        op.drop_column(table, 'last_login_at')
@@ -0,0 +1,76 @@
+"""
+Перенос мягко удалённых строк в архивные таблицы.
+
+Строки, удалённые раньше, чем SOFT_DELETE_RETENTION_DAYS дней назад,
+переносятся пачками, каждая в своей короткой транзакции.
+
+    python -m app.cli.archive [--retention-days N] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+import logging
+import logging.config
+from datetime import datetime, timedelta, timezone
+
+from app.crud.archive import ARCHIVED_TABLES, archive_rows_batch, archive_users_batch
+from app.db.database import AsyncSessionLocal, engine
+from app.utils.logging import LOGGING_CONFIG
+from app.utils.progress import Progress
+from config import settings
+
+logger = logging.getLogger("users.archive")
+
+
+async def _drain(label: str, run_batch, pause: float) -> int:
+    progress = Progress(f"Архив {label}", logger)
+    while True:
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                moved = await run_batch(session)
+        if not moved:
+            break
+        progress.advance(moved)
+        await asyncio.sleep(pause)
+    progress.finish()
+    return progress.done
+
+
+async def archive(retention_days: int, batch_size: int, pause: float) -> None:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    logger.info("Архивация строк, удалённых до %s", cutoff.isoformat())
+    try:
+        await _drain(
+            "user",
+            lambda session: archive_users_batch(session, cutoff, batch_size),
+            pause,
+        )
+        for name, (table, archive_table) in ARCHIVED_TABLES.items():
+            await _drain(
+                name,
+                lambda session, t=table, a=archive_table: archive_rows_batch(
+                    session, t, a, cutoff, batch_size
+                ),
+                pause,
+            )
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli.archive")
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.soft_delete_retention_days
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    parser.add_argument(
+        "--pause", type=float, default=0.1, help="пауза между пачками, с"
+    )
+    args = parser.parse_args(argv)
+
+    logging.config.dictConfig(LOGGING_CONFIG)
+    asyncio.run(archive(args.retention_days, args.batch_size, args.pause))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Обслуживание секций журнала auth_events.
+
+Создаёт месячные секции на текущий и ``--ahead`` следующих месяцев и
+удаляет секции, все события которых старше ``--retention-days`` дней:
+DROP секции вместо DELETE не оставляет мёртвых строк для VACUUM.
+События, попавшие в DEFAULT-секцию, пока секции их месяца не было,
+переносятся в созданную секцию.
+
+    python -m app.cli.audit_partitions [--ahead N] [--retention-days N]
+"""
+
+import argparse
+import asyncio
+import logging
+import logging.config
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.crud.audit import (
+    DEFAULT_PARTITION,
+    attach_default_partition,
+    create_default_partition,
+    create_partition,
+    default_has_rows,
+    delete_expired_default_rows,
+    detach_default_partition,
+    expired_partitions,
+    months_from,
+    move_from_default,
+    partition_name,
+    select_partitions,
+)
+from app.db.database import engine
+from app.db.migrations import DDL_LOCK_TIMEOUT
+from app.utils.logging import LOGGING_CONFIG
+from config import settings
+
+logger = logging.getLogger("users.audit")
+
+
+async def _set_lock_timeout(connection: AsyncConnection) -> None:
+    # DDL над секцией берёт блокировку родителя: не стоим в очереди
+    # за долгими запросами, а падаем и повторяем при следующем запуске
+    await connection.execute(text(f"SET LOCAL lock_timeout = '{DDL_LOCK_TIMEOUT}'"))
+
+
+async def create_partitions(engine: AsyncEngine, starts: list[datetime]) -> None:
+    """
+    Создаёт недостающие месячные секции.
+
+    Если обслуживание отставало и события месяца уже легли в DEFAULT-секцию,
+    CREATE ... PARTITION OF упал бы на них. Тогда DEFAULT-секция отсоединяется,
+    создаются секции, события переносятся и секция подключается обратно —
+    в одной транзакции, запись в auth_events ждёт её окончания.
+    """
+    async with engine.begin() as connection:
+        await _set_lock_timeout(connection)
+        await connection.execute(create_default_partition())
+        existing = set((await connection.execute(select_partitions)).scalars())
+        missing = [start for start in starts if partition_name(start) not in existing]
+        stranded = [
+            start
+            for start in missing
+            if (await connection.execute(default_has_rows(start))).scalar()
+        ]
+        if stranded:
+            await connection.execute(detach_default_partition())
+        for start in missing:
+            await connection.execute(create_partition(start))
+            if start in stranded:
+                moved = await connection.execute(move_from_default(start))
+                logger.warning(
+                    "Секция %s создана с опозданием: перенесено %s событий из %s",
+                    partition_name(start),
+                    moved.rowcount,
+                    DEFAULT_PARTITION,
+                )
+            else:
+                logger.info("Секция %s создана", partition_name(start))
+        if stranded:
+            await connection.execute(attach_default_partition())
+
+
+async def drop_expired(engine: AsyncEngine, cutoff: datetime) -> list[str]:
+    """Удаляет секции старше ``cutoff``; возвращает их имена."""
+    async with engine.begin() as connection:
+        await _set_lock_timeout(connection)
+        names = (await connection.execute(select_partitions)).scalars()
+        expired = expired_partitions(names, cutoff)
+        for name in expired:
+            await connection.execute(text(f"DROP TABLE {name}"))
+            logger.info("Секция %s старше %s удалена", name, cutoff.date())
+        await connection.execute(delete_expired_default_rows(cutoff))
+    return expired
+
+
+async def maintain(
+    engine: AsyncEngine, ahead: int, retention_days: int, now: datetime | None = None
+) -> list[str]:
+    """
+    Возвращает имена удалённых секций.
+
+    Создание и удаление секций — отдельные транзакции: удаление по сроку
+    хранения выполняется, даже если создать секции не удалось.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=retention_days)
+    try:
+        await create_partitions(engine, months_from(now, ahead + 1))
+    except DBAPIError:
+        await drop_expired(engine, cutoff)
+        raise
+    return await drop_expired(engine, cutoff)
+
+
+async def run(ahead: int, retention_days: int) -> None:
+    try:
+        await maintain(engine, ahead, retention_days)
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli.audit_partitions")
+    parser.add_argument("--ahead", type=int, default=settings.audit_partitions_ahead)
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.audit_retention_days
+    )
+    args = parser.parse_args(argv)
+
+    logging.config.dictConfig(LOGGING_CONFIG)
+    asyncio.run(run(args.ahead, args.retention_days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Сборка базы утёкших паролей для app.services.breached.
+
+Вход — текстовый дамп SHA-1, отсортированный по хэшу: строки
+``HEX40`` или ``HEX40:count`` (формат Have I Been Pwned). Файл читается
+потоком, память не зависит от размера дампа. Неотсортированный дамп
+сначала сортируется: ``LC_ALL=C sort -o sorted.txt dump.txt``.
+
+    python -m app.cli.breached_passwords pwned-passwords-sha1.txt breached.bin
+    python -m app.cli.breached_passwords - breached.bin --min-count 10 < dump.txt
+"""
+
+import argparse
+import logging
+import logging.config
+import os
+import sys
+from typing import IO, Iterable, Iterator
+
+from app.services.breached import (
+    DEFAULT_RECORD_SIZE,
+    FANOUT,
+    FANOUT_SIZE,
+    HEADER,
+    MAGIC,
+    PREFIX_BYTES,
+    RECORDS_START,
+    VERSION,
+)
+from app.utils.logging import LOGGING_CONFIG
+from app.utils.progress import Progress
+
+logger = logging.getLogger("users.passwords")
+
+PROGRESS_EVERY = 10_000_000
+
+
+class UnsortedInput(ValueError):
+    pass
+
+
+def parse_lines(lines: Iterable[str], min_count: int = 0) -> Iterator[bytes]:
+    """SHA-1 из строк дампа; пустые строки и строки реже ``min_count`` пропускаются."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        hex_digest, _, count = line.partition(":")
+        if min_count and count and int(count) < min_count:
+            continue
+        try:
+            digest = bytes.fromhex(hex_digest)
+        except ValueError:
+            raise ValueError(f"строка {number}: не SHA-1 в hex: {line[:60]!r}")
+        if len(digest) != 20:
+            raise ValueError(f"строка {number}: не SHA-1 в hex: {line[:60]!r}")
+        yield digest
+
+
+def build(
+    digests: Iterable[bytes], output: IO[bytes], record_size: int = DEFAULT_RECORD_SIZE
+) -> int:
+    """
+    Пишет базу в ``output`` (файл с произвольным доступом); возвращает число записей.
+
+    Записи пишутся сразу за местом под заголовок и таблицу префиксов, которые
+    дописываются в конце, когда известны границы корзин.
+    """
+    if not 1 <= record_size <= 20 - PREFIX_BYTES:
+        raise ValueError(f"длина записи от 1 до {20 - PREFIX_BYTES} байт")
+
+    fanout = [0] * (FANOUT_SIZE + 1)
+    output.seek(RECORDS_START)
+    progress = Progress("База утёкших паролей", logger)
+    previous = b""
+    count = 0
+    for digest in digests:
+        key = digest[: PREFIX_BYTES + record_size]
+        if key < previous:
+            raise UnsortedInput(
+                f"хэш {digest.hex().upper()} после {previous.hex().upper()}: "
+                "дамп должен быть отсортирован"
+            )
+        if key == previous:
+            # Повтор или совпадение усечённых хэшей
+            continue
+        previous = key
+        fanout[int.from_bytes(key[:PREFIX_BYTES], "big") + 1] += 1
+        output.write(key[PREFIX_BYTES:])
+        count += 1
+        if count % PROGRESS_EVERY == 0:
+            progress.advance(PROGRESS_EVERY)
+    if count % PROGRESS_EVERY:
+        progress.advance(count % PROGRESS_EVERY)
+    progress.finish()
+
+    # Число записей в корзинах -> номер первой записи каждой корзины
+    for prefix in range(1, FANOUT_SIZE + 1):
+        fanout[prefix] += fanout[prefix - 1]
+    output.seek(0)
+    output.write(HEADER.pack(MAGIC, VERSION, PREFIX_BYTES, record_size, 0, count))
+    output.write(FANOUT.pack(*fanout))
+    return count
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli.breached_passwords")
+    parser.add_argument("input", help="дамп SHA-1 или - для stdin")
+    parser.add_argument("output", help="файл базы (BREACHED_PASSWORDS_PATH)")
+    parser.add_argument(
+        "--record-size",
+        type=int,
+        default=DEFAULT_RECORD_SIZE,
+        help="байт SHA-1 на запись после двухбайтового префикса",
+    )
+    parser.add_argument(
+        "--min-count", type=int, default=0, help="пропускать пароли с меньшим числом утечек"
+    )
+    args = parser.parse_args(argv)
+
+    logging.config.dictConfig(LOGGING_CONFIG)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="ascii")
+    # Пишем во временный файл: работающие воркеры держат mmap старой базы
+    partial = f"{args.output}.partial"
+    try:
+        with source, open(partial, "wb") as output:
+            count = build(parse_lines(source, args.min_count), output, args.record_size)
+        os.replace(partial, args.output)
+    except (ValueError, OSError) as exc:
+        if os.path.exists(partial):
+            os.remove(partial)
+        sys.exit(f"Ошибка: {exc}")
+    logger.info("Записано %s хэшей в %s", count, args.output)
+
+
+if __name__ == "__main__":
+    main()
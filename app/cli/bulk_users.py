@@ -0,0 +1,378 @@
+"""
+Потоковый импорт/экспорт пользователей через COPY.
+
+Импорт не хэширует пароли, не выпускает токены и не шлёт письма:
+принимаются только уже посчитанные хэши (Argon2 или bcrypt).
+
+    python -m app.cli.bulk_users import users.csv
+    python -m app.cli.bulk_users import accounts.ndjson --table oauth_account
+    python -m app.cli.bulk_users export - --format ndjson > users.ndjson
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import logging.config
+import sys
+from datetime import datetime
+from typing import IO, Iterable, Iterator
+
+import asyncpg
+
+from app.db.database import direct_db_url
+from app.utils.logging import LOGGING_CONFIG
+from app.utils.progress import Progress
+
+logger = logging.getLogger("users.bulk")
+
+# Префиксы хэшей, которые понимает PasswordHelper (pwdlib: Argon2 и bcrypt)
+SUPPORTED_HASH_PREFIXES = ("$argon2id$", "$argon2i$", "$argon2d$", "$2a$", "$2b$", "$2y$")
+
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+
+TABLES = {
+    "user": {
+        "staging": """
+            CREATE TEMP TABLE IF NOT EXISTS user_import (
+                email text,
+                hashed_password text,
+                is_active boolean,
+                is_superuser boolean,
+                is_verified boolean
+            ) ON COMMIT DELETE ROWS
+        """,
+        "columns": (
+            "email",
+            "hashed_password",
+            "is_active",
+            "is_superuser",
+            "is_verified",
+        ),
+        "insert": """
+            INSERT INTO "user" (email, hashed_password, is_active, is_superuser, is_verified)
+            SELECT s.email, s.hashed_password, s.is_active, s.is_superuser, s.is_verified
+            FROM user_import s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM "user" u
+                WHERE lower(u.email) = lower(s.email) AND u.deleted_at IS NULL
+            )
+            ON CONFLICT DO NOTHING
+        """,
+        "export": """
+            SELECT id, email, hashed_password, is_active, is_superuser, is_verified,
+                   created_at
+            FROM "user"
+            WHERE deleted_at IS NULL
+            ORDER BY id
+        """,
+    },
+    "oauth_account": {
+        "staging": """
+            CREATE TEMP TABLE IF NOT EXISTS oauth_account_import (
+                email text,
+                oauth_name text,
+                account_id text,
+                account_email text,
+                access_token text,
+                expires_at integer,
+                refresh_token text
+            ) ON COMMIT DELETE ROWS
+        """,
+        "columns": (
+            "email",
+            "oauth_name",
+            "account_id",
+            "account_email",
+            "access_token",
+            "expires_at",
+            "refresh_token",
+        ),
+        "insert": """
+            INSERT INTO oauth_account (
+                user_id, oauth_name, account_id, account_email,
+                access_token, expires_at, refresh_token
+            )
+            SELECT u.id, s.oauth_name, s.account_id, s.account_email,
+                   s.access_token, s.expires_at, s.refresh_token
+            FROM oauth_account_import s
+            JOIN "user" u
+              ON lower(u.email) = lower(s.email) AND u.deleted_at IS NULL
+            WHERE NOT EXISTS (
+                SELECT 1 FROM oauth_account o
+                WHERE o.oauth_name = s.oauth_name AND o.account_id = s.account_id
+                  AND o.deleted_at IS NULL
+            )
+            ON CONFLICT DO NOTHING
+        """,
+        "export": """
+            SELECT u.email, o.oauth_name, o.account_id, o.account_email,
+                   o.access_token, o.expires_at, o.refresh_token
+            FROM oauth_account o
+            JOIN "user" u ON u.id = o.user_id
+            WHERE o.deleted_at IS NULL
+            ORDER BY o.id
+        """,
+    },
+}
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def _bool(value, default: bool) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _email(row: dict) -> str:
+    email = (row.get("email") or "").strip()
+    if "@" not in email:
+        raise InvalidRow(f"некорректный email: {email!r}")
+    return email
+
+
+def parse_user(row: dict) -> tuple:
+    hashed_password = (row.get("hashed_password") or "").strip()
+    if not hashed_password.startswith(SUPPORTED_HASH_PREFIXES):
+        raise InvalidRow("неподдерживаемый формат хэша пароля")
+    return (
+        _email(row),
+        hashed_password,
+        _bool(row.get("is_active"), True),
+        _bool(row.get("is_superuser"), False),
+        # Пользователи партнёра уже подтвердили почту у себя
+        _bool(row.get("is_verified"), True),
+    )
+
+
+def parse_oauth_account(row: dict) -> tuple:
+    oauth_name = (row.get("oauth_name") or "").strip()
+    account_id = (row.get("account_id") or "").strip()
+    if not oauth_name or not account_id:
+        raise InvalidRow("нет oauth_name или account_id")
+    email = _email(row)
+    expires_at = row.get("expires_at")
+    return (
+        email,
+        oauth_name,
+        account_id,
+        (row.get("account_email") or email).strip(),
+        row.get("access_token") or "",
+        int(expires_at) if expires_at not in (None, "") else None,
+        row.get("refresh_token") or None,
+    )
+
+
+PARSERS = {"user": parse_user, "oauth_account": parse_oauth_account}
+
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[dict | InvalidRow]:
+    """
+    Строки файла как словари.
+
+    Нечитаемая строка NDJSON приходит как InvalidRow с номером строки:
+    prepare_chunk считает её отброшенной, импорт продолжается.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield InvalidRow(f"строка {number}: некорректный JSON: {exc.msg}")
+            continue
+        if not isinstance(row, dict):
+            yield InvalidRow(f"строка {number}: ожидался объект JSON")
+            continue
+        yield row
+
+
+class CsvRowCounter:
+    """
+    Считает записи CSV в потоке кусков по переводам строк вне кавычек.
+
+    Поле в кавычках может содержать перевод строки; экранированная кавычка
+    ``""`` дважды меняет состояние и не сбивает счёт.
+    """
+
+    def __init__(self):
+        self.quoted = False
+
+    def feed(self, chunk: bytes) -> int:
+        rows = 0
+        for index, part in enumerate(chunk.split(b'"')):
+            if index:
+                self.quoted = not self.quoted
+            if not self.quoted:
+                rows += part.count(b"\n")
+        return rows
+
+
+def chunked(rows: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def prepare_chunk(
+    table: str, rows: list[dict | InvalidRow]
+) -> tuple[list[tuple], int]:
+    """
+    Разбирает строки пачки и убирает дубли по lower(email) внутри неё.
+
+    Для oauth_account ключ дедупликации — пара (oauth_name, account_id).
+    Возвращает записи для COPY и число отброшенных строк.
+    """
+    parse = PARSERS[table]
+    records: dict = {}
+    rejected = 0
+    for row in rows:
+        try:
+            if isinstance(row, InvalidRow):
+                raise row
+            record = parse(row)
+        except (InvalidRow, ValueError) as exc:
+            rejected += 1
+            logger.debug("Строка пропущена: %s", exc)
+            continue
+        key = record[0].lower() if table == "user" else (record[1], record[2])
+        if key in records:
+            rejected += 1
+            continue
+        records[key] = record
+    return list(records.values()), rejected
+
+
+def _dsn() -> str:
+    # Временная таблица живёт в сессии, поэтому соединение прямое, без PgBouncer
+    return direct_db_url.set(drivername="postgresql").render_as_string(
+        hide_password=False
+    )
+
+
+async def import_rows(stream: IO[str], fmt: str, table: str, chunk_size: int) -> None:
+    spec = TABLES[table]
+    staging = f"{table}_import"
+    progress = Progress(f"Импорт {table}", logger)
+    inserted = rejected = 0
+
+    connection = await asyncpg.connect(_dsn())
+    try:
+        await connection.execute(spec["staging"])
+        for rows in chunked(read_rows(stream, fmt), chunk_size):
+            records, chunk_rejected = prepare_chunk(table, rows)
+            rejected += chunk_rejected
+            async with connection.transaction():
+                await connection.copy_records_to_table(
+                    staging, records=records, columns=spec["columns"]
+                )
+                status = await connection.execute(spec["insert"])
+            inserted += int(status.rsplit(" ", 1)[-1])
+            progress.advance(len(rows))
+    finally:
+        await connection.close()
+
+    progress.finish()
+    logger.info(
+        "Добавлено %s, пропущено (дубли/ошибки) %s, уже существовали %s",
+        inserted,
+        rejected,
+        progress.done - rejected - inserted,
+    )
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+async def export_rows(output: IO[bytes], fmt: str, table: str, chunk_size: int) -> None:
+    query = TABLES[table]["export"]
+    progress = Progress(f"Экспорт {table}", logger)
+
+    connection = await asyncpg.connect(_dsn())
+    try:
+        if fmt == "csv":
+            # COPY отдаёт готовый CSV кусками, строки в памяти не собираются
+            rows = CsvRowCounter()
+
+            async def write(chunk: bytes) -> None:
+                output.write(chunk)
+                progress.advance(rows.feed(chunk))
+
+            await connection.copy_from_query(
+                query, output=write, format="csv", header=True
+            )
+            # Заголовок CSV тоже посчитан как строка
+            progress.done -= 1
+        else:
+            async with connection.transaction():
+                buffer = io.StringIO()
+                rows = 0
+                async for record in connection.cursor(query, prefetch=chunk_size):
+                    buffer.write(
+                        json.dumps(dict(record), default=_json_default, ensure_ascii=False)
+                    )
+                    buffer.write("\n")
+                    rows += 1
+                    if rows == chunk_size:
+                        output.write(buffer.getvalue().encode())
+                        buffer = io.StringIO()
+                        progress.advance(rows)
+                        rows = 0
+                output.write(buffer.getvalue().encode())
+                progress.advance(rows)
+    finally:
+        await connection.close()
+        output.flush()
+
+    progress.finish()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli.bulk_users")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command in ("import", "export"):
+        sub = subparsers.add_parser(command)
+        sub.add_argument("path", help="путь к файлу, '-' для stdin/stdout")
+        sub.add_argument("--format", choices=("csv", "ndjson"))
+        sub.add_argument("--table", choices=tuple(TABLES), default="user")
+        sub.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    logging.config.dictConfig(LOGGING_CONFIG)
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    if args.command == "import":
+        stream = (
+            sys.stdin
+            if args.path == "-"
+            else open(args.path, encoding="utf-8", newline="")
+        )
+        with stream:
+            asyncio.run(import_rows(stream, fmt, args.table, args.chunk_size))
+    else:
+        output = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+        with output:
+            asyncio.run(export_rows(output, fmt, args.table, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
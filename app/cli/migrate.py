@@ -0,0 +1,118 @@
+"""
+Применение миграций при старте контейнера.
+
+Если схема уже на head, выходим после одного запроса к alembic_version.
+Иначе берём advisory lock: мигрирует одна реплика, остальные ждут lock,
+перепроверяют версию и стартуют без повторного прогона alembic.
+
+    python -m app.cli.migrate [--config alembic.ini]
+"""
+
+import argparse
+import logging
+import logging.config
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import Connection, Engine, create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.db.database import direct_db_url
+from app.utils.logging import LOGGING_CONFIG
+
+logger = logging.getLogger("users.migrate")
+
+# Ключ pg_advisory_lock, общий для всех реплик сервиса
+MIGRATION_LOCK_KEY = 0x61757468_6D696772  # "auth" "migr"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def is_at_head(connection: Connection, script: ScriptDirectory) -> bool:
+    current = set(MigrationContext.configure(connection).get_current_heads())
+    return current == set(script.get_heads())
+
+
+@contextmanager
+def advisory_lock(connection: Connection, key: int) -> Iterator[float]:
+    """Держит сессионный advisory lock; отдаёт время ожидания в секундах."""
+    start = time.perf_counter()
+    connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+    # Lock сессионный и переживает commit, а соединение возвращается
+    # в состояние без транзакции для alembic
+    connection.commit()
+    try:
+        yield time.perf_counter() - start
+    finally:
+        connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+        connection.commit()
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f} ms"
+
+
+def migrate(engine: Engine, config: Config, lock_key: int = MIGRATION_LOCK_KEY) -> bool:
+    """
+    Доводит схему до head. Возвращает True, если миграции применялись здесь.
+    """
+    started = time.perf_counter()
+    script = ScriptDirectory.from_config(config)
+
+    with engine.connect() as connection:
+        at_head = is_at_head(connection, script)
+        connection.commit()
+        logger.info("Проверка версии схемы: %s", _ms(time.perf_counter() - started))
+        if at_head:
+            logger.info("Схема уже на head, миграции не нужны")
+            return False
+
+        with advisory_lock(connection, lock_key) as waited:
+            logger.info("Ожидание блокировки миграций: %s", _ms(waited))
+            # Пока ждали, миграции могла применить другая реплика
+            if is_at_head(connection, script):
+                connection.commit()
+                logger.info(
+                    "Миграции применены другой репликой, всего %s",
+                    _ms(time.perf_counter() - started),
+                )
+                return False
+            connection.commit()
+
+            upgrade_started = time.perf_counter()
+            config.attributes["connection"] = connection
+            config.attributes["configure_logger"] = False
+            command.upgrade(config, "head")
+            connection.commit()
+            logger.info(
+                "Миграции применены за %s, всего %s",
+                _ms(time.perf_counter() - upgrade_started),
+                _ms(time.perf_counter() - started),
+            )
+    return True
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli.migrate")
+    parser.add_argument("--config", default=os.path.join(BASE_DIR, "alembic.ini"))
+    args = parser.parse_args(argv)
+
+    logging.config.dictConfig(LOGGING_CONFIG)
+    # advisory lock сессионный: только напрямую, не через PgBouncer
+    engine = create_engine(
+        direct_db_url.set(drivername="postgresql+psycopg2"), poolclass=NullPool
+    )
+    try:
+        migrate(engine, Config(args.config))
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from sqlalchemy import Insert, Table, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import (
+    OAuthAccount,
+    OAuthAccountArchive,
+    RefreshToken,
+    RefreshTokenArchive,
+    User,
+    UserArchive,
+)
+
+
+def move_rows(table: Table, archive: Table, *where) -> Insert:
+    """
+    Один запрос: DELETE ... RETURNING из горячей таблицы и INSERT в архив.
+
+    Строки не проходят через приложение и переносятся атомарно.
+    """
+    names = [column.name for column in table.columns]
+    moved = delete(table).where(*where).returning(*table.columns).cte("moved")
+    return insert(archive).from_select(
+        names, select(*(moved.c[name] for name in names))
+    )
+
+
+def select_expired_ids(table: Table, cutoff: datetime, batch_size: int):
+    """Пачка id удалённых раньше cutoff; занятые строки пропускаются."""
+    return (
+        select(table.c.id)
+        .where(table.c.deleted_at < cutoff)
+        .order_by(table.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+
+async def archive_users_batch(
+    session: AsyncSession, cutoff: datetime, batch_size: int
+) -> int:
+    """
+    Переносит пачку удалённых пользователей вместе с их OAuth аккаунтами
+    и refresh токенами. Дочерние строки переносятся первыми, иначе их
+    удалил бы ON DELETE CASCADE, не сохранив в архиве.
+    """
+    user_table = User.__table__
+    ids = list(
+        (await session.execute(select_expired_ids(user_table, cutoff, batch_size)))
+        .scalars()
+    )
+    if not ids:
+        return 0
+    await session.execute(
+        move_rows(
+            OAuthAccount.__table__,
+            OAuthAccountArchive,
+            OAuthAccount.__table__.c.user_id.in_(ids),
+        )
+    )
+    await session.execute(
+        move_rows(
+            RefreshToken.__table__,
+            RefreshTokenArchive,
+            RefreshToken.__table__.c.user_id.in_(ids),
+        )
+    )
+    result = await session.execute(
+        move_rows(user_table, UserArchive, user_table.c.id.in_(ids))
+    )
+    return result.rowcount
+
+
+async def archive_rows_batch(
+    session: AsyncSession,
+    table: Table,
+    archive: Table,
+    cutoff: datetime,
+    batch_size: int,
+) -> int:
+    """Переносит пачку удалённых строк таблицы без дочерних записей."""
+    ids = select_expired_ids(table, cutoff, batch_size).scalar_subquery()
+    result = await session.execute(move_rows(table, archive, table.c.id.in_(ids)))
+    return result.rowcount
+
+
+ARCHIVED_TABLES = {
+    "oauth_account": (OAuthAccount.__table__, OAuthAccountArchive),
+    "refresh_tokens": (RefreshToken.__table__, RefreshTokenArchive),
+}
@@ -0,0 +1,105 @@
+import re
+from datetime import datetime, timezone
+from typing import Iterable
+
+from sqlalchemy import TextClause, text
+
+from app.db.models import AuthEvent
+
+PARENT = AuthEvent.__tablename__
+DEFAULT_PARTITION = f"{PARENT}_default"
+
+_PARTITION_RE = re.compile(rf"^{PARENT}_(\d{{4}})_(\d{{2}})$")
+
+select_partitions = text(
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    "WHERE parent.relname = :parent"
+).bindparams(parent=PARENT)
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(start: datetime) -> datetime:
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def months_from(moment: datetime, count: int) -> list[datetime]:
+    """Начала ``count`` месяцев, начиная с месяца ``moment``."""
+    starts = [month_start(moment)]
+    while len(starts) < count:
+        starts.append(next_month(starts[-1]))
+    return starts
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARENT}_{start:%Y_%m}"
+
+
+def create_partition(start: datetime) -> TextClause:
+    """Месячная секция [start, start + 1 месяц); уже существующая пропускается."""
+    return text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{next_month(start).isoformat()}')"
+    )
+
+
+def create_default_partition() -> TextClause:
+    """
+    Секция для событий вне месячных секций, чтобы запись не падала,
+    если обслуживание секций не запускалось. В норме пуста; если нет,
+    CREATE месячной секции упадёт на строках её месяца — их сначала
+    переносит app.cli.audit_partitions.
+    """
+    return text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT")
+
+
+def default_has_rows(start: datetime) -> TextClause:
+    """Есть ли в DEFAULT-секции события месяца ``start``."""
+    return text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= '{start.isoformat()}' "
+        f"AND created_at < '{next_month(start).isoformat()}')"
+    )
+
+
+def detach_default_partition() -> TextClause:
+    return text(f"ALTER TABLE {PARENT} DETACH PARTITION {DEFAULT_PARTITION}")
+
+
+def attach_default_partition() -> TextClause:
+    return text(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+
+
+def move_from_default(start: datetime) -> TextClause:
+    """Переносит события месяца ``start`` из DEFAULT-секции в месячную."""
+    return text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= '{start.isoformat()}' "
+        f"AND created_at < '{next_month(start).isoformat()}' RETURNING *) "
+        f"INSERT INTO {partition_name(start)} SELECT * FROM moved"
+    )
+
+
+def delete_expired_default_rows(cutoff: datetime) -> TextClause:
+    return text(
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at < '{cutoff.isoformat()}'"
+    )
+
+
+def expired_partitions(names: Iterable[str], cutoff: datetime) -> list[str]:
+    """Месячные секции, все события которых старше ``cutoff``."""
+    expired = []
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match is None:
+            continue
+        start = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+        if next_month(start) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
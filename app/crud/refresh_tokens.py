@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import contains_eager
+
+from app.db.models import RefreshToken, User
+
+
+def select_active_refresh_token(token: str) -> Select:
+    """
+    Действующий refresh token с блокировкой строки, без пользователя.
+
+    Пользователь уже загружен select_refresh_token в той же сессии;
+    selectinload здесь был бы отдельным запросом на каждую ротацию.
+    """
+    return (
+        select(RefreshToken)
+        .where(
+            RefreshToken.token == token,
+            RefreshToken.expires_at > datetime.now(timezone.utc),
+            RefreshToken.deleted_at.is_(None),
+        )
+        .with_for_update()
+    )
+
+
+def select_refresh_token(token: str) -> Select:
+    """
+    Действующий refresh token с пользователем одним запросом, без блокировки.
+
+    Для refresh без ротации: строка только читается. Токены удалённых и
+    деактивированных пользователей не находятся: иначе такой пользователь
+    выпускал бы access токены до конца сессии.
+    """
+    return (
+        select(RefreshToken)
+        .join(RefreshToken.user)
+        .options(contains_eager(RefreshToken.user))
+        .where(
+            RefreshToken.token == token,
+            RefreshToken.expires_at > datetime.now(timezone.utc),
+            RefreshToken.deleted_at.is_(None),
+            User.deleted_at.is_(None),
+            User.is_active.is_(True),
+        )
+    )
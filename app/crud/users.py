@@ -0,0 +1,59 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Literal
+
+from sqlalchemy import Select, select, tuple_
+
+from app.db.models import User
+
+DeletedFilter = Literal["exclude", "include", "only"]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(user: User) -> str:
+    """Курсор — позиция последней строки страницы: (created_at, id)."""
+    raw = f"{user.created_at.isoformat()}|{user.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, user_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def select_users_page(
+    *,
+    after: tuple[datetime, int] | None = None,
+    is_active: bool | None = None,
+    is_verified: bool | None = None,
+    deleted: DeletedFilter = "exclude",
+    limit: int | None = None,
+) -> Select:
+    """
+    Keyset пагинация по (created_at, id).
+
+    Следующая страница начинается строго после курсора, поэтому стоимость
+    запроса не растёт с номером страницы, в отличие от OFFSET.
+    """
+    statement = select(User).order_by(User.created_at, User.id)
+    if after is not None:
+        statement = statement.where(tuple_(User.created_at, User.id) > after)
+    if is_active is not None:
+        statement = statement.where(User.is_active.is_(is_active))
+    if is_verified is not None:
+        statement = statement.where(User.is_verified.is_(is_verified))
+    if deleted == "exclude":
+        statement = statement.where(User.deleted_at.is_(None))
+    elif deleted == "only":
+        statement = statement.where(User.deleted_at.is_not(None))
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
@@ -1,9 +1,13 @@
+from uuid import uuid4
+
 from fastapi import Depends
 
 from fastapi_users.db import (
     SQLAlchemyUserDatabase,
 )
 
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine import URL
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
@@ -19,16 +23,108 @@ db_url = URL.create(
     database=settings.db_name,
 )
 
-engine = create_async_engine(db_url)
+# Прямое соединение с PostgreSQL в обход PgBouncer: миграциям (advisory
+# lock) и bulk-импорту (временные таблицы) нужно состояние сессии
+direct_db_url = db_url.set(
+    host=settings.db_direct_host or settings.db_host,
+    port=settings.db_direct_port or settings.db_port,
+)
+
+
+def _prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid4().hex}__"
+
+
+def engine_options(pgbouncer: bool) -> dict:
+    """
+    Параметры движка приложения.
+
+    За PgBouncer в режиме transaction pooling соседние транзакции одного
+    клиентского соединения попадают на разные серверные, поэтому
+    подготовленные выражения не кэшируются (ни asyncpg, ни SQLAlchemy),
+    а их имена уникальны: иначе ``prepared statement "__asyncpg_stmt_1__"
+    already exists`` на сервере, где его уже создал другой клиент.
+    Состояние сессии (SET, advisory lock, временные таблицы) в приложении
+    не используется.
+    """
+    options = dict(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+    )
+    if pgbouncer:
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": _prepared_statement_name,
+        }
+    return options
+
+
+engine = create_async_engine(db_url, **engine_options(settings.db_pgbouncer))
 AsyncSessionLocal = async_sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
 
 
+class UserDatabase(SQLAlchemyUserDatabase[User, int]):
+    """
+    Адаптер fastapi-users, который видит только живых пользователей.
+
+    Условия совпадают с частичными индексами (WHERE deleted_at IS NULL),
+    поэтому мягко удалённые строки не попадают ни в выборку, ни в индекс.
+    """
+
+    async def get(self, id: int) -> User | None:
+        statement = select(User).where(User.id == id, User.deleted_at.is_(None))
+        return await self._get_user(statement)
+
+    async def get_by_email(self, email: str) -> User | None:
+        statement = select(User).where(
+            func.lower(User.email) == func.lower(email),
+            User.deleted_at.is_(None),
+        )
+        return await self._get_user(statement)
+
+    async def get_by_oauth_account(self, oauth: str, account_id: str) -> User | None:
+        statement = (
+            select(User)
+            .join(OAuthAccount)
+            .where(
+                OAuthAccount.oauth_name == oauth,
+                OAuthAccount.account_id == account_id,
+                OAuthAccount.deleted_at.is_(None),
+                User.deleted_at.is_(None),
+            )
+        )
+        return await self._get_user(statement)
+
+    async def create_if_not_exists(self, create_dict: dict) -> User | None:
+        """
+        Создаёт пользователя одним INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+        Конфликт определяется частичным уникальным индексом по lower(email),
+        поэтому параллельные запросы с одним email не падают с IntegrityError:
+        один получает строку, остальные — None.
+        """
+        statement = (
+            insert(User)
+            .values(**create_dict)
+            .on_conflict_do_nothing(
+                index_elements=[func.lower(User.email)],
+                index_where=User.deleted_at.is_(None),
+            )
+            .returning(User)
+        )
+        result = await self.session.execute(select(User).from_statement(statement))
+        user = result.scalar_one_or_none()
+        await self.session.commit()
+        return user
+
+
 async def get_async_session():
     async with AsyncSessionLocal() as session:
         yield session
 
 
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
-    yield SQLAlchemyUserDatabase(session, User, OAuthAccount)
+    yield UserDatabase(session, User, OAuthAccount)
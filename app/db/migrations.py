@@ -0,0 +1,352 @@
+"""
+Помощники для миграций без простоя на больших таблицах.
+
+Вызываются из ``alembic/versions`` внутри upgrade()/downgrade():
+
+* индексы строятся ``CONCURRENTLY`` вне транзакции миграции;
+* колонка добавляется без значения по умолчанию и заполняется пачками,
+  каждая пачка — отдельная короткая транзакция, с паузой между ними;
+* смена типа: новая колонка + триггер двойной записи + backfill + swap.
+
+Прогресс и оценка оставшегося времени пишутся в лог ``users.migrations``.
+В offline-режиме (``alembic upgrade --sql``) backfill выводится одним UPDATE.
+"""
+
+import logging
+import time
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.utils.progress import Progress
+
+logger = logging.getLogger("users.migrations")
+
+# Сколько DDL ждёт блокировку таблицы, прежде чем сдаться: очередь за
+# ACCESS EXCLUSIVE блокирует и все последующие запросы к таблице
+DDL_LOCK_TIMEOUT = "5s"
+
+
+def _quote(name: str) -> str:
+    return op.get_context().dialect.identifier_preparer.quote(name)
+
+
+def _is_offline() -> bool:
+    return op.get_context().as_sql
+
+
+def _drop_invalid_index(name: str) -> None:
+    """Удаляет недостроенный индекс, оставшийся от прерванного CONCURRENTLY."""
+    if _is_offline():
+        return
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        logger.warning("Индекс %s невалиден после прерванной сборки, пересоздаём", name)
+        op.drop_index(name, postgresql_concurrently=True, if_exists=True)
+
+
+class DuplicateKeys(Exception):
+    """В таблице уже есть строки, нарушающие будущий уникальный индекс."""
+
+
+def _check_unique(
+    name: str, table: str, columns: Sequence[str | sa.TextClause], where: str | None
+) -> None:
+    """
+    Проверяет данные до сборки уникального индекса.
+
+    Упавший на дубликате CONCURRENTLY оставляет невалидный индекс, который
+    замедляет запись, а ошибка называет лишь одну пару. Здесь сразу видны
+    примеры дубликатов; разрешить их нужно вручную (например, мягко удалить
+    лишние строки) и повторить миграцию.
+    """
+    if _is_offline():
+        return
+    key = ", ".join(
+        column.text if isinstance(column, sa.TextClause) else _quote(column)
+        for column in columns
+    )
+    duplicates = op.get_bind().execute(
+        sa.text(
+            f"SELECT {key}, count(*) FROM {_quote(table)}"
+            f"{f' WHERE {where}' if where else ''} "
+            f"GROUP BY {key} HAVING count(*) > 1 LIMIT 10"
+        )
+    ).all()
+    if duplicates:
+        raise DuplicateKeys(
+            f"Индекс {name} не построить: в {table} есть дубликаты ({key}): "
+            + "; ".join(repr(tuple(row)) for row in duplicates)
+        )
+
+
+def create_index_concurrently(
+    name: str,
+    table: str,
+    columns: Sequence[str | sa.TextClause],
+    *,
+    unique: bool = False,
+    where: str | None = None,
+    include: Sequence[str] | None = None,
+) -> None:
+    """
+    CREATE INDEX CONCURRENTLY: таблица остаётся доступной на запись.
+
+    Для уникального индекса сначала ищутся дубликаты (DuplicateKeys).
+    """
+    if unique:
+        _check_unique(name, table, columns, where)
+    started = time.monotonic()
+    with op.get_context().autocommit_block():
+        _drop_invalid_index(name)
+        op.create_index(
+            name,
+            table,
+            list(columns),
+            unique=unique,
+            postgresql_where=sa.text(where) if where else None,
+            postgresql_include=list(include or ()),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    logger.info("Индекс %s построен за %.1f с", name, time.monotonic() - started)
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            name, table_name=table, postgresql_concurrently=True, if_exists=True
+        )
+
+
+def add_column(table: str, column: sa.Column) -> None:
+    """
+    Добавляет колонку без перезаписи таблицы.
+
+    NOT NULL и server_default с выражением переписали бы таблицу, поэтому
+    колонка создаётся nullable; ограничения ставятся после backfill.
+    """
+    if not column.nullable:
+        raise ValueError(
+            f"{table}.{column.name}: добавляйте nullable колонку, "
+            "NOT NULL ставьте через set_not_null после backfill"
+        )
+    op.execute(f"SET lock_timeout = '{DDL_LOCK_TIMEOUT}'")
+    op.add_column(table, column)
+    op.execute("RESET lock_timeout")
+
+
+def backfill(
+    table: str,
+    column: str,
+    expression: str,
+    *,
+    key: str = "id",
+    batch_size: int = 10_000,
+    pause: float = 0.05,
+) -> int:
+    """
+    Заполняет ``column`` значением SQL-выражения ``expression`` пачками по ``key``.
+
+    Каждая пачка — диапазон ключа и отдельная транзакция, поэтому блокировки
+    строк короткие, а autovacuum успевает за обновлениями. Уже заполненные
+    строки (``column IS NOT NULL``) пропускаются, так что прерванный backfill
+    можно запустить снова.
+    """
+    table_sql, column_sql, key_sql = _quote(table), _quote(column), _quote(key)
+    update = (
+        f"UPDATE {table_sql} SET {column_sql} = {expression} "
+        f"WHERE {column_sql} IS NULL"
+    )
+    if _is_offline():
+        op.execute(update)
+        return 0
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        low, high = bind.execute(
+            sa.text(f"SELECT min({key_sql}), max({key_sql}) FROM {table_sql}")
+        ).one()
+        if low is None:
+            return 0
+
+        # Прогресс в единицах диапазона ключа: count(*) по большой таблице
+        # сам по себе был бы полным сканированием
+        progress = Progress(f"Backfill {table}.{column}", logger, total=high - low + 1)
+        statement = sa.text(f"{update} AND {key_sql} >= :low AND {key_sql} < :high")
+        updated = 0
+        start = low
+        while start <= high:
+            end = start + batch_size
+            result = bind.execute(statement, {"low": start, "high": end})
+            updated += result.rowcount
+            progress.advance(min(end, high + 1) - start)
+            start = end
+            if pause:
+                time.sleep(pause)
+        progress.finish()
+    logger.info("Backfill %s.%s: обновлено %s строк", table, column, updated)
+    return updated
+
+
+def set_not_null(table: str, column: str) -> None:
+    """
+    SET NOT NULL без долгой блокировки.
+
+    CHECK ... NOT VALID ставится мгновенно, VALIDATE сканирует таблицу под
+    SHARE UPDATE EXCLUSIVE (запись не блокируется), а SET NOT NULL затем
+    использует проверенный CHECK вместо повторного сканирования.
+    """
+    constraint = f"{table}_{column}_not_null"
+    table_sql, column_sql = _quote(table), _quote(column)
+    with op.get_context().autocommit_block():
+        op.execute(f"SET lock_timeout = '{DDL_LOCK_TIMEOUT}'")
+        op.execute(
+            f"ALTER TABLE {table_sql} ADD CONSTRAINT {_quote(constraint)} "
+            f"CHECK ({column_sql} IS NOT NULL) NOT VALID"
+        )
+        op.execute("RESET lock_timeout")
+        op.execute(f"ALTER TABLE {table_sql} VALIDATE CONSTRAINT {_quote(constraint)}")
+        op.execute(f"SET lock_timeout = '{DDL_LOCK_TIMEOUT}'")
+        op.execute(f"ALTER TABLE {table_sql} ALTER COLUMN {column_sql} SET NOT NULL")
+        op.execute(f"ALTER TABLE {table_sql} DROP CONSTRAINT {_quote(constraint)}")
+        op.execute("RESET lock_timeout")
+
+
+def _sync_function(table: str, target: str) -> str:
+    return f"{table}_sync_{target}"
+
+
+def create_sync_trigger(table: str, target: str, expression: str) -> None:
+    """
+    Триггер двойной записи: пока идёт backfill, новые и изменённые строки
+    сразу получают ``target = expression`` (выражение над ``NEW``).
+    """
+    function = _quote(_sync_function(table, target))
+    op.execute(
+        f"CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$\n"
+        f"BEGIN\n"
+        f"    NEW.{_quote(target)} := {expression};\n"
+        f"    RETURN NEW;\n"
+        f"END;\n"
+        f"$$ LANGUAGE plpgsql"
+    )
+    op.execute(
+        f"CREATE TRIGGER {function} BEFORE INSERT OR UPDATE ON {_quote(table)} "
+        f"FOR EACH ROW EXECUTE FUNCTION {function}()"
+    )
+
+
+def drop_sync_trigger(table: str, target: str) -> None:
+    function = _quote(_sync_function(table, target))
+    op.execute(f"DROP TRIGGER IF EXISTS {function} ON {_quote(table)}")
+    op.execute(f"DROP FUNCTION IF EXISTS {function}()")
+
+
+def _column_default(table: str, column: str) -> str | None:
+    """SQL-выражение server default колонки или None."""
+    if _is_offline():
+        return None
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT pg_get_expr(d.adbin, d.adrelid) FROM pg_attrdef d "
+            "JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum "
+            "WHERE d.adrelid = to_regclass(:table) AND a.attname = :column"
+        ),
+        {"table": _quote(table), "column": column},
+    ).scalar()
+
+
+def swap_columns(
+    table: str,
+    column: str,
+    replacement: str,
+    *,
+    keep_old_as: str,
+    server_default: str | None = None,
+) -> None:
+    """
+    Подменяет ``column`` на заполненную ``replacement`` одной короткой транзакцией.
+
+    Старая колонка остаётся под именем ``keep_old_as``, чтобы откат не требовал
+    обратного backfill; удаляется отдельной миграцией. Приложение больше не
+    пишет в неё, поэтому NOT NULL с неё снимается, иначе каждый INSERT упадёт.
+    Server default переносится на новую колонку: ``server_default`` или, если
+    не задан, выражение старой колонки (в offline-режиме его не узнать —
+    передавайте явно).
+    """
+    table_sql, column_sql, old_sql = _quote(table), _quote(column), _quote(keep_old_as)
+    with op.get_context().autocommit_block():
+        op.execute("BEGIN")
+        try:
+            op.execute(f"SET LOCAL lock_timeout = '{DDL_LOCK_TIMEOUT}'")
+            if server_default is None:
+                server_default = _column_default(table, column)
+            drop_sync_trigger(table, replacement)
+            op.execute(f"ALTER TABLE {table_sql} RENAME COLUMN {column_sql} TO {old_sql}")
+            op.execute(
+                f"ALTER TABLE {table_sql} RENAME COLUMN {_quote(replacement)} TO {column_sql}"
+            )
+            op.execute(f"ALTER TABLE {table_sql} ALTER COLUMN {old_sql} DROP NOT NULL")
+            op.execute(f"ALTER TABLE {table_sql} ALTER COLUMN {old_sql} DROP DEFAULT")
+            if server_default is not None:
+                op.execute(
+                    f"ALTER TABLE {table_sql} ALTER COLUMN {column_sql} "
+                    f"SET DEFAULT {server_default}"
+                )
+        except Exception:
+            # Иначе соединение останется в прерванной транзакции
+            op.execute("ROLLBACK")
+            raise
+        op.execute("COMMIT")
+
+
+def change_column_type(
+    table: str,
+    column: str,
+    type_: sa.types.TypeEngine,
+    using: str,
+    *,
+    nullable: bool = True,
+    server_default: str | None = None,
+    batch_size: int = 10_000,
+    pause: float = 0.05,
+) -> None:
+    """
+    Смена типа колонки без перезаписи таблицы под эксклюзивной блокировкой.
+
+    ``using`` — выражение с подстановкой ``{column}``, например
+    ``"{column} AT TIME ZONE 'UTC'"``. Шаги: новая колонка, триггер двойной
+    записи, backfill, NOT NULL, swap. Старые значения остаются в
+    ``{column}_old``. Индексы по колонке нужно заранее построить на
+    ``{column}_new`` через create_index_concurrently. ``server_default`` —
+    default новой колонки, если default старой не подходит новому типу.
+    """
+    replacement = f"{column}_new"
+    add_column(table, sa.Column(replacement, type_, nullable=True))
+    create_sync_trigger(
+        table, replacement, using.format(column=f"NEW.{_quote(column)}")
+    )
+    backfill(
+        table,
+        replacement,
+        using.format(column=_quote(column)),
+        batch_size=batch_size,
+        pause=pause,
+    )
+    if not nullable:
+        set_not_null(table, replacement)
+    swap_columns(
+        table,
+        column,
+        replacement,
+        keep_old_as=f"{column}_old",
+        server_default=server_default,
+    )
@@ -1,10 +1,24 @@
 from datetime import datetime, timedelta, timezone
 from fastapi_users.db import SQLAlchemyBaseOAuthAccountTable, SQLAlchemyBaseUserTable
 import secrets
-from sqlalchemy import DateTime, ForeignKey, func, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    func,
+    Identity,
+    Index,
+    Integer,
+    String,
+    Table,
+    text,
+)
+from sqlalchemy.dialects.postgresql import INET, JSONB
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 
 from app.db.base import Base
+from config import settings
 
 
 class AuditMixin:
@@ -21,10 +35,11 @@ class AuditMixin:
         nullable=False,
     )
 
+    # Индекс только по удалённым строкам (см. soft_deleted_index): живые
+    # запросы фильтруют deleted_at IS NULL через частичные индексы таблиц.
     deleted_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True),
         nullable=True,
-        index=True,
     )
 
     def soft_delete(self) -> None:
@@ -37,8 +52,35 @@ class AuditMixin:
         self.updated_at = datetime.now(timezone.utc)
 
 
+def soft_deleted_index(table_name: str) -> Index:
+    """Частичный индекс по удалённым строкам — для поиска кандидатов в архив."""
+    return Index(
+        f"ix_{table_name}_deleted_at",
+        "deleted_at",
+        postgresql_where=text("deleted_at IS NOT NULL"),
+    )
+
+
 class OAuthAccount(AuditMixin, SQLAlchemyBaseOAuthAccountTable[int], Base):
+    __table_args__ = (
+        # get_by_oauth_account при каждом входе через провайдера:
+        # WHERE oauth_name = ? AND account_id = ? AND deleted_at IS NULL.
+        # user_id в INCLUDE делает поиск index-only.
+        Index(
+            "ix_oauth_account_provider_live",
+            "oauth_name",
+            "account_id",
+            unique=True,
+            postgresql_include=["user_id"],
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        soft_deleted_index("oauth_account"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
+    # Отдельные индексы базовой таблицы fastapi-users заменены составным
+    oauth_name: Mapped[str] = mapped_column(String(length=100), nullable=False)
+    account_id: Mapped[str] = mapped_column(String(length=320), nullable=False)
     user: Mapped["User"] = relationship(
         "User",
         back_populates="oauth_accounts",
@@ -52,7 +94,29 @@ class OAuthAccount(AuditMixin, SQLAlchemyBaseOAuthAccountTable[int], Base):
 
 
 class User(AuditMixin, SQLAlchemyBaseUserTable[int], Base):
+    __table_args__ = (
+        # Email уникален среди живых пользователей без учёта регистра,
+        # после мягкого удаления его можно зарегистрировать снова.
+        Index(
+            "ix_user_email_lower_live",
+            text("lower(email)"),
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        # Keyset пагинация списка пользователей: ORDER BY created_at, id
+        Index("ix_user_created_at_id", "created_at", "id"),
+        soft_deleted_index("user"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
+    email: Mapped[str] = mapped_column(String(length=320), nullable=False)
+    # Пишутся пачками из app.services.activity, updated_at не меняют
+    last_login_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    last_seen_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
     oauth_accounts: Mapped[list[OAuthAccount]] = relationship(
         "OAuthAccount",
         back_populates="user",
@@ -68,6 +132,7 @@ class User(AuditMixin, SQLAlchemyBaseUserTable[int], Base):
 
 class RefreshToken(AuditMixin, Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (soft_deleted_index("refresh_tokens"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     token: Mapped[str] = mapped_column(String, unique=True, nullable=False)
@@ -79,10 +144,111 @@ class RefreshToken(AuditMixin, Base):
         DateTime(timezone=True),
         nullable=False,
     )
+    # Момент логина: переносится в преемников при ротации и ограничивает
+    # общую длительность сессии (refresh_session_max_sec)
+    session_started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
 
     @staticmethod
-    def create(user_id: int, expires_days: int = 7) -> "RefreshToken":
-        """Создаёт новый refresh token"""
+    def _expires_at(now: datetime, session_started_at: datetime) -> datetime:
+        return min(
+            now + timedelta(seconds=settings.refresh_token_expire_sec),
+            session_started_at + timedelta(seconds=settings.refresh_session_max_sec),
+        )
+
+    @staticmethod
+    def create(
+        user_id: int, session_started_at: datetime | None = None
+    ) -> "RefreshToken":
+        """Создаёт новый refresh token; без session_started_at — новая сессия."""
         token = secrets.token_urlsafe(32)
-        expires_at = datetime.now(timezone.utc) + timedelta(days=expires_days)
-        return RefreshToken(user_id=user_id, token=token, expires_at=expires_at)
+        now = datetime.now(timezone.utc)
+        session_started_at = session_started_at or now
+        return RefreshToken(
+            user_id=user_id,
+            token=token,
+            created_at=now,
+            session_started_at=session_started_at,
+            expires_at=RefreshToken._expires_at(now, session_started_at),
+        )
+
+    def rotation_due(self, now: datetime) -> bool:
+        """
+        Пора ли заменить токен новым.
+
+        До доли refresh_rotate_after_fraction от срока жизни refresh отдаёт
+        только новый access token. Ротация, которая не продлит срок из-за
+        ограничения сессии, тоже не нужна.
+        """
+        lifetime = self.expires_at - self.created_at
+        if now < self.created_at + lifetime * settings.refresh_rotate_after_fraction:
+            return False
+        return self._expires_at(now, self.session_started_at) > self.expires_at
+
+    def successor(self) -> "RefreshToken":
+        return RefreshToken.create(self.user_id, self.session_started_at)
+
+
+class AuthEvent(Base):
+    """
+    Журнал событий аутентификации, только добавление.
+
+    Секционирован по месяцам created_at: срок хранения — DROP старой
+    секции вместо DELETE. Секции создаёт python -m app.cli.audit_partitions.
+    Внешнего ключа на user нет: события переживают архивацию пользователя.
+    """
+
+    __tablename__ = "auth_events"
+    __table_args__ = (
+        Index("ix_auth_events_user_id_created_at", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Ключ секционирования обязан входить в первичный ключ
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )
+    event: Mapped[str] = mapped_column(String(length=32), nullable=False)
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    email: Mapped[str | None] = mapped_column(String(length=320), nullable=True)
+    ip: Mapped[str | None] = mapped_column(INET, nullable=True)
+    user_agent: Mapped[str | None] = mapped_column(String(length=512), nullable=True)
+    data: Mapped[dict | None] = mapped_column(JSONB(none_as_null=True), nullable=True)
+
+
+def archive_table(table: Table) -> Table:
+    """
+    Архивная копия таблицы: те же колонки, без внешних ключей и индексов.
+
+    Сюда переносятся строки, удалённые мягко дольше срока хранения.
+    """
+    columns = [
+        Column(
+            column.name,
+            column.type,
+            primary_key=column.primary_key,
+            autoincrement=False,
+            nullable=column.nullable,
+        )
+        for column in table.columns
+    ]
+    return Table(
+        f"{table.name}_archive",
+        table.metadata,
+        *columns,
+        Column(
+            "archived_at",
+            DateTime(timezone=True),
+            server_default=func.now(),
+            nullable=False,
+        ),
+    )
+
+
+UserArchive = archive_table(User.__table__)
+OAuthAccountArchive = archive_table(OAuthAccount.__table__)
+RefreshTokenArchive = archive_table(RefreshToken.__table__)
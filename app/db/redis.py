@@ -0,0 +1,20 @@
+from redis.asyncio import Redis
+
+from config import settings
+
+_redis: Redis | None = None
+
+
+def get_redis() -> Redis:
+    """Общий клиент Redis воркера, соединения берутся из пула клиента."""
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(settings.redis_url)
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
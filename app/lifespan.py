@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.crud.refresh_tokens import select_active_refresh_token, select_refresh_token
+from app.db.database import AsyncSessionLocal, UserDatabase, engine
+from app.db.models import OAuthAccount, User
+from app.db.redis import close_redis, get_redis
+from app.services.activity import activity_buffer
+from app.services.audit import audit_log
+from app.services.breached import breached_passwords
+from app.services.disposable import disposable_domains
+from app.services.health import health_monitor
+from app.services.oauth import google_oauth_client
+from app.services.passwords import password_hasher
+from app.services.revocation import token_denylist
+from config import settings
+
+logger = logging.getLogger("uvicorn")
+
+
+async def warm_up_pool() -> None:
+    """Открывает заранее часть соединений пула, чтобы их не ждали первые запросы."""
+    size = min(settings.db_warmup_connections, settings.db_pool_size)
+    connections = await asyncio.gather(*(engine.connect() for _ in range(size)))
+    for connection in connections:
+        await connection.close()
+
+
+async def warm_up_statements() -> None:
+    """
+    Выполняет горячие запросы, чтобы их компиляция попала в кэш движка.
+
+    Кэш ключуется структурой запроса, поэтому значения параметров не важны.
+    """
+    async with AsyncSessionLocal() as session:
+        user_db = UserDatabase(session, User, OAuthAccount)
+        await user_db.get_by_email("warmup@localhost")
+        # refresh читает токен с пользователем, ротация — ещё и с блокировкой
+        await session.execute(select_refresh_token("warmup"))
+        await session.execute(select_active_refresh_token("warmup"))
+        await session.rollback()
+
+
+async def warm_up_redis() -> None:
+    await get_redis().ping()
+
+
+async def warm_up_breached_passwords() -> None:
+    """Открывает mmap базы утёкших паролей до первой регистрации."""
+    breached_passwords.open()
+
+
+async def warm_up_disposable_domains() -> None:
+    disposable_domains.load()
+
+
+async def _run_step(name: str, step) -> None:
+    start = time.perf_counter()
+    try:
+        await step()
+    except Exception:
+        logger.exception("Прогрев %s не удался", name)
+    else:
+        logger.info("Прогрев %s: %.1f ms", name, (time.perf_counter() - start) * 1000)
+
+
+async def warm_up() -> None:
+    password_hasher.start()
+    await _run_step("пула БД", warm_up_pool)
+    await asyncio.gather(
+        _run_step("запросов", warm_up_statements),
+        _run_step("Redis", warm_up_redis),
+        _run_step("хэширования", password_hasher.warmup),
+        _run_step("базы утёкших паролей", warm_up_breached_passwords),
+        _run_step("одноразовых доменов", warm_up_disposable_domains),
+    )
+
+
+async def shut_down() -> None:
+    await health_monitor.stop()
+    await token_denylist.stop()
+    # Буфер активности и очередь аудита дописываются, пока движок не закрыт
+    await activity_buffer.stop()
+    await audit_log.stop()
+    await google_oauth_client.aclose()
+    await close_redis()
+    await engine.dispose()
+    password_hasher.shutdown()
+    breached_passwords.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Прогрев перед приёмом трафика и освобождение ресурсов при остановке.
+
+    Пока прогрев не закончен, app.state.ready = False.
+    """
+    app.state.ready = False
+    await warm_up()
+    await health_monitor.start()
+    await token_denylist.start()
+    await activity_buffer.start()
+    await audit_log.start()
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        await shut_down()
@@ -0,0 +1,200 @@
+"""
+Счётчик SQL-запросов на HTTP-запрос и детектор N+1.
+
+Обработчики событий движка считают выражения и время в БД в объекте
+``QueryStats`` текущего контекста (contextvar). SQLAlchemy выполняет
+синхронную часть async-движка в greenlet с копией контекста вызывающей
+корутины, поэтому счётчик, выставленный в middleware, виден в событиях.
+
+В debug-режиме ``QueryCounterMiddleware`` отдаёт ``X-DB-Queries`` и
+``X-DB-Time-Ms`` в ответе и копит агрегаты по маршрутам в ``route_metrics``.
+Бюджеты маршрутов (``QUERY_BUDGETS``) проверяются тестами через
+``query_budget``.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+
+logger = logging.getLogger("users.queries")
+
+# Допустимое число выражений на запрос по имени маршрута
+QUERY_BUDGETS: dict[str, int] = {
+    # пользователь по email, перехэш пароля (редко), новый refresh token
+    "auth:cookie.login": 3,
+    "auth:cookie.logout": 1,
+    "register:register": 1,
+    "verify:verify": 1,
+    # GET /api/users/me; users:current_user fastapi-users им перекрыт
+    "users:me": 1,
+    # текущий суперпользователь и запрошенный пользователь
+    "users:user": 2,
+    # чтение с пользователем; при ротации: блокировка, DELETE, INSERT
+    "token:refresh_token": 4,
+}
+
+_current: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Выражения, выполненные не меньше ``threshold`` раз: признак N+1."""
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+def install_query_counter(engine: Engine | AsyncEngine) -> None:
+    """Подключает подсчёт к движку; повторный вызов ничего не меняет."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    for name, listener in (
+        ("before_cursor_execute", _before_cursor_execute),
+        ("after_cursor_execute", _after_cursor_execute),
+    ):
+        if not event.contains(sync_engine, name, listener):
+            event.listen(sync_engine, name, listener)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Считает выражения, выполненные внутри блока в текущем контексте."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def query_budget(limit: int) -> Iterator[QueryStats]:
+    """Падает с ``QueryBudgetExceeded``, если блок выполнил больше ``limit`` выражений."""
+    with count_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        listing = "\n".join(
+            f"  {count} x {statement}" for statement, count in stats.statements.items()
+        )
+        raise QueryBudgetExceeded(
+            f"{stats.count} SQL-выражений при бюджете {limit}:\n{listing}"
+        )
+
+
+@dataclass
+class RouteQueryMetrics:
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    db_time: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "max_queries": self.max_queries,
+            "avg_queries": round(self.queries / self.requests, 2),
+            "db_time_ms": round(self.db_time * 1000, 1),
+        }
+
+
+route_metrics: dict[str, RouteQueryMetrics] = {}
+
+
+def _route_name(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "name", None) or scope["path"]
+
+
+class QueryCounterMiddleware:
+    """
+    Pure ASGI middleware: считает запросы к БД за HTTP-запрос.
+
+    Заголовки дописываются в ``http.response.start``, поэтому выражения,
+    выполненные после начала ответа (фоновые задачи, зависимости с yield),
+    попадают только в метрики и логи.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        budgets: dict[str, int] = QUERY_BUDGETS,
+        repeat_threshold: int | None = None,
+    ) -> None:
+        self.app = app
+        self.budgets = budgets
+        self.repeat_threshold = repeat_threshold or settings.query_repeat_warn_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(stats.count)
+                headers["X-DB-Time-Ms"] = f"{stats.duration * 1000:.1f}"
+            await send(message)
+
+        with count_queries() as stats:
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                self._record(_route_name(scope), stats)
+
+    def _record(self, name: str, stats: QueryStats) -> None:
+        metrics = route_metrics.setdefault(name, RouteQueryMetrics())
+        metrics.requests += 1
+        metrics.queries += stats.count
+        metrics.max_queries = max(metrics.max_queries, stats.count)
+        metrics.db_time += stats.duration
+
+        budget = self.budgets.get(name)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                "%s: %s SQL-выражений при бюджете %s", name, stats.count, budget
+            )
+        for statement, count in stats.repeated(self.repeat_threshold):
+            logger.warning("%s: возможный N+1, %s x %s", name, count, statement)
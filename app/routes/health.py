@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+
+from app.middleware.queries import route_metrics
+from app.services.health import health_monitor
+from config import settings
+
+health_router = APIRouter()
+
+
+@health_router.get("/live", name="health:live")
+async def live():
+    """Процесс жив и обслуживает event loop."""
+    return {"status": "ok"}
+
+
+@health_router.get("/ready", name="health:ready")
+async def ready(request: Request):
+    """
+    Готовность принимать трафик: прогрев завершён и обязательные
+    зависимости доступны. Отдаёт кэш фоновых проверок, сам БД не трогает.
+    """
+    is_ready = getattr(request.app.state, "ready", False) and health_monitor.is_ready()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK
+        if is_ready
+        else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if is_ready else "not_ready",
+            "checks": {
+                name: result.as_dict()
+                for name, result in health_monitor.results.items()
+            },
+        },
+    )
+
+
+@health_router.get("/queries", name="health:queries")
+async def queries():
+    """DEBUG: число SQL-выражений и время в БД по маршрутам с запуска воркера."""
+    if not settings.debug:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return {name: metrics.as_dict() for name, metrics in route_metrics.items()}
@@ -2,10 +2,14 @@ from fastapi import (APIRouter, Body, Depends, HTTPException, Request,
                      Response, status)
 from fastapi_users import exceptions, models, schemas
 from fastapi_users.manager import BaseUserManager, UserManagerDependency
-from fastapi_users.password import PasswordHelper
 from fastapi_users.router.common import ErrorCode, ErrorModel
 
-password_helper = PasswordHelper()
+from app.services.disposable import disposable_domains
+from app.services.passwords import password_hasher
+from app.utils.responses import model_response, register_error_payloads
+
+REGISTER_DISPOSABLE_EMAIL = "REGISTER_DISPOSABLE_EMAIL"
+register_error_payloads(REGISTER_DISPOSABLE_EMAIL)
 
 
 def get_register_router(
@@ -32,6 +36,10 @@ def get_register_router(
                                     "detail": ErrorCode.REGISTER_USER_ALREADY_EXISTS
                                 },
                             },
+                            REGISTER_DISPOSABLE_EMAIL: {
+                                "summary": "Disposable email domains are not allowed.",
+                                "value": {"detail": REGISTER_DISPOSABLE_EMAIL},
+                            },
                             ErrorCode.REGISTER_INVALID_PASSWORD: {
                                 "summary": "Password validation failed.",
                                 "value": {
@@ -57,6 +65,12 @@ def get_register_router(
         Не регсрируем пользователя сразу,
         создаем данные для регистрации и валидируем их
         """
+        # До запроса в БД и хэширования: одноразовый адрес не дойдёт до verify
+        if disposable_domains.is_disposable(user_create.email):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=REGISTER_DISPOSABLE_EMAIL,
+            )
         existing_user = await user_manager.user_db.get_by_email(user_create.email)
         if existing_user is not None:
             raise HTTPException(
@@ -76,7 +90,7 @@ def get_register_router(
 
         user_dict = user_create.create_update_dict()
         password = user_dict.pop("password")
-        user_dict["hashed_password"] = password_helper.hash(password)
+        user_dict["hashed_password"] = await password_hasher.hash(password)
 
         await user_manager.on_before_register(user_dict, request)
         return Response(status_code=204)
@@ -124,13 +138,13 @@ def get_verify_router(
     ):
         try:
             user = await user_manager.verify(token, request)
-            return user_schema.model_validate(user)
+            return model_response(user_schema, user)
         except (exceptions.InvalidVerifyToken, exceptions.UserNotExists):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=ErrorCode.VERIFY_USER_BAD_TOKEN,
             )
-        except exceptions.UserAlreadyVerified:
+        except (exceptions.UserAlreadyVerified, exceptions.UserAlreadyExists):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=ErrorCode.VERIFY_USER_ALREADY_VERIFIED,
@@ -1,19 +1,25 @@
 from datetime import datetime, timezone
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi_users.openapi import OpenAPIResponseType
 from fastapi_users.router.common import ErrorCode, ErrorModel
 from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.refresh_tokens import select_active_refresh_token, select_refresh_token
 from app.db.database import get_async_session
-from app.db.models import RefreshToken
+from app.services.activity import activity_buffer
+from app.services.audit import AuditEvent, audit_log
+from app.services.refresh_grace import refresh_grace_cache
 from app.services.users import auth_backend, cookie_transport, get_strategy
+from app.utils.responses import register_error_payloads
 from config import settings
 
 token_router = APIRouter()
 
+MISSING_TOKEN = "Missing token or inactive user."
+INVALID_TOKEN = "Invalid or expired refresh token"
+register_error_payloads(MISSING_TOKEN, INVALID_TOKEN)
+
 refresh_responses: OpenAPIResponseType = {
     status.HTTP_400_BAD_REQUEST: {
         "model": ErrorModel,
@@ -32,7 +38,7 @@ refresh_responses: OpenAPIResponseType = {
             }
         },
     },
-    status.HTTP_401_UNAUTHORIZED: {"description": "Missing token or inactive user."},
+    status.HTTP_401_UNAUTHORIZED: {"description": MISSING_TOKEN},
     **auth_backend.transport.get_openapi_login_responses_success(),
 }
 
@@ -52,35 +58,73 @@ async def refresh_token(
     if not refresh_token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing token or inactive user.",
+            detail=MISSING_TOKEN,
         )
 
-    async with session.begin():
-        result = await session.execute(
-            select(RefreshToken)
-            .options(selectinload(RefreshToken.user))
-            .where(
-                RefreshToken.token == refresh_token,
-                RefreshToken.expires_at > datetime.now(timezone.utc),
-            )
-            .with_for_update()
-        )
+    # Параллельный запрос с той же cookie уже ротировал токен
+    successors = await refresh_grace_cache.get(refresh_token)
+    if successors is not None:
+        return await cookie_transport.get_login_response(*successors)
 
-        db_token = result.scalars().first()
+    now = datetime.now(timezone.utc)
+    rotated = False
+    try:
+        async with session.begin():
+            result = await session.execute(select_refresh_token(refresh_token))
+            db_token = result.scalars().first()
+            if db_token is not None:
+                activity_buffer.record_seen(db_token.user_id, now)
 
-        if not db_token:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid or expired refresh token",
-            )
+            if db_token is not None and not db_token.rotation_due(now):
+                # Токен ещё свежий: только новый access token, без записи
+                # в БД и без блокировки строки
+                access_token = await get_strategy(request, session).write_token(db_token.user)
+                audit_log.record(
+                    AuditEvent.REFRESHED,
+                    user_id=db_token.user_id,
+                    request=request,
+                    rotated=False,
+                )
+                return await cookie_transport.get_login_response(
+                    access_token, refresh_token
+                )
+
+            if db_token is not None:
+                user = db_token.user
+                result = await session.execute(
+                    select_active_refresh_token(refresh_token)
+                )
+                db_token = result.scalars().first()
 
-        await session.delete(db_token)
+            if not db_token:
+                # Ждали блокировку строки, пока её ротировал другой запрос
+                successors = await refresh_grace_cache.get(refresh_token)
+                if successors is not None:
+                    return await cookie_transport.get_login_response(*successors)
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail=INVALID_TOKEN,
+                )
 
-        new_refresh_token = RefreshToken.create(db_token.user_id)
-        session.add(new_refresh_token)
+            await session.delete(db_token)
 
-    access_token = await get_strategy().write_token(db_token.user)
+            new_refresh_token = db_token.successor()
+            session.add(new_refresh_token)
 
+            access_token = await get_strategy(request, session).write_token(user)
+            await refresh_grace_cache.put(
+                refresh_token, access_token, new_refresh_token.token
+            )
+            rotated = True
+    except Exception:
+        # Ротация не закоммичена: преемники из кэша не существуют в БД
+        if rotated:
+            await refresh_grace_cache.discard(refresh_token)
+        raise
+
+    audit_log.record(
+        AuditEvent.REFRESHED, user_id=user.id, request=request, rotated=True
+    )
     return await cookie_transport.get_login_response(
         access_token, new_refresh_token.token
     )
@@ -0,0 +1,214 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from fastapi_users import exceptions
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.users import (
+    DeletedFilter,
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    select_users_page,
+)
+from app.db.database import AsyncSessionLocal, get_async_session
+from app.schemas.users import UserPage, UserRead
+from app.services.etags import etag_matches, user_etag, user_etag_cache
+from app.services.users import (
+    JWTStrategyCustom,
+    UserManager,
+    cookie_transport,
+    current_active_user,
+    current_superuser,
+    get_strategy,
+    get_user_manager,
+)
+from app.utils.responses import construct_model, model_response, type_adapter
+
+users_router = APIRouter()
+
+STREAM_BATCH_SIZE = 500
+
+# Ответ хранит только браузер пользователя и каждый раз перепроверяет ETag
+CACHE_CONTROL = "private, no-cache"
+
+
+async def _stream_users(statement):
+    """
+    NDJSON поток из серверного курсора: в памяти только текущая пачка.
+
+    Сессия открывается внутри генератора, так как тело ответа
+    отдаётся уже после выхода из зависимостей запроса.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.stream_scalars(
+            statement.execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        adapter = type_adapter(UserRead)
+        async for user in result:
+            yield adapter.dump_json(construct_model(UserRead, user)) + b"\n"
+
+
+def _etag_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+async def _cached_etag(user_id, if_none_match: str | None) -> str | None:
+    """ETag из кэша; читается только для условного запроса."""
+    if not if_none_match:
+        return None
+    return await user_etag_cache.get(user_id)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_etag_headers(etag))
+
+
+async def _user_response(
+    user, if_none_match: str | None, cached_etag: str | None = None
+) -> Response:
+    """
+    UserRead с ETag или 304, если клиент прислал тот же ETag.
+
+    В кэш попадают только активные пользователи: по кэшу /me отвечает 304
+    без current_active_user. Совпавший с кэшем ETag заново не пишется.
+    """
+    etag = user_etag(user)
+    if user.is_active and etag != cached_etag:
+        await user_etag_cache.put(user.id, etag)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    response = model_response(UserRead, user)
+    response.headers.update(_etag_headers(etag))
+    return response
+
+
+async def me_not_modified(
+    request: Request,
+    if_none_match: str | None = Header(None),
+    strategy: JWTStrategyCustom = Depends(get_strategy),
+) -> str | None:
+    """
+    Условный GET /me без запроса к БД.
+
+    Выполняется до current_active_user: токен проверяется по подписи и списку
+    отзыва, а пользователь не загружается, если его ETag в кэше совпал.
+    Иначе возвращает прочитанный из кэша ETag, чтобы /me не писал его снова.
+    Payload токена стратегия запоминает, current_active_user его не
+    перепроверяет.
+    """
+    if not if_none_match:
+        return None
+    claims = await strategy.read_claims(
+        request.cookies.get(cookie_transport.cookie_name)
+    )
+    if claims is None:
+        return None
+    etag = await _cached_etag(claims["sub"], if_none_match)
+    if etag is not None and etag_matches(if_none_match, etag):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=_etag_headers(etag)
+        )
+    return etag
+
+
+@users_router.get(
+    "/me",
+    name="users:me",
+    response_model=UserRead,
+    responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "ETag matches If-None-Match."},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing token or inactive user."},
+    },
+)
+async def me(
+    if_none_match: str | None = Header(None),
+    cached_etag: str | None = Depends(me_not_modified),
+    user=Depends(current_active_user),
+):
+    """Тот же ответ, что у fastapi-users, но без повторной валидации и с ETag."""
+    return await _user_response(user, if_none_match, cached_etag)
+
+
+@users_router.get(
+    "",
+    name="users:list",
+    response_model=UserPage,
+    dependencies=[Depends(current_superuser)],
+    responses={
+        status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}},
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid cursor."},
+    },
+)
+async def list_users(
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    is_active: bool | None = None,
+    is_verified: bool | None = None,
+    deleted: DeletedFilter = "exclude",
+    format: Literal["json", "ndjson"] = "json",
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Список пользователей для админки.
+
+    ``format=ndjson`` отдаёт всех подходящих пользователей начиная с курсора
+    одним потоком, без ``limit``.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+        )
+
+    filters = dict(
+        after=after, is_active=is_active, is_verified=is_verified, deleted=deleted
+    )
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_users(select_users_page(**filters)),
+            media_type="application/x-ndjson",
+        )
+
+    result = await session.execute(select_users_page(**filters, limit=limit + 1))
+    users = list(result.scalars())
+    next_cursor = encode_cursor(users[limit - 1]) if len(users) > limit else None
+    page = UserPage.model_construct(
+        items=[construct_model(UserRead, user) for user in users[:limit]],
+        next_cursor=next_cursor,
+    )
+    return model_response(UserPage, page)
+
+
+@users_router.get(
+    "/{id}",
+    name="users:user",
+    response_model=UserRead,
+    dependencies=[Depends(current_superuser)],
+    responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "ETag matches If-None-Match."},
+        status.HTTP_404_NOT_FOUND: {"description": "The user does not exist."},
+    },
+)
+async def get_user(
+    id: str,
+    if_none_match: str | None = Header(None),
+    user_manager: UserManager = Depends(get_user_manager),
+):
+    """Пользователь по id для админки: как у fastapi-users, плюс ETag."""
+    try:
+        parsed_id = user_manager.parse_id(id)
+    except exceptions.InvalidID:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    cached_etag = await _cached_etag(parsed_id, if_none_match)
+    if cached_etag is not None and etag_matches(if_none_match, cached_etag):
+        return _not_modified(cached_etag)
+
+    try:
+        user = await user_manager.get(parsed_id)
+    except exceptions.UserNotExists:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return await _user_response(user, if_none_match, cached_etag)
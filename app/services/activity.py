@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import DateTime, Integer, Update, cast, column, func, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import User
+from config import settings
+
+logger = logging.getLogger("users.activity")
+
+# Строк в одном UPDATE: три параметра на строку, а asyncpg принимает
+# не больше 32767 параметров на запрос
+FLUSH_CHUNK_ROWS = 5000
+
+TIMESTAMP = DateTime(timezone=True)
+
+
+def _latest(current: datetime | None, new: datetime | None) -> datetime | None:
+    if current is None or (new is not None and new > current):
+        return new
+    return current
+
+
+def update_activity(rows: list[tuple[int, datetime | None, datetime | None]]) -> Update:
+    """
+    Один UPDATE "user" ... FROM (VALUES ...) на пачку пользователей.
+
+    Время только сдвигается вперёд (GREATEST пропускает NULL), так что
+    запоздавшая пачка другого воркера не откатит его назад. ``updated_at``
+    явно остаётся прежним: активность не изменение профиля и не должна
+    сбрасывать ETag пользователя.
+    """
+    table = User.__table__
+    activity = values(
+        column("id", Integer),
+        column("last_login_at", TIMESTAMP),
+        column("last_seen_at", TIMESTAMP),
+        name="activity",
+    ).data(rows)
+    return (
+        update(table)
+        .where(table.c.id == activity.c.id)
+        .values(
+            last_login_at=func.greatest(
+                table.c.last_login_at, cast(activity.c.last_login_at, TIMESTAMP)
+            ),
+            last_seen_at=func.greatest(
+                table.c.last_seen_at, cast(activity.c.last_seen_at, TIMESTAMP)
+            ),
+            updated_at=table.c.updated_at,
+        )
+    )
+
+
+class ActivityBuffer:
+    """
+    Отложенная запись ``last_login_at`` и ``last_seen_at`` пользователя.
+
+    Логин и запросы только обновляют словарь в памяти воркера: на
+    пользователя одна запись с самыми поздними отметками. Раз в
+    ``interval`` секунд буфер сбрасывается в БД пачками по
+    ``FLUSH_CHUNK_ROWS`` строк, при остановке — целиком.
+
+    Буфер ограничен ``max_size`` пользователями: при заполнении сброс
+    начинается сразу, а отметки новых пользователей до него теряются
+    (с предупреждением в лог) — это статистика, а не данные авторизации.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        interval: float,
+        max_size: int,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.max_size = max_size
+        self.pending: dict[int, list[datetime | None]] = {}
+        self.dropped = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _record(self, user_id: int, login: datetime | None, seen: datetime) -> None:
+        entry = self.pending.get(user_id)
+        if entry is None:
+            if len(self.pending) >= self.max_size:
+                self.dropped += 1
+                if self.dropped == 1:
+                    logger.warning("Буфер активности заполнен, отметки теряются")
+                self._wakeup.set()
+                return
+            self.pending[user_id] = [login, seen]
+            if len(self.pending) >= self.max_size:
+                self._wakeup.set()
+            return
+        entry[0] = _latest(entry[0], login)
+        entry[1] = _latest(entry[1], seen)
+
+    def record_login(self, user_id: int, at: datetime | None = None) -> None:
+        at = at or datetime.now(timezone.utc)
+        self._record(user_id, at, at)
+
+    def record_seen(self, user_id: int, at: datetime | None = None) -> None:
+        self._record(user_id, None, at or datetime.now(timezone.utc))
+
+    def _requeue(self, rows: list[tuple[int, datetime | None, datetime | None]]) -> None:
+        """Возвращает несохранённые строки, не перетирая более свежие отметки."""
+        for user_id, login, seen in rows:
+            entry = self.pending.get(user_id)
+            if entry is not None:
+                entry[0] = _latest(entry[0], login)
+                entry[1] = _latest(entry[1], seen)
+            elif len(self.pending) < self.max_size:
+                self.pending[user_id] = [login, seen]
+            else:
+                self.dropped += 1
+
+    async def flush(self) -> int:
+        """Сбрасывает буфер в БД; возвращает число записанных пользователей."""
+        self._wakeup.clear()
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, {}
+        if self.dropped:
+            logger.warning("Потеряно отметок активности: %s", self.dropped)
+            self.dropped = 0
+
+        # Одинаковый порядок строк во всех воркерах: UPDATE блокирует
+        # строки по возрастанию id и не ловит взаимных блокировок
+        rows = [(user_id, *pending[user_id]) for user_id in sorted(pending)]
+        written = 0
+        for start in range(0, len(rows), FLUSH_CHUNK_ROWS):
+            chunk = rows[start : start + FLUSH_CHUNK_ROWS]
+            try:
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        await session.execute(update_activity(chunk))
+            except asyncio.CancelledError:
+                # Остановка посреди сброса: остаток запишет stop(). Повторная
+                # запись уже сохранённой пачки безвредна благодаря GREATEST
+                self._requeue(rows[start:])
+                raise
+            except Exception:
+                logger.exception("Не удалось записать активность пользователей")
+                self._requeue(rows[start:])
+                break
+            written += len(chunk)
+        return written
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновый сброс и записывает остаток буфера."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+activity_buffer = ActivityBuffer(
+    AsyncSessionLocal,
+    interval=settings.activity_flush_interval_sec,
+    max_size=settings.activity_buffer_size,
+)
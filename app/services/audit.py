@@ -0,0 +1,164 @@
+import asyncio
+import ipaddress
+import logging
+from datetime import datetime, timezone
+from enum import StrEnum
+from typing import Any, Callable
+
+from fastapi import Request
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import AuthEvent
+from config import settings
+
+logger = logging.getLogger("users.audit")
+
+# Длины колонок auth_events: одно слишком длинное значение сорвало бы INSERT
+# всей пачки, а логин-форма длину username не ограничивает
+EMAIL_MAX_LENGTH = 320
+USER_AGENT_MAX_LENGTH = 512
+
+
+class AuditEvent(StrEnum):
+    REGISTER_REQUESTED = "register_requested"
+    VERIFIED = "verified"
+    LOGIN_SUCCEEDED = "login_succeeded"
+    LOGIN_FAILED = "login_failed"
+    REFRESHED = "refreshed"
+    LOGOUT = "logout"
+    PASSWORD_RESET_REQUESTED = "password_reset_requested"
+    PASSWORD_RESET = "password_reset"
+
+
+def _client_ip(request: Request) -> str | None:
+    if request.client is None:
+        return None
+    try:
+        return str(ipaddress.ip_address(request.client.host))
+    except ValueError:
+        # Unix-сокет или тестовый клиент: колонка INET не примет имя хоста
+        return None
+
+
+class AuditLog:
+    """
+    Запись событий аутентификации в auth_events без запроса к БД в запросе.
+
+    ``record`` только кладёт строку в ограниченную asyncio.Queue. Фоновая
+    задача набирает пачку до ``batch_size`` строк или до ``flush_interval``
+    секунд с первой и вставляет её одним многострочным INSERT. При
+    переполнении очереди события теряются с предупреждением в лог: журнал
+    не должен тормозить логин, когда БД не успевает.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(max_queue)
+        self.dropped = 0
+        # Пачка, взятая из очереди, но ещё не записанная: её допишет stop()
+        self._batch: list[dict[str, Any]] = []
+        self._task: asyncio.Task | None = None
+
+    def record(
+        self,
+        event: AuditEvent,
+        *,
+        user_id: int | None = None,
+        email: str | None = None,
+        request: Request | None = None,
+        **data: Any,
+    ) -> None:
+        ip = user_agent = None
+        if request is not None:
+            ip = _client_ip(request)
+            user_agent = request.headers.get("user-agent")
+            if user_agent:
+                user_agent = user_agent[:USER_AGENT_MAX_LENGTH]
+        try:
+            self.queue.put_nowait(
+                {
+                    "created_at": datetime.now(timezone.utc),
+                    "event": event.value,
+                    "user_id": user_id,
+                    "email": email[:EMAIL_MAX_LENGTH] if email else email,
+                    "ip": ip,
+                    "user_agent": user_agent,
+                    "data": data or None,
+                }
+            )
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1:
+                logger.warning("Очередь аудита заполнена, события теряются")
+
+    async def _fill_batch(self) -> None:
+        self._batch.append(await self.queue.get())
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(self._batch) < self.batch_size:
+            try:
+                self._batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        if self.dropped:
+            logger.warning("Потеряно событий аудита: %s", self.dropped)
+            self.dropped = 0
+        try:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    # Один INSERT ... VALUES (...), (...) на пачку: восемь
+                    # параметров на строку, до лимита asyncpg далеко
+                    await session.execute(insert(AuthEvent).values(rows))
+        except Exception:
+            logger.exception("Не удалось записать %s событий аудита", len(rows))
+
+    async def _run(self) -> None:
+        while True:
+            await self._fill_batch()
+            await self._write(self._batch)
+            self._batch = []
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую запись и дописывает очередь."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        rows, self._batch = self._batch, []
+        while not self.queue.empty():
+            rows.append(self.queue.get_nowait())
+        for start in range(0, len(rows), self.batch_size):
+            await self._write(rows[start : start + self.batch_size])
+
+
+audit_log = AuditLog(
+    AsyncSessionLocal,
+    max_queue=settings.audit_queue_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_sec,
+)
@@ -0,0 +1,84 @@
+"""
+Список одноразовых почтовых доменов для отказа в регистрации.
+
+Файл — домен в строке, ``#`` — комментарий (формат списков
+disposable-email-domains). Домен в списке закрывает и все свои поддомены:
+``mailinator.com`` отклоняет ``x.mailinator.com``. Файл перечитывается,
+когда меняется его mtime; проверка mtime — не чаще раза в ``check_interval``.
+"""
+
+import logging
+import os
+import time
+from typing import Iterable
+
+from config import settings
+
+logger = logging.getLogger("users.register")
+
+
+def parse_domains(lines: Iterable[str]) -> frozenset[str]:
+    domains = set()
+    for line in lines:
+        domain = line.partition("#")[0].strip().strip(".").lower()
+        if domain:
+            domains.add(domain)
+    return frozenset(domains)
+
+
+class DisposableDomains:
+    """Множество доменов из файла ``path``; без файла проверка выключена."""
+
+    def __init__(self, path: str, check_interval: float):
+        self.path = path
+        self.check_interval = check_interval
+        self.domains: frozenset[str] = frozenset()
+        self._mtime_ns: int | None = None
+        self._checked_at: float | None = None
+
+    def load(self) -> None:
+        """Перечитывает файл, если он изменился; ошибка оставляет прежний список."""
+        self._checked_at = time.monotonic()
+        if not self.path:
+            return
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+            if mtime_ns == self._mtime_ns:
+                return
+            with open(self.path, encoding="utf-8") as file:
+                domains = parse_domains(file)
+        except OSError:
+            logger.warning(
+                "Список одноразовых доменов %s недоступен", self.path, exc_info=True
+            )
+            return
+        self.domains = domains
+        self._mtime_ns = mtime_ns
+        logger.info("Одноразовых доменов: %s из %s", len(domains), self.path)
+
+    def _maybe_reload(self) -> None:
+        if (
+            self._checked_at is None
+            or time.monotonic() - self._checked_at >= self.check_interval
+        ):
+            self.load()
+
+    def is_disposable(self, email: str) -> bool:
+        self._maybe_reload()
+        domains = self.domains
+        if not domains:
+            return False
+        domain = email.rpartition("@")[2].lower()
+        # Сам домен и его родители до второго уровня: a.b.mailinator.com ->
+        # b.mailinator.com -> mailinator.com; по одному хэшу на метку
+        while "." in domain:
+            if domain in domains:
+                return True
+            domain = domain.partition(".")[2]
+        return False
+
+
+disposable_domains = DisposableDomains(
+    settings.disposable_domains_path,
+    check_interval=settings.disposable_domains_check_sec,
+)
@@ -1,7 +1,6 @@
 import logging
 from typing import Iterable, List, Union
 
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
 from pydantic import EmailStr
 
 from config import settings
@@ -48,6 +47,10 @@ async def send_email(
         )
         return
 
+    # fastapi_mail тянет за собой aiosmtplib, jinja2 и email_validator и заметно
+    # замедляет старт, поэтому импортируем его при первой отправке письма
+    from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
+
     message = MessageSchema(
         subject=subject,
         recipients=recipients,
@@ -0,0 +1,78 @@
+import logging
+from typing import Any, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.db.redis import get_redis
+from config import settings
+
+logger = logging.getLogger("users.etags")
+
+KEY_PREFIX = "user:etag:"
+
+
+def user_etag(user: Any) -> str:
+    """
+    Слабый ETag пользователя из ``id`` и ``updated_at``.
+
+    Слабый, так как совпадение гарантирует то же содержимое, но не те же
+    байты: порядок полей и формат JSON могут меняться между версиями.
+    """
+    version = int(user.updated_at.timestamp() * 1_000_000)
+    return f'W/"{user.id}-{version:x}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Слабое сравнение для If-None-Match (RFC 9110, 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+class UserETagCache:
+    """
+    Текущий ETag пользователя в Redis: ``user:etag:{id}``.
+
+    Позволяет ответить 304 на условный GET, не загружая пользователя из БД.
+    UserManager удаляет ключ при изменении и удалении пользователя; записи
+    в обход UserManager (SQL, CLI) устаревают не дольше ``ttl`` секунд.
+    Ошибки Redis не мешают ответу: запрос уходит по обычному пути через БД.
+    """
+
+    def __init__(self, redis_factory: Callable[[], Redis], ttl: int):
+        self._redis = redis_factory
+        self.ttl = ttl
+
+    async def get(self, user_id: Any) -> str | None:
+        if self.ttl <= 0:
+            return None
+        try:
+            raw = await self._redis().get(f"{KEY_PREFIX}{user_id}")
+        except RedisError:
+            logger.warning("Не удалось прочитать ETag пользователя", exc_info=True)
+            return None
+        return raw.decode() if raw is not None else None
+
+    async def put(self, user_id: Any, etag: str) -> None:
+        if self.ttl <= 0:
+            return
+        try:
+            await self._redis().set(f"{KEY_PREFIX}{user_id}", etag, ex=self.ttl)
+        except RedisError:
+            logger.warning("Не удалось записать ETag пользователя", exc_info=True)
+
+    async def discard(self, user_id: Any) -> None:
+        try:
+            await self._redis().delete(f"{KEY_PREFIX}{user_id}")
+        except RedisError:
+            logger.warning("Не удалось удалить ETag пользователя", exc_info=True)
+
+
+user_etag_cache = UserETagCache(get_redis, settings.user_etag_ttl_sec)
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any
+
+import httpx
+import jwt
+from httpx_oauth.clients.google import GoogleOAuth2
+from httpx_oauth.exceptions import GetIdEmailError
+
+from config import settings
+
+logger = logging.getLogger("users.oauth")
+
+GOOGLE_SCOPES = ["openid", "email", "profile"]
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class OIDCKeyCache:
+    """
+    Кэш discovery документа и JWKS OIDC провайдера.
+
+    Ключи обновляются в фоне с периодом из Cache-Control ответа JWKS,
+    поэтому проверка id_token не ходит в сеть. Неизвестный ``kid``
+    (ротация ключей у провайдера) вызывает внеочередное обновление,
+    но не чаще раза в ``min_refresh_interval`` секунд.
+    """
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        discovery_url: str,
+        refresh_interval: float,
+        min_refresh_interval: float = 60,
+    ):
+        self.http_client = http_client
+        self.discovery_url = discovery_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.discovery: dict[str, Any] | None = None
+        self.keys: dict[str, jwt.PyJWK] = {}
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    async def _fetch_json(self, url: str) -> httpx.Response:
+        response = await self.http_client.get(url)
+        response.raise_for_status()
+        return response
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            if self.discovery is None:
+                self.discovery = (await self._fetch_json(self.discovery_url)).json()
+            response = await self._fetch_json(self.discovery["jwks_uri"])
+            self.keys = {
+                key["kid"]: jwt.PyJWK(key) for key in response.json()["keys"]
+            }
+            self._refreshed_at = time.monotonic()
+            match = MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+            if match:
+                self.refresh_interval = max(self.min_refresh_interval, int(match[1]))
+        logger.info("JWKS обновлён: %s ключей", len(self.keys))
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Не удалось обновить JWKS")
+
+    async def ensure_started(self) -> None:
+        if self.discovery is None:
+            await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def get_key(self, kid: str) -> jwt.PyJWK:
+        await self.ensure_started()
+        key = self.keys.get(kid)
+        if key is None and (
+            time.monotonic() - self._refreshed_at > self.min_refresh_interval
+        ):
+            await self.refresh()
+            key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown key id: {kid}")
+        return key
+
+    @property
+    def issuers(self) -> list[str]:
+        issuer = self.discovery["issuer"]
+        # Google выдаёт iss как с https://, так и без схемы
+        return [issuer, issuer.removeprefix("https://")]
+
+
+class GoogleOAuth2Pooled(GoogleOAuth2):
+    """
+    Google клиент с общим keep-alive httpx клиентом и локальной проверкой id_token.
+
+    Роутер fastapi-users вызывает get_access_token, затем get_id_email
+    с access token. id_token из ответа на обмен кода запоминается
+    на короткое время, и id/email берутся из его проверенных claim'ов
+    вместо отдельного запроса к People API.
+    """
+
+    id_token_ttl = 60
+    id_token_cache_size = 1024
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        http_client: httpx.AsyncClient,
+        keys: OIDCKeyCache,
+    ):
+        super().__init__(client_id, client_secret, scopes=GOOGLE_SCOPES)
+        self.http_client = http_client
+        self.keys = keys
+        self._id_tokens: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get_httpx_client(self):
+        # Клиент общий на воркер: соединения к Google переиспользуются
+        return nullcontext(self.http_client)
+
+    async def get_access_token(self, code, redirect_uri, code_verifier=None):
+        token = await super().get_access_token(code, redirect_uri, code_verifier)
+        id_token = token.get("id_token")
+        if id_token:
+            self._id_tokens[token["access_token"]] = (time.monotonic(), id_token)
+            while len(self._id_tokens) > self.id_token_cache_size:
+                self._id_tokens.popitem(last=False)
+        return token
+
+    async def verify_id_token(self, id_token: str) -> dict[str, Any]:
+        kid = jwt.get_unverified_header(id_token).get("kid", "")
+        key = await self.keys.get_key(kid)
+        return jwt.decode(
+            id_token,
+            key.key,
+            algorithms=["RS256"],
+            audience=self.client_id,
+            issuer=self.keys.issuers,
+        )
+
+    async def get_id_email(self, token: str) -> tuple[str, str | None]:
+        issued_at, id_token = self._id_tokens.pop(token, (0.0, None))
+        if id_token is None or time.monotonic() - issued_at > self.id_token_ttl:
+            return await super().get_id_email(token)
+
+        try:
+            claims = await self.verify_id_token(id_token)
+        except (jwt.PyJWTError, httpx.HTTPError) as exc:
+            logger.warning("id_token Google не прошёл проверку: %s", exc)
+            raise GetIdEmailError() from exc
+
+        # Тот же формат id, что отдаёт People API (resourceName), чтобы
+        # уже привязанные аккаунты находились по account_id.
+        email = claims.get("email") if claims.get("email_verified") else None
+        return f"people/{claims['sub']}", email
+
+    async def aclose(self) -> None:
+        await self.keys.stop()
+        await self.http_client.aclose()
+
+
+def build_google_oauth_client() -> GoogleOAuth2Pooled:
+    http_client = httpx.AsyncClient(
+        timeout=settings.oauth_http_timeout_sec,
+        limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+    )
+    keys = OIDCKeyCache(
+        http_client,
+        settings.google_oidc_discovery_url,
+        refresh_interval=settings.google_jwks_refresh_sec,
+    )
+    return GoogleOAuth2Pooled(
+        settings.google_oauth_client_id,
+        settings.google_oauth_client_secret,
+        http_client,
+        keys,
+    )
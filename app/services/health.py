@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+from app.db.database import engine
+from app.db.redis import get_redis
+from config import settings
+
+logger = logging.getLogger("uvicorn")
+
+Check = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class CheckResult:
+    ok: bool
+    latency_ms: float
+    checked_at: float
+    error: str | None = None
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class HealthMonitor:
+    """
+    Проверяет зависимости в фоне и хранит последние результаты.
+
+    Пробы Kubernetes читают только кэш, поэтому их число не влияет
+    на нагрузку на БД, Redis и SMTP: проверки идут раз в ``interval`` секунд.
+    """
+
+    def __init__(
+        self,
+        checks: dict[str, Check],
+        interval: float,
+        timeout: float,
+        optional: frozenset[str] = frozenset(),
+    ):
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+        self.optional = optional
+        self.results: dict[str, CheckResult] = {}
+        self._task: asyncio.Task | None = None
+
+    async def _run_check(self, name: str, check: Check) -> None:
+        start = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.results[name] = CheckResult(error is None, latency_ms, time.time(), error)
+
+    async def refresh(self) -> None:
+        await asyncio.gather(
+            *(self._run_check(name, check) for name, check in self.checks.items())
+        )
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Ошибка фоновой проверки зависимостей")
+
+    async def start(self) -> None:
+        await self.refresh()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_ready(self) -> bool:
+        # Результаты старше трёх интервалов значат, что фоновая задача встала
+        stale_before = time.time() - 3 * self.interval
+        for name in self.checks:
+            if name in self.optional:
+                continue
+            result = self.results.get(name)
+            if result is None or not result.ok or result.checked_at < stale_before:
+                return False
+        return True
+
+
+async def check_db() -> None:
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def check_redis() -> None:
+    await get_redis().ping()
+
+
+async def check_smtp() -> None:
+    """Проверяем только доступность SMTP порта, без авторизации и отправки."""
+    if settings.debug or not settings.mail_server:
+        return
+    _, writer = await asyncio.open_connection(settings.mail_server, settings.mail_port)
+    writer.close()
+    await writer.wait_closed()
+
+
+health_monitor = HealthMonitor(
+    {"db": check_db, "redis": check_redis, "smtp": check_smtp},
+    interval=settings.health_check_interval_sec,
+    timeout=settings.health_check_timeout_sec,
+    # Без почты сервис продолжает логинить пользователей
+    optional=frozenset({"smtp"}),
+)
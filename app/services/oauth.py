@@ -0,0 +1,44 @@
+import logging
+from typing import Any, Callable
+
+logger = logging.getLogger("users.oauth")
+
+
+class LazyOAuth2Client:
+    """
+    Откладывает создание OAuth2 клиента до первого обращения.
+
+    Роутер fastapi-users при сборке читает только ``name``, поэтому
+    сам клиент (и его зависимости) создаётся при первом OAuth запросе.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._client = None
+
+    def get_client(self):
+        if self._client is None:
+            self._client = self._factory()
+            logger.info("OAuth клиент %s инициализирован.", self.name)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and hasattr(self._client, "aclose"):
+            await self._client.aclose()
+        self._client = None
+
+    def __getattr__(self, item: str):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return getattr(self.get_client(), item)
+
+
+def create_google_oauth_client():
+    # httpx_oauth.clients.google и JWKS кэш нужны только для OAuth входа
+    from app.services.google_oauth import build_google_oauth_client
+
+    return build_google_oauth_client()
+
+
+google_oauth_client = LazyOAuth2Client("google", create_google_oauth_client)
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi_users.password import PasswordHelper
+
+from config import settings
+
+logger = logging.getLogger("users.passwords")
+
+
+class PasswordHashExecutor:
+    """
+    Выполняет хэширование паролей в отдельном пуле потоков.
+
+    Argon2 занимает десятки миллисекунд CPU и отпускает GIL, поэтому
+    в пуле потоков он не блокирует event loop воркера.
+    """
+
+    def __init__(self, helper: PasswordHelper, max_workers: int):
+        self.helper = helper
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hash"
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.helper.hash, password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self._run(
+            self.helper.verify_and_update, plain_password, hashed_password
+        )
+
+    async def warmup(self) -> None:
+        """Первое хэширование выделяет память Argon2 в каждом потоке пула."""
+        await asyncio.gather(
+            *(self.hash("warmup-password") for _ in range(self.max_workers))
+        )
+
+
+password_helper = PasswordHelper()
+password_hasher = PasswordHashExecutor(password_helper, settings.password_hash_workers)
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import logging
+from typing import Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.db.redis import get_redis
+from config import settings
+
+logger = logging.getLogger("users.refresh")
+
+KEY_PREFIX = "refresh:grace:"
+
+
+class RefreshGraceCache:
+    """
+    Окно, в течение которого повторный refresh старым токеном отдаёт ту же пару.
+
+    Несколько вкладок браузера шлют /refresh с одной cookie одновременно:
+    первая ротирует токен, остальные получают из Redis ту же новую пару
+    вместо 401 и повторного логина. Ключ — SHA-256 старого токена, TTL —
+    ``ttl`` секунд; после него старый токен снова одноразовый.
+    """
+
+    def __init__(self, redis_factory: Callable[[], Redis], ttl: int):
+        self._redis = redis_factory
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return KEY_PREFIX + hashlib.sha256(token.encode()).hexdigest()
+
+    async def get(self, token: str) -> tuple[str, str] | None:
+        """Пара (access, refresh), выданная при ротации ``token``, если окно не истекло."""
+        if self.ttl <= 0:
+            return None
+        try:
+            raw = await self._redis().get(self._key(token))
+        except RedisError:
+            logger.warning("Не удалось прочитать окно refresh", exc_info=True)
+            return None
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return data["access_token"], data["refresh_token"]
+
+    async def put(self, token: str, access_token: str, refresh_token: str) -> None:
+        """
+        Запоминает преемников ``token``.
+
+        Вызывается до commit ротации: запросы, ждущие блокировку строки,
+        после commit уже найдут пару в кэше.
+        """
+        if self.ttl <= 0:
+            return
+        payload = json.dumps(
+            {"access_token": access_token, "refresh_token": refresh_token}
+        )
+        try:
+            await self._redis().set(self._key(token), payload, ex=self.ttl)
+        except RedisError:
+            logger.warning("Не удалось записать окно refresh", exc_info=True)
+
+    async def discard(self, token: str) -> None:
+        try:
+            await self._redis().delete(self._key(token))
+        except RedisError:
+            logger.warning("Не удалось удалить окно refresh", exc_info=True)
+
+
+refresh_grace_cache = RefreshGraceCache(get_redis, settings.refresh_grace_sec)
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Iterator
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.db.redis import get_redis
+from config import settings
+
+logger = logging.getLogger("users.revocation")
+
+KEY_PREFIX = "revoked:"
+
+
+class BloomFilter:
+    """
+    Фильтр Блума по строковым ключам.
+
+    Ложноположительные ответы возможны (с вероятностью ``error_rate`` при
+    заполнении до ``capacity``), ложноотрицательные — нет.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Двойное хэширование по встроенному hash(): k позиций из двух половин
+        # 64-битного значения. Соль hash() своя у каждого процесса, но фильтр
+        # и так строится в каждом воркере отдельно.
+        value = hash(item) & 0xFFFFFFFFFFFFFFFF
+        position = value & 0xFFFFFFFF
+        step = (value >> 32) | 1
+        size = self.size
+        for _ in range(self.hashes):
+            yield position % size
+            position += step
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        # Тот же расчёт позиций, что в _positions, но без генератора:
+        # это горячий путь каждого запроса, и обычно он выходит на первом бите
+        value = hash(item) & 0xFFFFFFFFFFFFFFFF
+        position = value & 0xFFFFFFFF
+        step = (value >> 32) | 1
+        size = self.size
+        bits = self._bits
+        for _ in range(self.hashes):
+            index = position % size
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+            position += step
+        return True
+
+
+class TokenDenylist:
+    """
+    Список отозванных access токенов.
+
+    Источник истины — ключи ``revoked:{jti}`` в Redis с TTL до истечения
+    токена. Каждый воркер держит фильтр Блума по этим jti и дополняет его
+    сообщениями из канала pub/sub, поэтому неотозванный токен проверяется
+    без обращения к Redis. В Redis идут только попадания в фильтр и все
+    проверки, пока фильтр не синхронизирован.
+    """
+
+    def __init__(
+        self,
+        redis_factory: Callable[[], Redis],
+        channel: str,
+        capacity: int,
+        error_rate: float,
+        rebuild_interval: float,
+    ):
+        self._redis = redis_factory
+        self.channel = channel
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self._bloom = self._new_filter()
+        # Фильтр, который сейчас собирается из Redis: сообщения, пришедшие
+        # во время сканирования, попадают и в него
+        self._building: BloomFilter | None = None
+        self._synced = False
+        self._task: asyncio.Task | None = None
+
+    def _new_filter(self) -> BloomFilter:
+        return BloomFilter(self.capacity, self.error_rate)
+
+    def _remember(self, jti: str) -> None:
+        self._bloom.add(jti)
+        if self._building is not None:
+            self._building.add(jti)
+
+    async def revoke(self, jti: str, ttl: int) -> None:
+        """
+        Отзывает токен до его истечения; уже истёкший токен пропускается.
+
+        Без Redis отзыв не сохраняется, но и не падает: logout должен
+        завершиться и очистить cookie, токен доживёт до своего exp.
+        """
+        if ttl <= 0:
+            return
+        self._remember(jti)
+        redis = self._redis()
+        try:
+            await redis.set(KEY_PREFIX + jti, 1, ex=ttl)
+            await redis.publish(self.channel, jti)
+        except RedisError:
+            logger.warning("Не удалось отозвать токен %s", jti, exc_info=True)
+
+    async def is_revoked(self, jti: str) -> bool:
+        if self._synced and jti not in self._bloom:
+            return False
+        try:
+            return bool(await self._redis().exists(KEY_PREFIX + jti))
+        except RedisError:
+            # Без Redis отказ в доступе всем пользователям хуже, чем
+            # доживший до exp отозванный токен
+            logger.warning("Не удалось проверить отзыв токена %s", jti, exc_info=True)
+            return False
+
+    async def rebuild(self) -> None:
+        """Пересобирает фильтр из Redis, выбрасывая истёкшие jti."""
+        self._building = self._new_filter()
+        try:
+            async for key in self._redis().scan_iter(
+                match=KEY_PREFIX + "*", count=1000
+            ):
+                if isinstance(key, bytes):
+                    key = key.decode()
+                self._building.add(key[len(KEY_PREFIX):])
+            self._bloom = self._building
+        finally:
+            self._building = None
+
+    async def _listen(self) -> None:
+        pubsub = self._redis().pubsub()
+        try:
+            # Подписка до сканирования, чтобы не потерять отзывы между ними
+            await pubsub.subscribe(self.channel)
+            await self.rebuild()
+            self._synced = True
+            rebuilt_at = time.monotonic()
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if message is not None:
+                    data = message["data"]
+                    self._remember(data.decode() if isinstance(data, bytes) else data)
+                if time.monotonic() - rebuilt_at >= self.rebuild_interval:
+                    await self.rebuild()
+                    rebuilt_at = time.monotonic()
+        finally:
+            self._synced = False
+            await pubsub.aclose()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Синхронизация отозванных токенов прервана")
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+token_denylist = TokenDenylist(
+    get_redis,
+    channel=settings.revocation_channel,
+    capacity=settings.revocation_bloom_capacity,
+    error_rate=settings.revocation_bloom_error_rate,
+    rebuild_interval=settings.revocation_bloom_rebuild_sec,
+)
@@ -1,4 +1,6 @@
 import logging
+import time
+from contextlib import suppress
 from typing import Generic
 
 import jwt
@@ -18,13 +20,21 @@ from fastapi_users.authentication import (
     Strategy,
 )
 from fastapi_users.db import SQLAlchemyUserDatabase
-from fastapi_users.jwt import decode_jwt, generate_jwt
-from httpx_oauth.clients.google import GoogleOAuth2
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi_users.jwt import JWT_ALGORITHM, _get_secret_value, decode_jwt, generate_jwt
 
 from app.db.database import AsyncSessionLocal, get_async_session, get_user_db
 from app.db.models import User, RefreshToken
 from app.routes.register import get_register_router, get_verify_router
+from app.services.activity import activity_buffer
+from app.services.audit import AuditEvent, audit_log
+from app.services.breached import breached_passwords
 from app.services.email import send_email
+from app.services.etags import user_etag_cache
+from app.services.oauth import google_oauth_client
+from app.services.passwords import password_hasher, password_helper
+from app.services.revocation import token_denylist
+from app.utils.jwt_encoder import get_access_token_encoder, new_jti
 from config import settings
 
 logger = logging.getLogger("users.servises")
@@ -32,26 +42,111 @@ logger = logging.getLogger("users.servises")
 
 SECRET = settings.jwt_secret
 
-google_oauth_client = GoogleOAuth2(
-    settings.google_oauth_client_id,
-    settings.google_oauth_client_secret,
-)
+class JWTStrategyCustom(JWTStrategy):
+    """
+    Переопределяет payload JWT и добавляет отзыв токенов по jti.
 
+    Хранит сессию БД текущего запроса, чтобы AuthenticationBackendCustom.login
+    записывал refresh token в той же транзакции, где искали пользователя,
+    и сам запрос — для IP и User-Agent события выхода в журнале аудита.
+    """
 
-class JWTStrategyCustom(JWTStrategy):
-    """Переопределяет payload JWT"""
+    def __init__(
+        self,
+        *args,
+        session: AsyncSession | None = None,
+        request: Request | None = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.session = session
+        self.request = request
+        # Стратегия создаётся на запрос: (токен, payload) последней проверки
+        self._claims: tuple[str, dict | None] | None = None
 
     async def write_token(self, user: models.UP) -> str:
+        if self.algorithm == JWT_ALGORITHM:
+            encoder = get_access_token_encoder(
+                _get_secret_value(self.encode_key),
+                self.lifetime_seconds,
+                settings.gateway_name,
+            )
+            return encoder.encode(
+                user.id, bool(user.is_verified), bool(user.is_superuser)
+            )
         data = {
             "sub": str(user.id),
             "is_active": bool(user.is_verified),
             "is_superuser": bool(user.is_superuser),
             "aud": settings.gateway_name,
+            "jti": new_jti(),
         }
         return generate_jwt(
             data, self.encode_key, self.lifetime_seconds, algorithm=self.algorithm
         )
 
+    def _decode(self, token: str) -> dict | None:
+        try:
+            return decode_jwt(
+                token, self.decode_key, self.token_audience, algorithms=[self.algorithm]
+            )
+        except jwt.PyJWTError:
+            return None
+
+    async def read_claims(self, token: str | None) -> dict | None:
+        """
+        Payload действующего неотозванного токена, без обращения к БД.
+
+        Результат запоминается: /me проверяет токен в me_not_modified и снова
+        в current_active_user, а проверка отзыва и record_seen нужны один раз.
+        """
+        if token is None:
+            return None
+        if self._claims is not None and self._claims[0] == token:
+            return self._claims[1]
+        data = await self._read_claims(token)
+        self._claims = (token, data)
+        return data
+
+    async def _read_claims(self, token: str) -> dict | None:
+        data = self._decode(token)
+        if data is None or data.get("sub") is None:
+            return None
+
+        # Токены, выпущенные до появления jti, отозвать нельзя
+        jti = data.get("jti")
+        if jti is not None and await token_denylist.is_revoked(jti):
+            return None
+
+        with suppress(ValueError):
+            activity_buffer.record_seen(int(data["sub"]))
+        return data
+
+    async def read_token(
+        self, token: str | None, user_manager: BaseUserManager[models.UP, models.ID]
+    ) -> models.UP | None:
+        data = await self.read_claims(token)
+        if data is None:
+            return None
+
+        try:
+            parsed_id = user_manager.parse_id(data["sub"])
+            return await user_manager.get(parsed_id)
+        except (exceptions.UserNotExists, exceptions.InvalidID):
+            return None
+
+    async def destroy_token(self, token: str, user: models.UP) -> None:
+        """Отзывает access токен на оставшееся время его жизни."""
+        audit_log.record(AuditEvent.LOGOUT, user_id=user.id, request=self.request)
+        self._claims = None
+        data = self._decode(token)
+        if data is None or data.get("jti") is None:
+            return
+        exp = data.get("exp")
+        ttl = exp - int(time.time()) if exp else self.lifetime_seconds
+        if ttl:
+            await token_denylist.revoke(data["jti"], ttl)
+
 
 class FastAPIUsersCustomRegister(
     FastAPIUsers[models.UP, models.ID], Generic[models.UP, models.ID]
@@ -85,15 +180,87 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
     verification_token_secret = SECRET
     verification_token_lifetime_seconds = 10 * 60  #  Токен живет 10 минут.
 
+    def __init__(self, *args, request: Request | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Запрос, в котором создан менеджер: authenticate() его не получает,
+        # а журналу аудита нужны IP и User-Agent неудачного логина
+        self.request = request
+
+    async def authenticate(self, credentials) -> User | None:
+        """То же, что в BaseUserManager, но Argon2 считается в пуле потоков."""
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            # Хэшируем пароль, чтобы время ответа не выдавало наличие email
+            await password_hasher.hash(credentials.password)
+            audit_log.record(
+                AuditEvent.LOGIN_FAILED,
+                email=credentials.username,
+                request=self.request,
+            )
+            return None
+
+        verified, updated_password_hash = await password_hasher.verify_and_update(
+            credentials.password, user.hashed_password
+        )
+        if not verified:
+            audit_log.record(
+                AuditEvent.LOGIN_FAILED,
+                user_id=user.id,
+                email=user.email,
+                request=self.request,
+            )
+            return None
+        if updated_password_hash is not None:
+            await self.user_db.update(user, {"hashed_password": updated_password_hash})
+
+        return user
+
+    async def validate_password(self, password: str, user) -> None:
+        """Отклоняет пароли из базы утечек: поиск в mmap-файле, без сети."""
+        if password in breached_passwords:
+            raise exceptions.InvalidPasswordException(
+                reason="This password has appeared in a data breach, choose another one."
+            )
+
     async def on_after_register(self, user: User, request: Request | None = None):
         logger.info(f"Пользователь {user.id} Зарегистрировался.")
 
+    async def on_after_update(
+        self, user: User, update_dict: dict, request: Request | None = None
+    ):
+        await user_etag_cache.discard(user.id)
+
+    async def on_after_delete(self, user: User, request: Request | None = None):
+        await user_etag_cache.discard(user.id)
+
+    async def on_after_login(
+        self,
+        user: User,
+        request: Request | None = None,
+        response: Response | None = None,
+    ):
+        audit_log.record(
+            AuditEvent.LOGIN_SUCCEEDED, user_id=user.id, email=user.email, request=request
+        )
+
     async def on_after_forgot_password(
         self, user: User, token: str, request: Request | None = None
     ):
         logger.info(
             f"Пользователь {user.id} Запросил сброс пользователя. Токен: {token}"
         )
+        audit_log.record(
+            AuditEvent.PASSWORD_RESET_REQUESTED,
+            user_id=user.id,
+            email=user.email,
+            request=request,
+        )
+
+    async def on_after_reset_password(self, user: User, request: Request | None = None):
+        audit_log.record(
+            AuditEvent.PASSWORD_RESET, user_id=user.id, email=user.email, request=request
+        )
 
     async def on_after_request_verify(
         self, user: User, token: str, request: Request | None = None
@@ -129,6 +296,9 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
             "Пользователь запросил регистрацию, отправлено письмо на почту %s.",
             user_dict["email"],
         )
+        audit_log.record(
+            AuditEvent.REGISTER_REQUESTED, email=user_dict["email"], request=request
+        )
 
     async def verify(self, token: str, request: Request | None = None) -> models.UP:
         """Проверяем токен на валидность и создаем пользователя"""
@@ -152,14 +322,20 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
         if aud != self.verification_token_audience:
             raise exceptions.InvalidVerifyToken()
 
-        existing_user = await self.user_db.get_by_email(email)
-        if existing_user is not None:
-            raise exceptions.UserAlreadyExists()
-
         data["is_verified"] = True
 
-        created_user = await self.user_db.create(data)
+        # Проверка существования и вставка — один запрос, повторный переход
+        # по ссылке или гонка двух запросов дают UserAlreadyExists.
+        created_user = await self.user_db.create_if_not_exists(data)
+        if created_user is None:
+            raise exceptions.UserAlreadyExists()
 
+        audit_log.record(
+            AuditEvent.VERIFIED,
+            user_id=created_user.id,
+            email=created_user.email,
+            request=request,
+        )
         return created_user
 
 
@@ -251,18 +427,28 @@ class AuthenticationBackendCustom(AuthenticationBackend[User, int]):
         user: models.UP,
     ) -> Response:
         access_token = await strategy.write_token(user)
-
-        async with self.session_factory() as session:
-            async with session.begin():
-                refresh_token = RefreshToken.create(user.id)
-                session.add(refresh_token)
+        refresh_token = RefreshToken.create(user.id)
+        activity_buffer.record_login(user.id)
+
+        session = getattr(strategy, "session", None)
+        if session is not None:
+            # Сессия запроса уже держит соединение после поиска пользователя:
+            # одно соединение из пула и один commit на логин.
+            session.add(refresh_token)
+            await session.commit()
+        else:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    session.add(refresh_token)
         return await self.transport.get_login_response(
             access_token, refresh_token.token
         )
 
 
-async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db)):
-    yield UserManager(user_db)
+async def get_user_manager(
+    request: Request, user_db: SQLAlchemyUserDatabase = Depends(get_user_db)
+):
+    yield UserManager(user_db, password_helper, request=request)
 
 
 cookie_transport = CookieTransportCustom(
@@ -271,10 +457,12 @@ cookie_transport = CookieTransportCustom(
 )
 
 
-def get_strategy() -> Strategy[models.UP, models.ID]:
+def get_strategy(
+    request: Request, session: AsyncSession = Depends(get_async_session)
+) -> Strategy[models.UP, models.ID]:
     return JWTStrategyCustom(
         secret=SECRET, lifetime_seconds=settings.access_token_expire_sec,
-        token_audience=settings.gateway_name
+        token_audience=settings.gateway_name, session=session, request=request,
     )
 
 
@@ -288,3 +476,4 @@ auth_backend = AuthenticationBackendCustom(
 fastapi_users = FastAPIUsersCustomRegister[User, int](get_user_manager, [auth_backend])
 
 current_active_user = fastapi_users.current_user(active=True)
+current_superuser = fastapi_users.current_user(active=True, superuser=True)
@@ -0,0 +1,94 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from functools import lru_cache
+
+from fastapi_users.jwt import JWT_ALGORITHM, SecretType, _get_secret_value
+
+# Заголовок, который PyJWT формирует для HS256: ключи отсортированы,
+# разделители без пробелов. Он не меняется, поэтому кодируем его один раз.
+_HEADER_SEGMENT = base64.urlsafe_b64encode(
+    json.dumps(
+        {"alg": JWT_ALGORITHM, "typ": "JWT"}, separators=(",", ":"), sort_keys=True
+    ).encode()
+).rstrip(b"=")
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _json_str(value: str) -> str:
+    """JSON-строка в том же виде, что и json.dumps (ensure_ascii=True)."""
+    if value.isascii() and value.isalnum():
+        return f'"{value}"'
+    return json.dumps(value)
+
+
+def new_jti() -> str:
+    """Идентификатор токена для отзыва: 128 бит, hex без экранирования в JSON."""
+    return secrets.token_hex(16)
+
+
+class AccessTokenEncoder:
+    """
+    Специализированный HS256-подписчик для access токена.
+
+    Набор claim'ов фиксирован (sub, is_active, is_superuser, aud, jti, exp),
+    поэтому payload собирается по шаблону, а не через json.dumps.
+    Результат побайтно совпадает с generate_jwt/PyJWT для тех же данных.
+    """
+
+    def __init__(
+        self,
+        secret: SecretType,
+        lifetime_seconds: int | None,
+        audience: str,
+    ):
+        self.lifetime_seconds = lifetime_seconds
+        self._hmac = hmac.new(
+            _get_secret_value(secret).encode("utf-8"), digestmod=hashlib.sha256
+        )
+        self._audience = json.dumps(audience)
+
+    def encode(self, user_id: object, is_active: bool, is_superuser: bool) -> str:
+        exp = None
+        if self.lifetime_seconds:
+            exp = int(time.time()) + self.lifetime_seconds
+        return self.encode_with_exp(user_id, is_active, is_superuser, exp, new_jti())
+
+    def encode_with_exp(
+        self,
+        user_id: object,
+        is_active: bool,
+        is_superuser: bool,
+        exp: int | None,
+        jti: str,
+    ) -> str:
+        payload = (
+            f'{{"sub":{_json_str(str(user_id))},'
+            f'"is_active":{"true" if is_active else "false"},'
+            f'"is_superuser":{"true" if is_superuser else "false"},'
+            f'"aud":{self._audience},'
+            f'"jti":{_json_str(jti)}'
+        )
+        if exp is not None:
+            payload += f',"exp":{exp}}}'
+        else:
+            payload += "}"
+
+        signing_input = _HEADER_SEGMENT + b"." + _b64url(payload.encode("utf-8"))
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return (signing_input + b"." + _b64url(mac.digest())).decode("ascii")
+
+
+@lru_cache(maxsize=8)
+def get_access_token_encoder(
+    secret: str, lifetime_seconds: int | None, audience: str
+) -> AccessTokenEncoder:
+    """Кэширует подписчик: HMAC-ключ готовится один раз на набор настроек."""
+    return AccessTokenEncoder(secret, lifetime_seconds, audience)
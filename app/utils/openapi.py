@@ -0,0 +1,42 @@
+import json
+import logging
+import os
+import sys
+
+from fastapi import FastAPI
+
+logger = logging.getLogger("uvicorn")
+
+
+def use_prebuilt_openapi(app: FastAPI, path: str) -> None:
+    """
+    Подменяет app.openapi: схема берётся из файла, собранного при сборке образа.
+
+    Если файла нет (локальная разработка), схема генерируется как обычно.
+    """
+    generate = app.openapi
+
+    def openapi() -> dict:
+        if app.openapi_schema is None and os.path.exists(path):
+            with open(path, "rb") as f:
+                app.openapi_schema = json.load(f)
+            logger.info("OpenAPI схема загружена из %s", path)
+        return app.openapi_schema or generate()
+
+    app.openapi = openapi
+
+
+def build_openapi(path: str) -> None:
+    """Генерирует OpenAPI схему приложения и сохраняет её в файл."""
+    from main import app
+
+    app.openapi_schema = None
+    schema = FastAPI.openapi(app)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, ensure_ascii=False, separators=(",", ":"))
+
+
+if __name__ == "__main__":
+    from config import settings
+
+    build_openapi(sys.argv[1] if len(sys.argv) > 1 else settings.openapi_schema_path)
@@ -0,0 +1,54 @@
+import logging
+import time
+
+
+class Progress:
+    """Считает обработанные строки и пишет в лог скорость и оценку оставшегося времени."""
+
+    def __init__(self, label: str, logger: logging.Logger, total: int | None = None):
+        self.label = label
+        self.logger = logger
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> float | None:
+        if not self.total or not self.rate:
+            return None
+        return max(0, self.total - self.done) / self.rate
+
+    def advance(self, rows: int) -> None:
+        self.done += rows
+        eta = self.eta()
+        if self.total:
+            self.logger.info(
+                "%s: %s/%s строк (%.1f%%), %.0f строк/с, осталось ~%.0f с",
+                self.label,
+                self.done,
+                self.total,
+                100 * self.done / self.total,
+                self.rate,
+                eta or 0,
+            )
+        else:
+            self.logger.info(
+                "%s: %s строк, %.0f строк/с", self.label, self.done, self.rate
+            )
+
+    def finish(self) -> None:
+        self.logger.info(
+            "%s: готово, %s строк за %.1f с (%.0f строк/с)",
+            self.label,
+            self.done,
+            self.elapsed,
+            self.rate,
+        )
@@ -0,0 +1,110 @@
+"""
+Быстрая сериализация ответов.
+
+FastAPI для ``response_model`` заново валидирует возвращённый объект,
+прогоняет его через ``jsonable_encoder`` и ``json.dumps``. Для горячих
+ответов (UserRead и ошибки 400/401) JSON собирается сразу в pydantic-core
+или берётся готовым.
+"""
+
+import json
+from functools import lru_cache
+from http import HTTPStatus
+from typing import Any, TypeVar
+
+from fastapi import Request
+from fastapi.exception_handlers import http_exception_handler as default_handler
+from fastapi.responses import JSONResponse, Response
+from fastapi_users.router.common import ErrorCode
+from pydantic import BaseModel, TypeAdapter
+from starlette.exceptions import HTTPException
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse на orjson, если он установлен."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    """Один TypeAdapter на схему: сборка валидатора и сериализатора дорогая."""
+    return TypeAdapter(tp)
+
+
+@lru_cache(maxsize=None)
+def _field_names(schema: type[BaseModel]) -> tuple[str, ...]:
+    return tuple(schema.model_fields)
+
+
+def construct_model(schema: type[M], obj: Any) -> M:
+    """
+    Модель из атрибутов ORM-объекта без валидации.
+
+    Данные из БД уже прошли валидацию при записи, а повторная проверка
+    EmailStr стоит больше, чем вся остальная сериализация ответа.
+    """
+    return schema.model_construct(
+        **{name: getattr(obj, name) for name in _field_names(schema)}
+    )
+
+
+def model_response(schema: Any, obj: Any, status_code: int = 200) -> Response:
+    """
+    Ответ со схемой ``schema`` из модели или ORM-объекта.
+
+    Эквивалент ``response_model=schema``, но без повторной валидации
+    и jsonable_encoder: JSON пишет pydantic-core.
+    """
+    if not isinstance(obj, schema):
+        obj = construct_model(schema, obj)
+    return Response(
+        content=type_adapter(schema).dump_json(obj),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+# Тела ошибок с фиксированным detail собираются один раз: коды fastapi-users
+# и стандартные фразы, которые HTTPException подставляет без detail
+ERROR_PAYLOADS: dict[str, bytes] = {
+    detail: dumps({"detail": detail})
+    for detail in (
+        *(code.value for code in ErrorCode),
+        *(HTTPStatus(code).phrase for code in (400, 401, 403, 404)),
+    )
+}
+
+
+def register_error_payloads(*details: str) -> None:
+    """Добавляет постоянные detail модуля в заготовленные тела ошибок."""
+    for detail in details:
+        ERROR_PAYLOADS[detail] = dumps({"detail": detail})
+
+
+async def http_exception_handler(request: Request, exc: HTTPException) -> Response:
+    """Отдаёт заготовленное тело для ошибок со строковым detail."""
+    if isinstance(exc.detail, str) and exc.detail in ERROR_PAYLOADS:
+        return Response(
+            content=ERROR_PAYLOADS[exc.detail],
+            status_code=exc.status_code,
+            headers=exc.headers,
+            media_type="application/json",
+        )
+    return await default_handler(request, exc)
@@ -0,0 +1,52 @@
+"""
+Бенчмарк выпуска access токена.
+
+Запуск: python benchmarks/bench_jwt.py
+"""
+
+import os
+import sys
+import timeit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from fastapi_users.jwt import generate_jwt  # noqa: E402
+
+from app.utils.jwt_encoder import AccessTokenEncoder  # noqa: E402
+from config import settings  # noqa: E402
+
+NUMBER = 50_000
+
+
+def generic() -> str:
+    data = {
+        "sub": "12345",
+        "is_active": True,
+        "is_superuser": False,
+        "aud": settings.gateway_name,
+    }
+    return generate_jwt(data, settings.jwt_secret, settings.access_token_expire_sec)
+
+
+encoder = AccessTokenEncoder(
+    settings.jwt_secret, settings.access_token_expire_sec, settings.gateway_name
+)
+
+
+def fast() -> str:
+    return encoder.encode(12345, True, False)
+
+
+def main() -> None:
+    for name, func in (("generate_jwt", generic), ("AccessTokenEncoder", fast)):
+        seconds = min(timeit.repeat(func, number=NUMBER, repeat=3))
+        print(
+            f"{name:>20}: {NUMBER / seconds:>10,.0f} tokens/s "
+            f"({seconds / NUMBER * 1e6:.2f} µs/token)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Бенчмарк сериализации ответов: UserRead, страница пользователей и ошибки.
+
+Сравнивает путь FastAPI для response_model (повторная валидация,
+jsonable_encoder, json.dumps) с app.utils.responses.
+
+Запуск: python benchmarks/bench_serialization.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from fastapi_users.router.common import ErrorCode  # noqa: E402
+
+from app.schemas.users import UserPage, UserRead  # noqa: E402
+from app.utils.responses import (  # noqa: E402
+    ERROR_PAYLOADS,
+    construct_model,
+    model_response,
+)
+
+NUMBER = 20_000
+LOOP = asyncio.new_event_loop()
+
+USERS = [
+    SimpleNamespace(
+        id=n,
+        email=f"user{n}@example.com",
+        is_active=True,
+        is_superuser=False,
+        is_verified=True,
+    )
+    for n in range(100)
+]
+USER_FIELD = create_model_field("response", UserRead, mode="serialization")
+PAGE_FIELD = create_model_field("response", UserPage, mode="serialization")
+
+
+def _default(field, content) -> bytes:
+    """То, что делает FastAPI для обработчика с response_model."""
+    data = LOOP.run_until_complete(
+        serialize_response(field=field, response_content=content)
+    )
+    return JSONResponse(data).body
+
+
+def default_user() -> bytes:
+    return _default(USER_FIELD, UserRead.model_validate(USERS[0]))
+
+
+def fast_user() -> bytes:
+    return model_response(UserRead, USERS[0]).body
+
+
+def default_page() -> bytes:
+    page = UserPage(items=[UserRead.model_validate(user) for user in USERS])
+    return _default(PAGE_FIELD, page)
+
+
+def fast_page() -> bytes:
+    page = UserPage.model_construct(
+        items=[construct_model(UserRead, user) for user in USERS], next_cursor=None
+    )
+    return model_response(UserPage, page).body
+
+
+def default_error() -> bytes:
+    return JSONResponse(jsonable_encoder({"detail": ErrorCode.LOGIN_BAD_CREDENTIALS})).body
+
+
+def fast_error() -> bytes:
+    return ERROR_PAYLOADS[ErrorCode.LOGIN_BAD_CREDENTIALS]
+
+
+def main() -> None:
+    cases = (
+        ("UserRead", default_user, fast_user, NUMBER),
+        ("UserPage(100)", default_page, fast_page, NUMBER // 100),
+        ("error", default_error, fast_error, NUMBER),
+    )
+    for name, default, fast, number in cases:
+        assert json.loads(default()) == json.loads(fast())
+        for variant, func in (("default", default), ("fast", fast)):
+            seconds = min(timeit.repeat(func, number=number, repeat=3))
+            print(f"{name:>14} {variant:>8}: {seconds / number * 1e6:>9.2f} µs/response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Бенчмарк холодного старта: импорт main и первый запрос к OpenAPI схеме.
+
+Каждый замер выполняется в отдельном процессе, чтобы кэш модулей
+не искажал результат.
+
+Запуск: python benchmarks/bench_startup.py [--runs N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from httpx import ASGITransport, AsyncClient
+
+async def first_request():
+    async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://b") as c:
+        start = time.perf_counter()
+        response = await c.get("/api/auth/openapi.json")
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+t2 = asyncio.run(first_request())
+print(json.dumps({"import": t1 - t0, "first_request": t2}))
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {"import": [], "first_request": []}
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=BASE_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        for key, value in json.loads(out.strip().splitlines()[-1]).items():
+            results[key].append(value)
+
+    for key, values in results.items():
+        print(
+            f"{key:>14}: median {statistics.median(values) * 1000:8.1f} ms, "
+            f"min {min(values) * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,20 @@ class Settings(BaseSettings):
     db_user: str = "user"
     db_pass: str = "password123"
     db_driver: str = "postgresql+asyncpg"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # Общее число соединений на контейнер, делится между воркерами
+    db_pool_budget: int = 20
+    # DB_HOST указывает на PgBouncer в режиме transaction pooling
+    db_pgbouncer: bool = False
+    # Прямой адрес PostgreSQL для миграций и bulk-импорта (по умолчанию DB_HOST)
+    db_direct_host: str = ""
+    db_direct_port: int = 0
+    # Мягко удалённые строки старше срока переносятся в *_archive таблицы
+    soft_delete_retention_days: int = 30
+    archive_batch_size: int = 1000
+    # DEBUG: одно и то же выражение столько раз за запрос — предупреждение о N+1
+    query_repeat_warn_threshold: int = 5
 
     # =========================
     # Email
@@ -47,12 +61,74 @@ class Settings(BaseSettings):
     refresh_token_expire_sec: int = 60 * 60 * 24 * 7
     google_oauth_client_id: str = ""
     google_oauth_client_secret: str = ""
+    google_oidc_discovery_url: str = (
+        "https://accounts.google.com/.well-known/openid-configuration"
+    )
+    google_jwks_refresh_sec: int = 60 * 60
+    oauth_http_timeout_sec: float = 10
+    password_hash_workers: int = 2
+    # База утёкших паролей (python -m app.cli.breached_passwords); пусто — без проверки
+    breached_passwords_path: str = ""
+    # Одноразовые почтовые домены, домен в строке; пусто — без проверки.
+    # Файл перечитывается при изменении, mtime проверяется раз в N секунд
+    disposable_domains_path: str = ""
+    disposable_domains_check_sec: float = 30
+    # Отозванные access токены: ключи revoked:{jti} в Redis и фильтр Блума
+    # в каждом воркере, синхронизируемый через pub/sub
+    revocation_channel: str = "auth:revoked"
+    revocation_bloom_capacity: int = 100_000
+    revocation_bloom_error_rate: float = 0.001
+    # Фильтр пересобирается из Redis, чтобы выбросить истёкшие jti
+    revocation_bloom_rebuild_sec: int = 60 * 15
 
     origin: str = "http://trip.com"
     lk_path: str = "/users/me/"
 
     refresh_token_path: str = "/api/auth/refresh"
+    # Окно, в котором повторный refresh уже ротированным токеном
+    # возвращает ту же новую пару (0 — выключено)
+    refresh_grace_sec: int = 10
+    # Refresh token ротируется, только когда прожил эту долю срока;
+    # раньше /refresh выдаёт новый access token без записи в БД
+    refresh_rotate_after_fraction: float = 0.5
+    # Абсолютный предел сессии от логина, ротация его не продлевает
+    refresh_session_max_sec: int = 60 * 60 * 24 * 30
     refresh_token_name: str = "refresh_token"
+    # ETag пользователя в Redis для 304 без запроса к БД (0 — выключено).
+    # Деактивация в обход UserManager (SQL) видна /me не позже TTL — как
+    # и сервисам, доверяющим ещё живому access токену
+    user_etag_ttl_sec: int = 60 * 15
+    # last_login_at / last_seen_at копятся в памяти воркера и пишутся пачкой
+    activity_flush_interval_sec: float = 30
+    activity_buffer_size: int = 50_000
+    # Журнал auth_events: очередь в памяти воркера и пачки INSERT
+    audit_queue_size: int = 10_000
+    # Восемь параметров на строку: не больше 4000 (лимит asyncpg — 32767)
+    audit_batch_size: int = 500
+    audit_flush_interval_sec: float = 1
+    # Месячные секции: создаются заранее и удаляются целиком после срока
+    audit_partitions_ahead: int = 2
+    audit_retention_days: int = 180
+
+    # =========================
+    # Server
+    # =========================
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    # 0 — по числу доступных ядер (с учётом квоты cgroup)
+    web_concurrency: int = 0
+    graceful_timeout_sec: int = 30
+
+    # =========================
+    # Startup
+    # =========================
+    # Сколько соединений пула открыть заранее при старте воркера
+    db_warmup_connections: int = 2
+    # Частота фоновых проверок зависимостей для /health/ready
+    health_check_interval_sec: float = 5
+    health_check_timeout_sec: float = 2
+    # Схема OpenAPI, собранная при сборке образа (python -m app.utils.openapi)
+    openapi_schema_path: str = "openapi.json"
 
     # =========================
     # Config
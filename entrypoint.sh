@@ -2,7 +2,7 @@
 set -e
 
 echo "Running migrations..."
-alembic upgrade head
+python -m app.cli.migrate
 
 echo "Starting FastAPI..."
-exec uvicorn main:app --host 0.0.0.0 --port 8000
+exec python server.py
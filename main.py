@@ -1,11 +1,19 @@
 import logging.config
 
 from fastapi import FastAPI
+from starlette.exceptions import HTTPException
 
+from app.db.database import engine
+from app.lifespan import lifespan
+from app.middleware.queries import QueryCounterMiddleware, install_query_counter
+from app.routes.health import health_router
 from app.routes.token import token_router
+from app.routes.users import users_router
 from app.schemas.users import UserCreate, UserRead, UserUpdate
 from app.services.users import auth_backend, fastapi_users, google_oauth_client
 from app.utils.logging import LOGGING_CONFIG
+from app.utils.openapi import use_prebuilt_openapi
+from app.utils.responses import FastJSONResponse, http_exception_handler
 from config import settings
 
 logging.config.dictConfig(LOGGING_CONFIG)
@@ -14,7 +22,16 @@ app = FastAPI(
     docs_url="/api/auth/docs",
     redoc_url="/api/auth/redoc",
     openapi_url="/api/auth/openapi.json",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
+app.add_exception_handler(HTTPException, http_exception_handler)
+use_prebuilt_openapi(app, settings.openapi_schema_path)
+
+if settings.debug:
+    # Число SQL-выражений и время в БД в заголовках ответа и /health/queries
+    install_query_counter(engine)
+    app.add_middleware(QueryCounterMiddleware)
 
 app.include_router(
     fastapi_users.get_auth_router(auth_backend), prefix="/api/auth", tags=["auth"]
@@ -47,10 +64,18 @@ app.include_router(
     tags=["auth"],
 )
 
-app.include_router(
-    fastapi_users.get_users_router(UserRead, UserUpdate),
-    prefix="/api/users",
-    tags=["users"],
-)
+app.include_router(users_router, prefix="/api/users", tags=["users"])
+# GET /me и GET /{id} отвечает users_router (ETag и 304); одноимённые
+# обработчики fastapi-users недостижимы и только путали схему
+SHADOWED_USERS_ROUTES = {"users:current_user", "users:user"}
+fastapi_users_router = fastapi_users.get_users_router(UserRead, UserUpdate)
+fastapi_users_router.routes = [
+    route
+    for route in fastapi_users_router.routes
+    if route.name not in SHADOWED_USERS_ROUTES
+]
+app.include_router(fastapi_users_router, prefix="/api/users", tags=["users"])
 
 app.include_router(token_router, prefix="/api/auth", tags=["auth"])
+
+app.include_router(health_router, prefix="/health", tags=["health"])
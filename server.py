@@ -0,0 +1,138 @@
+"""
+Production запуск: несколько воркеров uvicorn по числу доступных ядер.
+
+Воркеры управляются супервизором uvicorn, в том числе единственный
+(uvicorn.run с одним воркером обошёлся бы без супервизора):
+  - SIGTERM/SIGINT — мягкая остановка, активные запросы дорабатывают
+    в пределах GRACEFUL_TIMEOUT_SEC;
+  - SIGHUP — поочерёдный перезапуск воркеров (graceful reload);
+  - SIGTTIN/SIGTTOU — добавить/убрать воркер;
+  - упавший воркер перезапускается.
+
+Запуск: python server.py
+"""
+
+import logging
+import math
+import os
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from config import settings
+
+logger = logging.getLogger("uvicorn")
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit() -> float | None:
+    """Лимит CPU контейнера из cgroup (v2 или v1), None если лимита нет."""
+    cpu_max = _read(CGROUP_V2_CPU_MAX)
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    quota, period = _read(CGROUP_V1_QUOTA), _read(CGROUP_V1_PERIOD)
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def available_cpus() -> int:
+    """Количество ядер, доступных процессу, с учётом affinity и квоты cgroup."""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        # Хэширование Argon2 упирается в CPU: лишний воркер сверх квоты
+        # только добавит троттлинг, поэтому округляем вниз.
+        cpus = min(cpus, max(1, math.floor(limit)))
+    return max(1, cpus)
+
+
+def worker_count() -> int:
+    if settings.web_concurrency > 0:
+        return settings.web_concurrency
+    return available_cpus()
+
+
+def split_pool_budget(workers: int) -> int:
+    """Размер пула соединений одного воркера из общего бюджета контейнера."""
+    return max(1, settings.db_pool_budget // workers)
+
+
+def pool_settings(workers: int) -> tuple[int, int]:
+    """
+    (pool_size, max_overflow) воркера.
+
+    Заданные явно DB_POOL_SIZE/DB_MAX_OVERFLOW не меняются; иначе пул
+    делится из DB_POOL_BUDGET без overflow, чтобы воркеры вместе не
+    превысили бюджет.
+    """
+    explicit = settings.model_fields_set
+    pool_size = (
+        settings.db_pool_size
+        if "db_pool_size" in explicit
+        else split_pool_budget(workers)
+    )
+    max_overflow = settings.db_max_overflow if "db_max_overflow" in explicit else 0
+    return pool_size, max_overflow
+
+
+def main() -> None:
+    workers = worker_count()
+    pool_size, max_overflow = pool_settings(workers)
+
+    # Воркеры стартуют как новые процессы и читают настройки из окружения.
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+
+    logger.info(
+        "Запуск %s воркеров, пул БД %s + %s overflow соединений на воркер (бюджет %s)",
+        workers,
+        pool_size,
+        max_overflow,
+        settings.db_pool_budget,
+    )
+    if workers * (pool_size + max_overflow) > settings.db_pool_budget:
+        logger.warning(
+            "Воркеры могут открыть %s соединений — больше бюджета %s",
+            workers * (pool_size + max_overflow),
+            settings.db_pool_budget,
+        )
+    config = uvicorn.Config(
+        "main:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        timeout_graceful_shutdown=settings.graceful_timeout_sec,
+        proxy_headers=True,
+    )
+    # uvicorn.run запускает супервизор только при workers > 1: на одном
+    # ядре не было бы ни SIGHUP-перезапуска, ни подъёма упавшего воркера
+    supervisor = Multiprocess(
+        config, target=uvicorn.Server(config).run, sockets=[config.bind_socket()]
+    )
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
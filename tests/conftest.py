@@ -1,5 +1,8 @@
 import os
 import sys
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 from typing import AsyncGenerator, Generator
 from unittest.mock import AsyncMock, MagicMock
 
@@ -12,6 +15,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
+from app.db.models import RefreshToken  # noqa: E402
 from config import settings  # noqa: E402
 
 
@@ -54,6 +58,12 @@ class MockUserDb:
         )
         self.create_called = False
         self.create_call_data = None
+        self.users = {}
+        self.get_calls = []
+
+    async def get(self, id):
+        self.get_calls.append(id)
+        return self.users.get(id)
 
     async def get_by_email(self, email: str):
         return self.get_by_email_result
@@ -63,10 +73,156 @@ class MockUserDb:
         self.create_call_data = data
         return self.create_result
 
+    async def create_if_not_exists(self, data: dict):
+        """Как INSERT ... ON CONFLICT DO NOTHING: при существующем email — None."""
+        if self.get_by_email_result is not None:
+            return None
+        return await self.create(data)
+
+
+class MockSession:
+    """Мок AsyncSession запроса: запоминает добавленные объекты и число commit."""
+
+    def __init__(self):
+        self.added = []
+        self.commits = 0
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        self.commits += 1
+
+
+class FakeRefreshToken(SimpleNamespace):
+    """Строка refresh_tokens без ORM: политика ротации берётся у RefreshToken."""
+
+    _expires_at = staticmethod(RefreshToken._expires_at)
+    rotation_due = RefreshToken.rotation_due
+
+    def successor(self):
+        created = RefreshToken.successor(self)
+        return FakeRefreshToken(
+            token=created.token,
+            user_id=created.user_id,
+            user=self.user,
+            created_at=created.created_at,
+            expires_at=created.expires_at,
+            session_started_at=created.session_started_at,
+        )
+
+    @classmethod
+    def issue(cls, token: str, user, age_sec: float = 0) -> "FakeRefreshToken":
+        """Токен, выданный age_sec секунд назад в начале сессии."""
+        issued = datetime.now(timezone.utc) - timedelta(seconds=age_sec)
+        return cls(
+            token=token,
+            user_id=user.id,
+            user=user,
+            created_at=issued,
+            expires_at=RefreshToken._expires_at(issued, issued),
+            session_started_at=issued,
+        )
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.row
+
+
+class RefreshSession:
+    """
+    Сессия для /refresh: словарь действующих токенов и журнал запросов.
+
+    SELECT ... FOR UPDATE, delete и add записываются в ``log``.
+    """
+
+    def __init__(self, *rows: FakeRefreshToken):
+        self.rows = {row.token: row for row in rows}
+        self.log = []
+        self.fail_commit = False
+        self.rotated_concurrently = False
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+        if self.fail_commit:
+            raise ConnectionError("commit failed")
+
+    async def execute(self, statement):
+        locked = statement._for_update_arg is not None
+        self.log.append("select for update" if locked else "select")
+        token = statement.whereclause.clauses[0].right.value
+        if locked and self.rotated_concurrently:
+            # Пока ждали блокировку, строку удалил параллельный refresh
+            self.rows.pop(token, None)
+        return FakeResult(self.rows.get(token))
+
+    async def delete(self, row):
+        self.log.append("delete")
+        self.rows.pop(row.token, None)
+
+    def add(self, row):
+        self.log.append("add")
+        self.rows[row.token] = row
+
+
+@pytest.fixture
+def issue_refresh_token():
+    """Фабрика FakeRefreshToken.issue."""
+    return FakeRefreshToken.issue
+
+
+@pytest.fixture
+def refresh_user():
+    return SimpleNamespace(id=3, is_verified=True, is_superuser=False)
+
+
+@pytest.fixture
+def refresh_session(auth_app) -> RefreshSession:
+    """Подменяет сессию запроса на RefreshSession без токенов."""
+    from app.db.database import get_async_session
+
+    session = RefreshSession()
+
+    async def override() -> AsyncGenerator:
+        yield session
+
+    auth_app.dependency_overrides[get_async_session] = override
+    return session
+
+
+@pytest_asyncio.fixture
+async def user_etag_cache(monkeypatch):
+    """Кэш ETag пользователей на fakeredis вместо общего Redis."""
+    import fakeredis
+
+    import app.routes.users as users_routes
+    import app.services.users as users_services
+    from app.services.etags import UserETagCache
+
+    redis = fakeredis.FakeAsyncRedis()
+    cache = UserETagCache(lambda: redis, ttl=60)
+    monkeypatch.setattr(users_routes, "user_etag_cache", cache)
+    monkeypatch.setattr(users_services, "user_etag_cache", cache)
+    yield cache
+    await redis.aclose()
+
+
+@pytest.fixture
+def mock_session() -> MockSession:
+    return MockSession()
+
 
 @pytest.fixture
 def mock_user_db() -> MockUserDb:
-    """Мок БД пользователей: get_by_email и create."""
+    """Мок БД пользователей: get_by_email, create и create_if_not_exists."""
     return MockUserDb()
 
 
@@ -79,19 +235,24 @@ def app():
 
 
 @pytest_asyncio.fixture
-async def auth_app(app, mock_user_db):
-    """Приложение с подменённым get_user_db на mock_user_db (адаптер БД)."""
-    from app.db.database import get_user_db
+async def auth_app(app, mock_user_db, mock_session):
+    """Приложение с подменёнными get_user_db (mock_user_db) и сессией запроса (mock_session)."""
+    from app.db.database import get_async_session, get_user_db
 
     async def override_get_user_db() -> AsyncGenerator:
         yield mock_user_db
 
+    async def override_get_async_session() -> AsyncGenerator:
+        yield mock_session
+
     # Подменяем get_user_db: get_user_manager получит mock_user_db и создаст UserManager(mock_user_db)
     app.dependency_overrides[get_user_db] = override_get_user_db
+    app.dependency_overrides[get_async_session] = override_get_async_session
     try:
         yield app
     finally:
         app.dependency_overrides.pop(get_user_db, None)
+        app.dependency_overrides.pop(get_async_session, None)
 
 
 @pytest_asyncio.fixture
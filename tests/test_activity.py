@@ -0,0 +1,162 @@
+"""Тесты отложенной записи last_login_at / last_seen_at."""
+
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.routes.token as token_routes  # noqa: E402
+from app.services.activity import ActivityBuffer, update_activity  # noqa: E402
+from config import settings  # noqa: E402
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FlushSession:
+    """Сессия для сброса буфера: запоминает выполненные UPDATE."""
+
+    def __init__(self, statements: list, fail: bool = False):
+        self.statements = statements
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+    async def execute(self, statement):
+        if self.fail:
+            raise ConnectionError("db is down")
+        self.statements.append(statement)
+
+
+def _buffer(max_size: int = 100, fail: bool = False):
+    statements = []
+    buffer = ActivityBuffer(
+        lambda: FlushSession(statements, fail), interval=60, max_size=max_size
+    )
+    return buffer, statements
+
+
+def test_records_are_coalesced_per_user():
+    buffer, _ = _buffer()
+
+    buffer.record_login(1, T0)
+    buffer.record_seen(1, T0 + timedelta(minutes=5))
+    buffer.record_seen(1, T0 + timedelta(minutes=1))
+    buffer.record_seen(2, T0)
+
+    assert buffer.pending == {
+        1: [T0, T0 + timedelta(minutes=5)],
+        2: [None, T0],
+    }
+
+
+def test_full_buffer_drops_new_users_and_wakes_flusher():
+    buffer, _ = _buffer(max_size=2)
+
+    buffer.record_seen(1, T0)
+    buffer.record_seen(2, T0)
+    buffer.record_seen(3, T0)
+    buffer.record_seen(1, T0 + timedelta(seconds=1))
+
+    assert set(buffer.pending) == {1, 2}
+    assert buffer.pending[1][1] == T0 + timedelta(seconds=1)
+    assert buffer.dropped == 1
+    assert buffer._wakeup.is_set()
+
+
+def test_update_is_single_statement_and_keeps_updated_at():
+    sql = str(
+        update_activity([(1, T0, T0), (2, None, T0)]).compile(
+            dialect=postgresql.dialect()
+        )
+    )
+
+    assert sql.startswith('UPDATE "user" SET last_login_at=greatest(')
+    assert 'updated_at="user".updated_at' in sql
+    assert "FROM (VALUES" in sql
+    assert "AS activity (id, last_login_at, last_seen_at)" in sql
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_sorted_rows_and_empties_buffer():
+    buffer, statements = _buffer()
+    buffer.record_seen(2, T0)
+    buffer.record_login(1, T0)
+
+    assert await buffer.flush() == 2
+    assert buffer.pending == {}
+    assert await buffer.flush() == 0
+    assert len(statements) == 1
+    params = statements[0].compile(dialect=postgresql.dialect()).params
+    assert [params["param_1"], params["param_4"]] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_requeues_without_losing_newer_marks():
+    buffer, _ = _buffer(fail=True)
+    buffer.record_seen(1, T0)
+
+    assert await buffer.flush() == 0
+    buffer.record_seen(1, T0 + timedelta(minutes=1))
+    buffer._requeue([(1, None, T0)])
+
+    assert buffer.pending == {1: [None, T0 + timedelta(minutes=1)]}
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_remaining_marks():
+    buffer, statements = _buffer()
+    await buffer.start()
+    buffer.record_login(1, T0)
+
+    await buffer.stop()
+
+    assert len(statements) == 1
+    assert buffer.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_background_flush_on_interval():
+    buffer, statements = _buffer()
+    buffer.interval = 0.01
+    await buffer.start()
+    buffer.record_seen(1, T0)
+    await asyncio.sleep(0.05)
+    await buffer.stop()
+
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_records_last_seen(
+    client, refresh_session, refresh_user, issue_refresh_token, monkeypatch
+):
+    buffer, _ = _buffer()
+    monkeypatch.setattr(token_routes, "activity_buffer", buffer)
+    refresh_session.rows["fresh"] = issue_refresh_token("fresh", refresh_user)
+
+    client.cookies.set(settings.refresh_token_name, "fresh")
+    try:
+        response = await client.post("/api/auth/refresh")
+    finally:
+        client.cookies.clear()
+
+    assert response.status_code == 204
+    assert set(buffer.pending) == {refresh_user.id}
+    # Запись только в буфер: в сессии запроса нет UPDATE
+    assert refresh_session.log == ["select"]
@@ -0,0 +1,140 @@
+"""Тесты списка пользователей для админки: keyset пагинация и NDJSON поток."""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.routes.users as users_routes  # noqa: E402
+from app.crud.users import decode_cursor, encode_cursor, select_users_page  # noqa: E402
+from app.db.database import get_async_session  # noqa: E402
+from app.services.users import current_superuser  # noqa: E402
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _user(n: int):
+    return SimpleNamespace(
+        id=n,
+        email=f"user{n}@example.com",
+        is_active=True,
+        is_superuser=False,
+        is_verified=True,
+        created_at=START + timedelta(minutes=n),
+    )
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return iter(self.rows)
+
+    async def __aiter__(self):
+        for row in self.rows:
+            yield row
+
+
+class FakeSession:
+    """Сессия, возвращающая заранее заданных пользователей и запоминающая запрос."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.rows[: statement._limit])
+
+    async def stream_scalars(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.rows)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def session(app, monkeypatch):
+    fake = FakeSession([_user(n) for n in range(1, 6)])
+
+    async def override_session():
+        yield fake
+
+    app.dependency_overrides[get_async_session] = override_session
+    app.dependency_overrides[current_superuser] = lambda: _user(0)
+    monkeypatch.setattr(users_routes, "AsyncSessionLocal", lambda: fake)
+    try:
+        yield fake
+    finally:
+        app.dependency_overrides.pop(get_async_session, None)
+        app.dependency_overrides.pop(current_superuser, None)
+
+
+def test_cursor_round_trip():
+    user = _user(7)
+    assert decode_cursor(encode_cursor(user)) == (user.created_at, 7)
+
+
+def test_keyset_query_uses_row_comparison_not_offset():
+    statement = select_users_page(
+        after=(START, 10), is_verified=True, deleted="exclude", limit=50
+    )
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert '("user".created_at, "user".id) > (' in sql
+    assert '"user".is_verified IS true' in sql
+    assert '"user".deleted_at IS NULL' in sql
+    assert "ORDER BY \"user\".created_at, \"user\".id" in sql
+    assert "OFFSET" not in sql
+
+
+@pytest.mark.asyncio
+async def test_list_requires_superuser(client):
+    response = await client.get("/api/users")
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_list_returns_page_and_next_cursor(client, session):
+    response = await client.get("/api/users", params={"limit": 2})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["id"] for item in data["items"]] == [1, 2]
+    assert decode_cursor(data["next_cursor"]) == (_user(2).created_at, 2)
+
+
+@pytest.mark.asyncio
+async def test_list_last_page_has_no_cursor(client, session):
+    response = await client.get("/api/users", params={"limit": 10})
+    assert response.json()["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_list_invalid_cursor(client, session):
+    response = await client.get("/api/users", params={"cursor": "%%%"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_list_streams_ndjson(client, session):
+    response = await client.get("/api/users", params={"format": "ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == [1, 2, 3, 4, 5]
+    assert session.statements[-1].get_execution_options()["yield_per"] == 500
@@ -0,0 +1,364 @@
+"""Тесты журнала auth_events: очередь, пачки INSERT, секции и хуки."""
+
+import asyncio
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.routes.token as token_routes  # noqa: E402
+from app.cli.audit_partitions import maintain  # noqa: E402
+import app.services.users as users_services  # noqa: E402
+from app.crud.audit import (  # noqa: E402
+    create_partition,
+    expired_partitions,
+    months_from,
+    partition_name,
+)
+from app.db.models import AuthEvent  # noqa: E402
+from app.services.audit import AuditEvent, AuditLog  # noqa: E402
+from config import settings  # noqa: E402
+
+
+class InsertSession:
+    """Сессия фонового писателя: запоминает вставленные пачки."""
+
+    def __init__(self, batches: list, fail: bool = False):
+        self.batches = batches
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+    async def execute(self, statement):
+        if self.fail:
+            raise ConnectionError("db is down")
+        self.batches.append(statement)
+
+
+def _audit_log(max_queue=100, batch_size=10, flush_interval=0.01, fail=False):
+    batches = []
+    log = AuditLog(
+        lambda: InsertSession(batches, fail),
+        max_queue=max_queue,
+        batch_size=batch_size,
+        flush_interval=flush_interval,
+    )
+    return log, batches
+
+
+def _rows(statement) -> int:
+    return len(statement._multi_values[0])
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Подменяет общий журнал на незапущенный: события остаются в очереди."""
+    log, _ = _audit_log()
+    monkeypatch.setattr(users_services, "audit_log", log)
+    monkeypatch.setattr(token_routes, "audit_log", log)
+
+    def events():
+        return [log.queue.get_nowait() for _ in range(log.queue.qsize())]
+
+    return events
+
+
+def test_record_is_in_memory_and_fast():
+    log, batches = _audit_log(max_queue=10_000)
+    request = SimpleNamespace(
+        client=SimpleNamespace(host="10.0.0.7"), headers={"user-agent": "x" * 1000}
+    )
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        log.record(AuditEvent.LOGIN_SUCCEEDED, user_id=1, request=request)
+    per_event = (time.perf_counter() - start) / 1000
+
+    row = log.queue.get_nowait()
+    assert row["event"] == "login_succeeded"
+    assert row["ip"] == "10.0.0.7"
+    assert len(row["user_agent"]) == 512
+    assert row["data"] is None
+    assert batches == []
+    assert per_event < 100e-6
+
+
+def test_long_email_is_truncated_to_column_length():
+    """Логин-форма не ограничивает username: длинный не должен сорвать пачку."""
+    log, _ = _audit_log()
+
+    log.record(AuditEvent.LOGIN_FAILED, email="a" * 5000 + "@example.com")
+    log.record(AuditEvent.LOGOUT, user_id=1)
+
+    assert len(log.queue.get_nowait()["email"]) == AuthEvent.__table__.c.email.type.length
+    assert log.queue.get_nowait()["email"] is None
+
+
+def test_full_queue_drops_events():
+    log, _ = _audit_log(max_queue=2)
+
+    for _ in range(3):
+        log.record(AuditEvent.LOGOUT, user_id=1)
+
+    assert log.queue.qsize() == 2
+    assert log.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_events_are_inserted_in_batches():
+    log, batches = _audit_log(batch_size=10)
+    await log.start()
+    for n in range(25):
+        log.record(AuditEvent.REFRESHED, user_id=n, rotated=False)
+    await asyncio.sleep(0.1)
+    await log.stop()
+
+    assert [_rows(batch) for batch in batches] == [10, 10, 5]
+    sql = str(batches[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO auth_events")
+    assert sql.count("), (") == 9
+
+
+@pytest.mark.asyncio
+async def test_stop_writes_queued_events():
+    log, batches = _audit_log(batch_size=2)
+    for n in range(3):
+        log.record(AuditEvent.VERIFIED, user_id=n)
+
+    await log.stop()
+
+    assert [_rows(batch) for batch in batches] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_failed_insert_does_not_stop_writer():
+    log, _ = _audit_log(fail=True)
+    await log.start()
+    log.record(AuditEvent.LOGOUT, user_id=1)
+    await asyncio.sleep(0.05)
+
+    assert not log._task.done()
+    await log.stop()
+
+
+def test_table_is_range_partitioned_by_created_at():
+    table = AuthEvent.__table__
+
+    assert table.dialect_options["postgresql"]["partition_by"] == "RANGE (created_at)"
+    assert {column.name for column in table.primary_key} == {"id", "created_at"}
+
+
+def test_monthly_partitions_and_retention():
+    starts = months_from(datetime(2026, 11, 15, tzinfo=timezone.utc), 3)
+    sql = str(create_partition(starts[1]))
+
+    assert [partition_name(start) for start in starts] == [
+        "auth_events_2026_11",
+        "auth_events_2026_12",
+        "auth_events_2027_01",
+    ]
+    assert "FOR VALUES FROM ('2026-12-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')" in sql
+    assert expired_partitions(
+        ["auth_events_2026_05", "auth_events_2026_06", "auth_events_default"],
+        cutoff=datetime(2026, 6, 20, tzinfo=timezone.utc),
+    ) == ["auth_events_2026_05"]
+
+
+class FakeResult:
+    def __init__(self, value=None, rowcount=0):
+        self.value = value
+        self.rowcount = rowcount
+
+    def scalars(self):
+        return iter(self.value)
+
+    def scalar(self):
+        return self.value
+
+
+class PartitionsEngine:
+    """Движок обслуживания секций: пишет SQL по транзакциям, отвечает из ``existing``."""
+
+    def __init__(self, existing: list[str], stranded_months: set[str], fail_on=None):
+        self.existing = existing
+        self.stranded_months = stranded_months
+        self.fail_on = fail_on
+        self.transactions: list[list[str]] = []
+
+    @asynccontextmanager
+    async def begin(self):
+        statements = []
+        self.transactions.append(statements)
+        yield self
+
+    async def execute(self, statement):
+        sql = str(statement)
+        self.transactions[-1].append(sql)
+        if self.fail_on and self.fail_on in sql:
+            raise DBAPIError(sql, None, Exception("partition constraint violated"))
+        if sql.startswith("SELECT child.relname"):
+            return FakeResult(self.existing)
+        if sql.startswith("SELECT EXISTS"):
+            return FakeResult(any(month in sql for month in self.stranded_months))
+        if sql.startswith("WITH moved"):
+            return FakeResult(rowcount=3)
+        return FakeResult()
+
+
+@pytest.mark.asyncio
+async def test_maintain_moves_stranded_events_out_of_default_partition():
+    """Секции месяца не было, события легли в DEFAULT: CREATE упал бы без переноса."""
+    engine = PartitionsEngine(
+        existing=["auth_events_default", "auth_events_2026_10"],
+        stranded_months={"2026-11-01"},
+    )
+
+    await maintain(
+        engine, ahead=1, retention_days=180, now=datetime(2026, 11, 2, tzinfo=timezone.utc)
+    )
+
+    create, _ = engine.transactions
+    steps = [
+        "DETACH PARTITION auth_events_default",
+        "CREATE TABLE IF NOT EXISTS auth_events_2026_11",
+        "INSERT INTO auth_events_2026_11 SELECT * FROM moved",
+        "CREATE TABLE IF NOT EXISTS auth_events_2026_12",
+        "ATTACH PARTITION auth_events_default DEFAULT",
+    ]
+    positions = [next(i for i, sql in enumerate(create) if step in sql) for step in steps]
+    assert positions == sorted(positions)
+    assert not any("WITH moved" in sql and "2026_12" in sql for sql in create)
+
+
+@pytest.mark.asyncio
+async def test_maintain_without_stranded_events_does_not_detach_default():
+    engine = PartitionsEngine(existing=["auth_events_2026_11"], stranded_months=set())
+
+    await maintain(
+        engine, ahead=1, retention_days=180, now=datetime(2026, 11, 2, tzinfo=timezone.utc)
+    )
+
+    create, _ = engine.transactions
+    assert not any("DETACH" in sql or "ATTACH" in sql for sql in create)
+    assert sum("CREATE TABLE IF NOT EXISTS auth_events_2026_12" in sql for sql in create) == 1
+    assert not any("auth_events_2026_11 PARTITION OF" in sql for sql in create)
+
+
+@pytest.mark.asyncio
+async def test_retention_runs_even_if_partition_creation_fails():
+    engine = PartitionsEngine(
+        existing=["auth_events_2026_01", "auth_events_2026_11"],
+        stranded_months=set(),
+        fail_on="auth_events_2026_12 PARTITION OF",
+    )
+
+    with pytest.raises(DBAPIError):
+        await maintain(
+            engine,
+            ahead=1,
+            retention_days=180,
+            now=datetime(2026, 11, 2, tzinfo=timezone.utc),
+        )
+
+    _, drop = engine.transactions
+    assert "DROP TABLE auth_events_2026_01" in drop
+    assert any(sql.startswith("DELETE FROM auth_events_default") for sql in drop)
+
+
+@pytest.mark.asyncio
+async def test_login_records_success_and_failure(client, mock_user_db, recorded):
+    with patch(
+        "app.services.users.UserManager.authenticate",
+        new=AsyncMock(return_value=mock_user_db.create_result),
+    ):
+        response = await client.post(
+            "/api/auth/login", data={"username": "user@example.com", "password": "x"}
+        )
+    failed = await client.post(
+        "/api/auth/login", data={"username": "nobody@example.com", "password": "x"}
+    )
+
+    assert response.status_code == 204
+    assert failed.status_code == 400
+    assert [(e["event"], e["email"]) for e in recorded()] == [
+        ("login_succeeded", "user@example.com"),
+        ("login_failed", "nobody@example.com"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_refresh_records_event(
+    client, refresh_session, refresh_user, issue_refresh_token, recorded
+):
+    refresh_session.rows["fresh"] = issue_refresh_token("fresh", refresh_user)
+
+    client.cookies.set(settings.refresh_token_name, "fresh")
+    try:
+        await client.post("/api/auth/refresh")
+    finally:
+        client.cookies.clear()
+
+    (event,) = recorded()
+    assert event["event"] == "refreshed"
+    assert event["user_id"] == refresh_user.id
+    assert event["data"] == {"rotated": False}
+
+
+@pytest.mark.asyncio
+async def test_failed_login_records_client_ip(auth_app, recorded):
+    async with AsyncClient(
+        transport=ASGITransport(app=auth_app, client=("203.0.113.9", 40000)),
+        base_url="http://test",
+    ) as client:
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": "x" * 1000, "password": "x"},
+            headers={"User-Agent": "curl/8"},
+        )
+
+    assert response.status_code == 400
+    (event,) = recorded()
+    assert event["event"] == "login_failed"
+    assert event["ip"] == "203.0.113.9"
+    assert event["user_agent"] == "curl/8"
+    assert len(event["email"]) == 320
+
+
+@pytest.mark.asyncio
+async def test_logout_records_client_ip(recorded, monkeypatch):
+    monkeypatch.setattr(users_services, "token_denylist", AsyncMock())
+    request = SimpleNamespace(
+        client=SimpleNamespace(host="203.0.113.9"), headers={"user-agent": "curl/8"}
+    )
+    user = SimpleNamespace(id=7, is_verified=True, is_superuser=False)
+    strategy = users_services.get_strategy(request=request, session=None)
+
+    await strategy.destroy_token(await strategy.write_token(user), user)
+
+    (event,) = recorded()
+    assert event["event"] == "logout"
+    assert (event["user_id"], event["ip"], event["user_agent"]) == (
+        7,
+        "203.0.113.9",
+        "curl/8",
+    )
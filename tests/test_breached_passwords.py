@@ -0,0 +1,117 @@
+"""Тесты базы утёкших паролей: сборка файла, поиск через mmap, регистрация."""
+
+import hashlib
+import os
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from fastapi_users.router.common import ErrorCode  # noqa: E402
+
+import app.services.users as users_services  # noqa: E402
+from app.cli.breached_passwords import UnsortedInput, build, main, parse_lines  # noqa: E402
+from app.services.breached import RECORDS_START, BreachedPasswords  # noqa: E402
+
+BREACHED = ["password", "123456", "qwerty", "пароль", "correct horse"]
+
+
+def _sha1(password: str) -> bytes:
+    return hashlib.sha1(password.encode("utf-8")).digest()
+
+
+def _dump(passwords, counts: bool = True) -> list[str]:
+    hexes = sorted(_sha1(password).hex().upper() for password in passwords)
+    return [f"{h}:{n}" if counts else h for n, h in enumerate(hexes, 1)]
+
+
+@pytest.fixture
+def corpus(tmp_path) -> BreachedPasswords:
+    path = tmp_path / "breached.bin"
+    with open(path, "wb") as output:
+        build(parse_lines(_dump(BREACHED)), output)
+    passwords = BreachedPasswords(str(path))
+    yield passwords
+    passwords.close()
+
+
+def test_lookup_finds_only_breached_passwords(corpus):
+    assert all(password in corpus for password in BREACHED)
+    assert "K7#v9-not-in-any-dump" not in corpus
+    assert corpus.count == len(BREACHED)
+    assert os.path.getsize(corpus.path) == RECORDS_START + len(BREACHED) * 8
+
+
+def test_neighbour_in_same_prefix_is_not_a_match(tmp_path):
+    digest = _sha1("password")
+    neighbour = digest[:2] + bytes([digest[2] ^ 1]) + digest[3:]
+    path = tmp_path / "breached.bin"
+    with open(path, "wb") as output:
+        build(sorted([digest]), output)
+
+    passwords = BreachedPasswords(str(path))
+    assert passwords.contains_sha1(digest)
+    assert not passwords.contains_sha1(neighbour)
+    passwords.close()
+
+
+def test_build_skips_duplicates_and_rare_passwords(tmp_path):
+    lines = _dump(["a", "b"]) + [""]
+    lines.insert(1, lines[0])
+    with open(tmp_path / "breached.bin", "wb") as output:
+        assert build(parse_lines(lines), output) == 2
+    with open(tmp_path / "rare.bin", "wb") as output:
+        assert build(parse_lines(lines, min_count=2), output) == 1
+
+
+def test_build_rejects_unsorted_dump(tmp_path):
+    lines = list(reversed(_dump(["a", "b"], counts=False)))
+
+    with open(tmp_path / "breached.bin", "wb") as output, pytest.raises(UnsortedInput):
+        build(parse_lines(lines), output)
+
+
+def test_main_does_not_leave_partial_file(tmp_path):
+    dump = tmp_path / "dump.txt"
+    dump.write_text("not-a-hash\n", encoding="ascii")
+    output = tmp_path / "breached.bin"
+
+    with pytest.raises(SystemExit):
+        main([str(dump), str(output)])
+
+    assert list(tmp_path.iterdir()) == [dump]
+
+
+def test_missing_or_corrupt_file_disables_check(tmp_path):
+    corrupt = tmp_path / "corrupt.bin"
+    corrupt.write_bytes(b"PWNDSHA1" + b"\0" * 100)
+
+    for path in ("", str(tmp_path / "missing.bin"), str(corrupt)):
+        passwords = BreachedPasswords(path)
+        assert "password" not in passwords
+        passwords.close()
+
+
+@pytest.mark.asyncio
+async def test_register_rejects_breached_password(client, mock_user_db, corpus, monkeypatch):
+    mock_user_db.get_by_email_result = None
+    monkeypatch.setattr(users_services, "breached_passwords", corpus)
+
+    with patch("app.services.users.send_email", new_callable=AsyncMock) as send_email:
+        rejected = await client.post(
+            "/api/auth/register",
+            json={"email": "new@example.com", "password": "correct horse"},
+        )
+        accepted = await client.post(
+            "/api/auth/register",
+            json={"email": "new@example.com", "password": "K7#v9-not-in-any-dump"},
+        )
+
+    assert rejected.status_code == 400
+    assert rejected.json()["detail"]["code"] == ErrorCode.REGISTER_INVALID_PASSWORD
+    assert accepted.status_code == 204
+    send_email.assert_called_once()
@@ -0,0 +1,125 @@
+"""Тесты разбора и подготовки пачек для bulk импорта пользователей."""
+
+import io
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.cli.bulk_users import (  # noqa: E402
+    CsvRowCounter,
+    InvalidRow,
+    chunked,
+    prepare_chunk,
+    read_rows,
+)
+
+ARGON2 = "$argon2id$v=19$m=65536,t=3,p=4$c2FsdA$aGFzaA"
+BCRYPT = "$2b$12$abcdefghijklmnopqrstuuJ0n0tArealHashAtAllxxxxxxxxxxxxx"
+
+
+def test_read_rows_csv_and_ndjson():
+    csv_stream = io.StringIO("email,hashed_password\na@x.io,h1\nb@x.io,h2\n")
+    ndjson_stream = io.StringIO('{"email": "a@x.io"}\n\n{"email": "b@x.io"}\n')
+
+    assert [r["email"] for r in read_rows(csv_stream, "csv")] == ["a@x.io", "b@x.io"]
+    assert [r["email"] for r in read_rows(ndjson_stream, "ndjson")] == [
+        "a@x.io",
+        "b@x.io",
+    ]
+
+
+def test_malformed_ndjson_line_is_rejected_not_fatal():
+    stream = io.StringIO(
+        f'{{"email": "a@x.io", "hashed_password": "{ARGON2}"}}\n'
+        '{"email": "broken@x.io", \n'
+        "[1, 2]\n"
+        f'{{"email": "b@x.io", "hashed_password": "{ARGON2}"}}\n'
+    )
+
+    rows = list(read_rows(stream, "ndjson"))
+    records, rejected = prepare_chunk("user", rows)
+
+    assert [str(row) for row in rows if isinstance(row, InvalidRow)] == [
+        "строка 2: некорректный JSON: Expecting property name enclosed in double quotes",
+        "строка 3: ожидался объект JSON",
+    ]
+    assert [record[0] for record in records] == ["a@x.io", "b@x.io"]
+    assert rejected == 2
+
+
+def test_csv_row_counter_ignores_newlines_in_quoted_fields():
+    data = b'email,note\na@x.io,"line 1\nline ""2""\nline 3"\nb@x.io,plain\n'
+    counter = CsvRowCounter()
+
+    # Куски COPY режут данные где угодно, в том числе внутри кавычек
+    rows = sum(counter.feed(data[start : start + 7]) for start in range(0, len(data), 7))
+
+    assert rows == 3
+
+
+def test_chunked_streams_fixed_size_chunks():
+    chunks = list(chunked(({"n": i} for i in range(5)), 2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+
+
+def test_prepare_users_dedupes_on_lower_email():
+    """Дубли по lower(email) внутри пачки отбрасываются, остаётся первый."""
+    records, rejected = prepare_chunk(
+        "user",
+        [
+            {"email": "User@Example.com", "hashed_password": ARGON2},
+            {"email": "user@example.com", "hashed_password": BCRYPT},
+            {"email": "other@example.com", "hashed_password": BCRYPT, "is_verified": "0"},
+        ],
+    )
+
+    assert rejected == 1
+    assert records == [
+        ("User@Example.com", ARGON2, True, False, True),
+        ("other@example.com", BCRYPT, True, False, False),
+    ]
+
+
+def test_prepare_users_rejects_unsupported_hashes():
+    """Открытые пароли и неизвестные схемы хэшей не импортируются."""
+    records, rejected = prepare_chunk(
+        "user",
+        [
+            {"email": "a@example.com", "hashed_password": "plain-text"},
+            {"email": "b@example.com", "hashed_password": "$1$md5crypt$xxxx"},
+            {"email": "not-an-email", "hashed_password": ARGON2},
+        ],
+    )
+
+    assert records == []
+    assert rejected == 3
+
+
+def test_prepare_oauth_accounts_dedupes_on_provider_account():
+    records, rejected = prepare_chunk(
+        "oauth_account",
+        [
+            {"email": "a@example.com", "oauth_name": "google", "account_id": "1"},
+            {"email": "b@example.com", "oauth_name": "google", "account_id": "1"},
+            {
+                "email": "c@example.com",
+                "oauth_name": "google",
+                "account_id": "2",
+                "expires_at": "1700000000",
+            },
+        ],
+    )
+
+    assert rejected == 1
+    assert records[1] == (
+        "c@example.com",
+        "google",
+        "2",
+        "c@example.com",
+        "",
+        1700000000,
+        None,
+    )
@@ -131,7 +131,7 @@ async def test_refresh_sets_new_access_and_refresh_cookies(transport):
 
 
 @pytest.mark.asyncio
-async def test_login_sets_cookies(client, mock_user_db):
+async def test_login_sets_cookies(client, mock_user_db, mock_session):
     existing = type(
         "User", (), {"id": 1, "email": "user@example.com", "hashed_password": ""}
     )()
@@ -153,3 +153,7 @@ async def test_login_sets_cookies(client, mock_user_db):
 
     assert access_cookie is not None
     assert refresh_cookie is not None
+
+    # Refresh token пишется в сессию запроса одним commit, без второй сессии
+    assert [t.token for t in mock_session.added] == [refresh_cookie.value]
+    assert mock_session.commits == 1
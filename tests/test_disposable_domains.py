@@ -0,0 +1,82 @@
+"""Тесты списка одноразовых почтовых доменов и отказа в регистрации."""
+
+import os
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.routes.register as register_routes  # noqa: E402
+from app.services.disposable import DisposableDomains, parse_domains  # noqa: E402
+
+
+@pytest.fixture
+def domains_file(tmp_path):
+    path = tmp_path / "disposable.txt"
+    path.write_text("# список\nMailinator.com\n\n10minutemail.net.  # точка\n")
+    return path
+
+
+def test_parse_domains_normalizes_lines():
+    assert parse_domains(["# x", " Example.COM. ", "", "a.b # c"]) == {"example.com", "a.b"}
+
+
+def test_subdomains_match_but_lookalikes_do_not(domains_file):
+    domains = DisposableDomains(str(domains_file), check_interval=60)
+
+    assert domains.is_disposable("user@mailinator.com")
+    assert domains.is_disposable("user@A.B.MAILINATOR.COM")
+    assert domains.is_disposable("user@10minutemail.net")
+    assert not domains.is_disposable("user@notmailinator.com")
+    assert not domains.is_disposable("user@mailinator.com.example.org")
+    assert not domains.is_disposable("user@example.com")
+
+
+def test_file_change_is_picked_up_after_check_interval(domains_file):
+    domains = DisposableDomains(str(domains_file), check_interval=60)
+    assert not domains.is_disposable("user@trashmail.io")
+
+    domains_file.write_text("trashmail.io\n")
+    os.utime(domains_file, ns=(0, 10**18))
+    assert not domains.is_disposable("user@trashmail.io")
+
+    domains.check_interval = 0
+    assert domains.is_disposable("user@trashmail.io")
+    assert not domains.is_disposable("user@mailinator.com")
+
+
+def test_missing_file_keeps_previous_list(domains_file):
+    domains = DisposableDomains(str(domains_file), check_interval=0)
+    assert domains.is_disposable("user@mailinator.com")
+
+    domains_file.unlink()
+    assert domains.is_disposable("user@mailinator.com")
+    assert not DisposableDomains("", check_interval=0).is_disposable("user@mailinator.com")
+
+
+@pytest.mark.asyncio
+async def test_register_rejects_disposable_email_before_hashing(
+    client, mock_user_db, domains_file, monkeypatch
+):
+    mock_user_db.get_by_email_result = None
+    monkeypatch.setattr(
+        register_routes,
+        "disposable_domains",
+        DisposableDomains(str(domains_file), check_interval=60),
+    )
+
+    with patch.object(
+        register_routes.password_hasher, "hash", new_callable=AsyncMock
+    ) as hash_mock:
+        response = await client.post(
+            "/api/auth/register",
+            json={"email": "user@x.mailinator.com", "password": "securepassword123"},
+        )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == register_routes.REGISTER_DISPOSABLE_EMAIL
+    hash_mock.assert_not_called()
@@ -67,10 +67,10 @@ async def test_send_email_sends_with_valid_config(monkeypatch):
         async def send_message(self, message):
             sent_messages.append(message)
 
-    # monkeypatch FastMail внутри модуля email
-    import app.services.email as email_module
+    # send_email импортирует FastMail при вызове, подменяем его в fastapi_mail
+    import fastapi_mail
 
-    monkeypatch.setattr(email_module, "FastMail", DummyFastMail)
+    monkeypatch.setattr(fastapi_mail, "FastMail", DummyFastMail)
 
     # when
     await send_email("user@example.com", "Subject", "Body")
@@ -0,0 +1,134 @@
+"""Тесты Google OAuth клиента против локального мок-провайдера OIDC."""
+
+import json
+import os
+import sys
+import time
+
+import httpx
+import jwt
+import pytest
+import pytest_asyncio
+from cryptography.hazmat.primitives.asymmetric import rsa
+from httpx_oauth.exceptions import GetIdEmailError
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.services.google_oauth import GoogleOAuth2Pooled, OIDCKeyCache  # noqa: E402
+
+DISCOVERY_URL = "https://mock-idp/.well-known/openid-configuration"
+ISSUER = "https://accounts.google.com"
+CLIENT_ID = "client-id"
+
+
+class MockProvider:
+    """Мок OIDC провайдера: discovery, JWKS, обмен кода и People API."""
+
+    def __init__(self):
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        self.jwks = {"keys": [{**jwk, "kid": "key-1", "alg": "RS256", "use": "sig"}]}
+        self.claims = {
+            "sub": "1234567890",
+            "email": "user@example.com",
+            "email_verified": True,
+        }
+        self.calls: dict[str, int] = {}
+
+    def id_token(self, **overrides) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": ISSUER,
+            "aud": CLIENT_ID,
+            "iat": now,
+            "exp": now + 3600,
+            **self.claims,
+            **overrides,
+        }
+        return jwt.encode(
+            claims, self.private_key, algorithm="RS256", headers={"kid": "key-1"}
+        )
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        name = request.url.host + request.url.path
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if request.url == DISCOVERY_URL:
+            return httpx.Response(
+                200, json={"issuer": ISSUER, "jwks_uri": "https://mock-idp/jwks"}
+            )
+        if request.url.path == "/jwks":
+            return httpx.Response(
+                200, json=self.jwks, headers={"cache-control": "public, max-age=3600"}
+            )
+        if request.url.host == "oauth2.googleapis.com":
+            return httpx.Response(
+                200,
+                json={
+                    "access_token": "access-token",
+                    "token_type": "Bearer",
+                    "expires_in": 3600,
+                    "id_token": self.id_token(),
+                },
+            )
+        return httpx.Response(500, json={"error": "unexpected request"})
+
+
+@pytest_asyncio.fixture
+async def provider():
+    provider = MockProvider()
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(provider.handler))
+    keys = OIDCKeyCache(http_client, DISCOVERY_URL, refresh_interval=3600)
+    provider.client = GoogleOAuth2Pooled(CLIENT_ID, "secret", http_client, keys)
+    try:
+        yield provider
+    finally:
+        await provider.client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_id_email_from_local_id_token(provider):
+    """id и email берутся из проверенного id_token, People API не вызывается."""
+    token = await provider.client.get_access_token("code", "https://app/callback")
+    account_id, email = await provider.client.get_id_email(token["access_token"])
+
+    assert (account_id, email) == ("people/1234567890", "user@example.com")
+    assert "people.googleapis.com/v1/people/me" not in provider.calls
+
+
+@pytest.mark.asyncio
+async def test_discovery_and_jwks_are_cached(provider):
+    for _ in range(3):
+        token = await provider.client.get_access_token("code", "https://app/callback")
+        await provider.client.get_id_email(token["access_token"])
+
+    assert provider.calls["mock-idp/.well-known/openid-configuration"] == 1
+    assert provider.calls["mock-idp/jwks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unverified_email_is_not_returned(provider):
+    provider.claims["email_verified"] = False
+    token = await provider.client.get_access_token("code", "https://app/callback")
+
+    _, email = await provider.client.get_id_email(token["access_token"])
+
+    assert email is None
+
+
+@pytest.mark.asyncio
+async def test_foreign_audience_is_rejected(provider):
+    provider.claims["aud"] = "another-client"
+    token = await provider.client.get_access_token("code", "https://app/callback")
+
+    with pytest.raises(GetIdEmailError):
+        await provider.client.get_id_email(token["access_token"])
+
+
+@pytest.mark.asyncio
+async def test_shared_http_client_is_not_closed_between_calls(provider):
+    await provider.client.get_access_token("code", "https://app/callback")
+    await provider.client.get_access_token("code", "https://app/callback")
+
+    assert not provider.client.http_client.is_closed
@@ -0,0 +1,113 @@
+"""Тесты /health/live и /health/ready с кэшем фоновых проверок."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.services.health import HealthMonitor, health_monitor  # noqa: E402
+
+
+@pytest.fixture
+def fake_checks(monkeypatch):
+    """Подменяет проверки монитора счётчиками вызовов."""
+    state = {"calls": 0, "redis_ok": True}
+
+    async def ok():
+        state["calls"] += 1
+
+    async def redis():
+        state["calls"] += 1
+        if not state["redis_ok"]:
+            raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(health_monitor, "checks", {"db": ok, "redis": redis, "smtp": ok})
+    monkeypatch.setattr(health_monitor, "results", {})
+    return state
+
+
+@pytest.fixture
+def ready_app(app):
+    app.state.ready = True
+    try:
+        yield app
+    finally:
+        app.state.ready = False
+
+
+@pytest.mark.asyncio
+async def test_live(client):
+    response = await client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_ready_serves_cached_results(client, ready_app, fake_checks):
+    """Пробы читают кэш: повторные запросы не запускают проверки."""
+    await health_monitor.refresh()
+    calls_after_refresh = fake_checks["calls"]
+
+    for _ in range(10):
+        response = await client.get("/health/ready")
+        assert response.status_code == 200
+
+    assert fake_checks["calls"] == calls_after_refresh
+    checks = response.json()["checks"]
+    assert set(checks) == {"db", "redis", "smtp"}
+    assert all(check["latency_ms"] >= 0 for check in checks.values())
+
+
+@pytest.mark.asyncio
+async def test_not_ready_when_dependency_fails(client, ready_app, fake_checks):
+    fake_checks["redis_ok"] = False
+    await health_monitor.refresh()
+
+    response = await client.get("/health/ready")
+
+    assert response.status_code == 503
+    assert response.json()["checks"]["redis"]["error"].startswith("ConnectionError")
+
+
+@pytest.mark.asyncio
+async def test_not_ready_before_warm_up(client, app, fake_checks):
+    app.state.ready = False
+    await health_monitor.refresh()
+
+    response = await client.get("/health/ready")
+
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_optional_check_does_not_block_readiness():
+    async def ok():
+        pass
+
+    async def smtp():
+        raise OSError("smtp unreachable")
+
+    monitor = HealthMonitor(
+        {"db": ok, "smtp": smtp}, interval=5, timeout=1, optional=frozenset({"smtp"})
+    )
+    await monitor.refresh()
+
+    assert monitor.is_ready()
+    assert monitor.results["smtp"].ok is False
+
+
+@pytest.mark.asyncio
+async def test_check_timeout_is_reported():
+    async def slow():
+        await asyncio.sleep(1)
+
+    monitor = HealthMonitor({"db": slow}, interval=5, timeout=0.01)
+    await monitor.refresh()
+
+    assert not monitor.is_ready()
+    assert monitor.results["db"].error.startswith("TimeoutError")
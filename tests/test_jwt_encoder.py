@@ -0,0 +1,73 @@
+"""Тесты AccessTokenEncoder: совместимость с PyJWT и fastapi_users.jwt."""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi_users.jwt import decode_jwt
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.services.users import get_strategy  # noqa: E402
+from app.utils.jwt_encoder import AccessTokenEncoder  # noqa: E402
+from config import settings  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "user_id, is_active, is_superuser, audience",
+    [
+        (1, True, False, "Gate"),
+        (987654321, False, True, "Gate"),
+        ("a-b", True, True, "Шлюз"),
+    ],
+)
+def test_encoder_matches_pyjwt_byte_for_byte(
+    user_id, is_active, is_superuser, audience
+):
+    """Токен совпадает с тем, что выдаёт jwt.encode для того же payload."""
+    encoder = AccessTokenEncoder("secret", 900, audience)
+    exp = 1_900_000_000
+
+    token = encoder.encode_with_exp(
+        user_id, is_active, is_superuser, exp, "0f1e2d3c4b5a69788796a5b4c3d2e1f0"
+    )
+    expected = jwt.encode(
+        {
+            "sub": str(user_id),
+            "is_active": is_active,
+            "is_superuser": is_superuser,
+            "aud": audience,
+            "jti": "0f1e2d3c4b5a69788796a5b4c3d2e1f0",
+            "exp": exp,
+        },
+        "secret",
+        algorithm="HS256",
+    )
+
+    assert token == expected
+
+
+def test_encoder_without_lifetime_has_no_exp():
+    """Без lifetime_seconds claim exp не добавляется, как в generate_jwt."""
+    token = AccessTokenEncoder("secret", None, "Gate").encode(1, True, False)
+    data = jwt.decode(token, "secret", algorithms=["HS256"], audience="Gate")
+    assert "exp" not in data
+
+
+@pytest.mark.asyncio
+async def test_strategy_token_decodes_with_fastapi_users():
+    """Токен стратегии читается decode_jwt с аудиторией шлюза."""
+    user = SimpleNamespace(id=7, is_verified=True, is_superuser=False)
+
+    token = await get_strategy(request=None, session=None).write_token(user)
+    data = decode_jwt(token, settings.jwt_secret, [settings.gateway_name])
+
+    assert data["sub"] == "7"
+    assert data["is_active"] is True
+    assert data["is_superuser"] is False
+    assert data["exp"] > 0
+    assert len(data["jti"]) == 32
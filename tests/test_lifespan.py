@@ -0,0 +1,128 @@
+"""Тесты lifespan: прогрев перед готовностью и освобождение ресурсов."""
+
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.lifespan as lifespan_module  # noqa: E402
+from app.services.activity import activity_buffer  # noqa: E402
+from app.services.audit import audit_log  # noqa: E402
+from app.services.health import health_monitor  # noqa: E402
+from app.services.passwords import password_hasher  # noqa: E402
+from app.services.revocation import token_denylist  # noqa: E402
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Подменяет шаги прогрева и остановки, записывая порядок вызовов."""
+    calls = []
+    test_app = FastAPI()
+
+    async def warm_up_pool():
+        calls.append(("pool", test_app.state.ready))
+
+    async def warm_up_statements():
+        raise ConnectionError("db is down")
+
+    async def warm_up_redis():
+        calls.append(("redis", test_app.state.ready))
+
+    async def shut_down():
+        calls.append(("shutdown", test_app.state.ready))
+
+    async def hasher_warmup():
+        calls.append(("hash", test_app.state.ready))
+
+    async def health_start():
+        calls.append(("health", test_app.state.ready))
+
+    monkeypatch.setattr(lifespan_module, "warm_up_pool", warm_up_pool)
+    monkeypatch.setattr(lifespan_module, "warm_up_statements", warm_up_statements)
+    monkeypatch.setattr(lifespan_module, "warm_up_redis", warm_up_redis)
+    monkeypatch.setattr(lifespan_module, "shut_down", shut_down)
+    monkeypatch.setattr(password_hasher, "warmup", hasher_warmup)
+    async def denylist_start():
+        calls.append(("denylist", test_app.state.ready))
+
+    async def activity_start():
+        calls.append(("activity", test_app.state.ready))
+
+    async def audit_start():
+        calls.append(("audit", test_app.state.ready))
+
+    monkeypatch.setattr(health_monitor, "start", health_start)
+    monkeypatch.setattr(token_denylist, "start", denylist_start)
+    monkeypatch.setattr(activity_buffer, "start", activity_start)
+    monkeypatch.setattr(audit_log, "start", audit_start)
+    return test_app, calls
+
+
+@pytest.mark.asyncio
+async def test_ready_only_after_warm_up(calls):
+    """Во время прогрева ready=False, после него True; ошибка шага не роняет старт."""
+    test_app, calls = calls
+
+    async with lifespan_module.lifespan(test_app):
+        assert test_app.state.ready is True
+        assert {name for name, _ in calls} == {
+            "pool",
+            "redis",
+            "hash",
+            "health",
+            "denylist",
+            "activity",
+            "audit",
+        }
+        assert all(ready is False for _, ready in calls)
+
+    assert calls[-1] == ("shutdown", False)
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_runs_in_executor():
+    """Хэш, посчитанный в пуле потоков, проверяется тем же helper'ом."""
+    hashed = await password_hasher.hash("secret-password")
+    verified, _ = await password_hasher.verify_and_update("secret-password", hashed)
+    assert verified
+
+
+@pytest.mark.asyncio
+async def test_warm_up_statements_covers_refresh_queries(monkeypatch):
+    """Прогреваются оба запроса refresh: чтение с пользователем и ротация."""
+    executed = []
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, statement):
+            executed.append(str(statement))
+
+        async def rollback(self):
+            pass
+
+    class UserDatabase:
+        def __init__(self, *args):
+            pass
+
+        async def get_by_email(self, email):
+            return None
+
+    monkeypatch.setattr(lifespan_module, "AsyncSessionLocal", Session)
+    monkeypatch.setattr(lifespan_module, "UserDatabase", UserDatabase)
+
+    await lifespan_module.warm_up_statements()
+
+    assert executed == [
+        str(lifespan_module.select_refresh_token("warmup")),
+        str(lifespan_module.select_active_refresh_token("warmup")),
+    ]
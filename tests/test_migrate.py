@@ -0,0 +1,118 @@
+"""Тесты запуска миграций: быстрый выход на head и advisory lock."""
+
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.cli.migrate as migrate_module  # noqa: E402
+
+CONFIG_PATH = os.path.join(BASE_DIR, "alembic.ini")
+HEAD = ScriptDirectory.from_config(Config(CONFIG_PATH)).get_current_head()
+
+
+def _set_version(connection, version):
+    connection.execute(
+        text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32))")
+    )
+    connection.execute(text("DELETE FROM alembic_version"))
+    if version is not None:
+        connection.execute(
+            text("INSERT INTO alembic_version VALUES (:v)"), {"v": version}
+        )
+    connection.commit()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def upgrades(monkeypatch):
+    """Подменяет alembic upgrade: записывает вызовы и ставит версию head."""
+    calls = []
+
+    def upgrade(config, revision):
+        connection = config.attributes["connection"]
+        calls.append(revision)
+        _set_version(connection, HEAD)
+
+    monkeypatch.setattr(migrate_module.command, "upgrade", upgrade)
+    return calls
+
+
+@pytest.fixture
+def locks(monkeypatch):
+    """Advisory lock без PostgreSQL; on_acquire имитирует работу другой реплики."""
+    state = {"taken": 0, "on_acquire": None}
+
+    @contextmanager
+    def advisory_lock(connection, key):
+        state["taken"] += 1
+        if state["on_acquire"]:
+            state["on_acquire"](connection)
+        yield 0.0
+
+    monkeypatch.setattr(migrate_module, "advisory_lock", advisory_lock)
+    return state
+
+
+def test_at_head_exits_without_lock(engine, upgrades, locks):
+    with engine.connect() as connection:
+        _set_version(connection, HEAD)
+
+    assert migrate_module.migrate(engine, Config(CONFIG_PATH)) is False
+    assert locks["taken"] == 0
+    assert upgrades == []
+
+
+def test_behind_head_migrates_under_lock(engine, upgrades, locks):
+    with engine.connect() as connection:
+        _set_version(connection, None)
+
+    assert migrate_module.migrate(engine, Config(CONFIG_PATH)) is True
+    assert locks["taken"] == 1
+    assert upgrades == ["head"]
+
+
+def test_waiting_replica_skips_upgrade(engine, upgrades, locks):
+    """Пока реплика ждала lock, другая довела схему до head."""
+    with engine.connect() as connection:
+        _set_version(connection, None)
+    locks["on_acquire"] = lambda connection: _set_version(connection, HEAD)
+
+    assert migrate_module.migrate(engine, Config(CONFIG_PATH)) is False
+    assert upgrades == []
+
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL не задан"
+)
+def test_advisory_lock_is_exclusive():
+    engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    key = migrate_module.MIGRATION_LOCK_KEY
+    try:
+        with engine.connect() as first, engine.connect() as second:
+            with migrate_module.advisory_lock(first, key):
+                taken = second.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": key}
+                ).scalar()
+                assert taken is False
+            taken = second.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": key}
+            ).scalar()
+            assert taken is True
+            second.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+    finally:
+        engine.dispose()
@@ -0,0 +1,242 @@
+"""Тесты помощников онлайн-миграций: SQL offline-режима и пакетный backfill."""
+
+import io
+import logging
+import os
+import secrets
+import sys
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.db import migrations  # noqa: E402
+
+
+def _offline_sql(run) -> list[str]:
+    """Выполняет помощники в offline-режиме alembic и возвращает SQL по строкам."""
+    buffer = io.StringIO()
+    context = MigrationContext.configure(
+        dialect_name="postgresql",
+        opts={"as_sql": True, "output_buffer": buffer},
+    )
+    with Operations.context(context):
+        run()
+    return [
+        statement.strip()
+        for statement in buffer.getvalue().split(";\n")
+        if statement.strip()
+    ]
+
+
+def test_index_is_built_concurrently_outside_transaction():
+    sql = _offline_sql(
+        lambda: migrations.create_index_concurrently(
+            "ix_refresh_tokens_user_id_live",
+            "refresh_tokens",
+            ["user_id"],
+            where="deleted_at IS NULL",
+        )
+    )
+
+    assert sql[0] == "COMMIT"
+    assert sql[1] == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_refresh_tokens_user_id_live "
+        "ON refresh_tokens (user_id) WHERE deleted_at IS NULL"
+    )
+
+
+def test_unique_index_checks_for_case_variant_duplicates():
+    engine = sa.create_engine("sqlite://")
+    with engine.connect() as connection:
+        connection.execute(
+            sa.text('CREATE TABLE "user" (email text, deleted_at timestamp)')
+        )
+        connection.execute(
+            sa.text(
+                "INSERT INTO \"user\" VALUES ('A@x.io', NULL), ('b@x.io', NULL), "
+                "('b@x.io', '2026-01-01'), ('a@X.io', NULL)"
+            )
+        )
+        context = MigrationContext.configure(connection=connection)
+        with Operations.context(context):
+            with pytest.raises(migrations.DuplicateKeys, match="'a@x.io', 2"):
+                migrations.create_index_concurrently(
+                    "ix_user_email_lower_live",
+                    "user",
+                    [sa.text("lower(email)")],
+                    unique=True,
+                    where="deleted_at IS NULL",
+                )
+            # Мягко удалённый дубликат уникальности не нарушает
+            migrations._check_unique(
+                "ix_user_email_live", "user", ["email"], "deleted_at IS NULL"
+            )
+    engine.dispose()
+
+
+def test_change_column_type_steps_in_order():
+    sql = _offline_sql(
+        lambda: migrations.change_column_type(
+            "refresh_tokens",
+            "expires_at",
+            sa.DateTime(timezone=True),
+            "{column} AT TIME ZONE 'UTC'",
+            nullable=False,
+        )
+    )
+    text = "\n".join(sql)
+
+    steps = [
+        "ADD COLUMN expires_at_new TIMESTAMP WITH TIME ZONE",
+        "NEW.expires_at_new := NEW.expires_at AT TIME ZONE 'UTC'",
+        "UPDATE refresh_tokens SET expires_at_new = expires_at AT TIME ZONE 'UTC'",
+        "CHECK (expires_at_new IS NOT NULL) NOT VALID",
+        "VALIDATE CONSTRAINT",
+        "ALTER COLUMN expires_at_new SET NOT NULL",
+        "DROP TRIGGER IF EXISTS refresh_tokens_sync_expires_at_new",
+        "RENAME COLUMN expires_at TO expires_at_old",
+        "RENAME COLUMN expires_at_new TO expires_at",
+    ]
+    positions = [text.index(step) for step in steps]
+    assert positions == sorted(positions)
+    # Ни один шаг не переписывает таблицу через ALTER COLUMN ... TYPE
+    assert " TYPE " not in text
+
+
+def test_add_column_rejects_not_null():
+    with pytest.raises(ValueError):
+        _offline_sql(
+            lambda: migrations.add_column(
+                "user", sa.Column("flag", sa.Boolean(), nullable=False)
+            )
+        )
+
+
+def test_backfill_runs_in_batches_and_resumes(tmp_path, caplog):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    with engine.connect() as connection:
+        connection.execute(sa.text("CREATE TABLE items (id INTEGER PRIMARY KEY, a INTEGER, b INTEGER)"))
+        connection.execute(
+            sa.text("INSERT INTO items (id, a) VALUES (:id, :a)"),
+            [{"id": n, "a": n} for n in range(1, 11)],
+        )
+        connection.execute(sa.text("UPDATE items SET b = -1 WHERE id = 4"))
+        connection.commit()
+
+        context = MigrationContext.configure(connection=connection)
+        with Operations.context(context), caplog.at_level(
+            logging.INFO, logger="users.migrations"
+        ):
+            updated = migrations.backfill("items", "b", "a * 2", batch_size=3, pause=0)
+            again = migrations.backfill("items", "b", "a * 2", batch_size=3, pause=0)
+
+        rows = dict(connection.execute(sa.text("SELECT id, b FROM items")).all())
+    engine.dispose()
+
+    assert updated == 9
+    assert again == 0
+    assert rows[4] == -1
+    assert rows[10] == 20
+    assert any("осталось" in record.getMessage() for record in caplog.records)
+
+
+def test_swap_releases_old_column_and_moves_default():
+    sql = _offline_sql(
+        lambda: migrations.swap_columns(
+            "refresh_tokens",
+            "expires_at",
+            "expires_at_new",
+            keep_old_as="expires_at_old",
+            server_default="now()",
+        )
+    )
+    text = "\n".join(sql)
+
+    steps = [
+        "RENAME COLUMN expires_at_new TO expires_at",
+        "ALTER COLUMN expires_at_old DROP NOT NULL",
+        "ALTER COLUMN expires_at_old DROP DEFAULT",
+        "ALTER COLUMN expires_at SET DEFAULT now()",
+        "COMMIT",
+    ]
+    positions = [text.rindex(step) for step in steps]
+    assert positions == sorted(positions)
+
+
+def test_failed_swap_rolls_back(monkeypatch):
+    def lock_timeout(table, target):
+        raise sa.exc.OperationalError("ALTER TABLE", {}, Exception("lock timeout"))
+
+    monkeypatch.setattr(migrations, "drop_sync_trigger", lock_timeout)
+    statements = []
+
+    def run():
+        try:
+            migrations.swap_columns(
+                "refresh_tokens",
+                "expires_at",
+                "expires_at_new",
+                keep_old_as="expires_at_old",
+                server_default="now()",
+            )
+        except sa.exc.OperationalError:
+            statements.append("raised")
+
+    sql = _offline_sql(run)
+
+    assert statements == ["raised"]
+    # Последний BEGIN — alembic после выхода из autocommit_block
+    assert sql[sql.index("BEGIN") :] == [
+        "BEGIN",
+        "SET LOCAL lock_timeout = '5s'",
+        "ROLLBACK",
+        "BEGIN",
+    ]
+
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL не задан"
+)
+def test_insert_after_swapping_not_null_column():
+    engine = sa.create_engine(os.environ["TEST_DATABASE_URL"])
+    table = f"swap_{secrets.token_hex(4)}"
+    try:
+        with engine.connect() as connection:
+            connection.execute(
+                sa.text(
+                    f"CREATE TABLE {table} (id serial PRIMARY KEY, "
+                    "expires_at timestamp NOT NULL DEFAULT now())"
+                )
+            )
+            connection.execute(sa.text(f"INSERT INTO {table} DEFAULT VALUES"))
+            connection.commit()
+
+            context = MigrationContext.configure(connection=connection)
+            with Operations.context(context):
+                migrations.change_column_type(
+                    table,
+                    "expires_at",
+                    sa.DateTime(timezone=True),
+                    "{column} AT TIME ZONE 'UTC'",
+                    nullable=False,
+                    pause=0,
+                )
+
+            # Приложение знает только новую колонку: INSERT не должен упасть
+            # ни на NOT NULL старой, ни без default новой
+            connection.execute(sa.text(f"INSERT INTO {table} DEFAULT VALUES"))
+            connection.commit()
+            nulls = connection.execute(
+                sa.text(f"SELECT count(*) FROM {table} WHERE expires_at IS NULL")
+            ).scalar()
+        assert nulls == 0
+    finally:
+        with engine.begin() as connection:
+            connection.execute(sa.text(f"DROP TABLE IF EXISTS {table}"))
+        engine.dispose()
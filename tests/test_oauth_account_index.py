@@ -0,0 +1,107 @@
+"""
+Тесты индекса поиска OAuth аккаунта.
+
+План запроса проверяется на реальном PostgreSQL, если задан
+TEST_DATABASE_URL (синхронный URL, например postgresql+psycopg2://...).
+Таблицы создаются во временной схеме внутри транзакции, которая откатывается.
+"""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.db.base import Base  # noqa: E402
+from app.db.database import UserDatabase  # noqa: E402
+from app.db.models import OAuthAccount, User  # noqa: E402
+
+INDEX_NAME = "ix_oauth_account_provider_live"
+
+
+class CapturingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+        class Result:
+            def unique(self):
+                return self
+
+            def scalar_one_or_none(self):
+                return None
+
+        return Result()
+
+
+async def _lookup_sql() -> str:
+    session = CapturingSession()
+    await UserDatabase(session, User, OAuthAccount).get_by_oauth_account(
+        "google", "people/42"
+    )
+    return str(
+        session.statements[0].compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def test_composite_index_replaces_single_column_indexes():
+    indexes = {index.name: index for index in OAuthAccount.__table__.indexes}
+    sql = str(CreateIndex(indexes[INDEX_NAME]).compile(dialect=postgresql.dialect()))
+
+    assert sql == (
+        "CREATE UNIQUE INDEX ix_oauth_account_provider_live ON oauth_account "
+        "(oauth_name, account_id) INCLUDE (user_id) WHERE deleted_at IS NULL"
+    )
+    assert "ix_oauth_account_oauth_name" not in indexes
+    assert "ix_oauth_account_account_id" not in indexes
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL не задан"
+)
+async def test_oauth_lookup_plan_uses_composite_index():
+    sql = await _lookup_sql()
+    engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            connection.execute(text("CREATE SCHEMA plan_test"))
+            connection.execute(text("SET LOCAL search_path TO plan_test"))
+            Base.metadata.create_all(
+                connection, tables=[User.__table__, OAuthAccount.__table__]
+            )
+            connection.execute(
+                text(
+                    """
+                    INSERT INTO "user" (email, hashed_password, is_active,
+                                        is_superuser, is_verified)
+                    SELECT 'u' || n || '@example.com', 'h', true, false, true
+                    FROM generate_series(1, 20000) n;
+                    INSERT INTO oauth_account (user_id, oauth_name, access_token,
+                                               account_id, account_email)
+                    SELECT id, 'google', 't', 'people/' || id, email FROM "user";
+                    ANALYZE "user";
+                    ANALYZE oauth_account;
+                    """
+                )
+            )
+            plan = "\n".join(
+                row[0] for row in connection.execute(text(f"EXPLAIN {sql}"))
+            )
+        finally:
+            transaction.rollback()
+    engine.dispose()
+
+    assert INDEX_NAME in plan
+    assert "Seq Scan on oauth_account" not in plan
@@ -0,0 +1,71 @@
+"""
+Тесты режима PgBouncer (transaction pooling).
+
+Интеграционный тест идёт через локальный пулер, если задан
+TEST_PGBOUNCER_URL (postgresql+asyncpg://...@localhost:6432/db).
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.db.database import direct_db_url, engine_options  # noqa: E402
+from config import settings  # noqa: E402
+
+
+def test_default_mode_keeps_statement_caches():
+    assert "connect_args" not in engine_options(pgbouncer=False)
+
+
+def test_pgbouncer_mode_disables_caches_and_names_statements_uniquely():
+    connect_args = engine_options(pgbouncer=True)["connect_args"]
+
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    assert "server_settings" not in connect_args
+    name_func = connect_args["prepared_statement_name_func"]
+    assert len({name_func() for _ in range(1000)}) == 1000
+
+
+def test_direct_url_falls_back_to_db_host():
+    assert direct_db_url.host == (settings.db_direct_host or settings.db_host)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not os.getenv("TEST_PGBOUNCER_URL"), reason="TEST_PGBOUNCER_URL не задан"
+)
+async def test_concurrent_workers_through_transaction_pooler():
+    """
+    Несколько «воркеров» гоняют одни и те же запросы в отдельных транзакциях.
+
+    Без режима PgBouncer это падает на повторном имени подготовленного
+    выражения или на кэше выражений, созданных на другом серверном соединении.
+    """
+    engines = [
+        create_async_engine(os.environ["TEST_PGBOUNCER_URL"], **engine_options(True))
+        for _ in range(4)
+    ]
+
+    async def worker(engine, n):
+        for i in range(20):
+            async with engine.begin() as connection:
+                value = await connection.scalar(
+                    text("SELECT CAST(:v AS integer) + 1"), {"v": n * 100 + i}
+                )
+                assert value == n * 100 + i + 1
+
+    try:
+        await asyncio.gather(
+            *(worker(engine, n) for n, engine in enumerate(engines) for _ in range(5))
+        )
+    finally:
+        await asyncio.gather(*(engine.dispose() for engine in engines))
@@ -0,0 +1,441 @@
+"""
+Тесты счётчика SQL-запросов и бюджетов маршрутов.
+
+Механизм и бюджеты всех маршрутов из QUERY_BUDGETS проверяются на sqlite:
+настоящий код маршрутов (UserDatabase, crud) выполняет SQL через
+синхронную сессию, события движка считают выражения. Бюджет
+/api/auth/refresh дополнительно проверяется на реальном PostgreSQL, если
+задан TEST_DATABASE_URL (синхронный URL, например postgresql+psycopg2://...):
+таблицы создаются во временной схеме.
+"""
+
+import logging
+import os
+import secrets
+import sys
+from datetime import datetime, timedelta, timezone
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from fastapi_users.jwt import generate_jwt
+from fastapi_users.manager import VERIFY_USER_TOKEN_AUDIENCE
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.pool import StaticPool
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.middleware.queries import (  # noqa: E402
+    QUERY_BUDGETS,
+    QueryBudgetExceeded,
+    QueryCounterMiddleware,
+    count_queries,
+    install_query_counter,
+    query_budget,
+    route_metrics,
+)
+from config import settings  # noqa: E402
+
+
+def _as_utc(instance, *args) -> None:
+    """sqlite не хранит часовой пояс: возвращаем его колонкам DateTime(timezone=True)."""
+    for column in instance.__table__.columns:
+        value = instance.__dict__.get(column.key)
+        if isinstance(value, datetime) and value.tzinfo is None and column.type.timezone:
+            set_committed_value(instance, column.key, value.replace(tzinfo=timezone.utc))
+
+
+class SyncBackedSession:
+    """
+    Сессия запроса поверх синхронной Session на sqlite.
+
+    Повторяет методы AsyncSession, которые вызывают маршруты, UserDatabase
+    и стратегия: без async-драйвера sqlite выполняется настоящий SQL.
+    """
+
+    def __init__(self, session: Session):
+        self.sync = session
+
+    def add(self, instance) -> None:
+        self.sync.add(instance)
+
+    async def execute(self, statement, *args, **kwargs):
+        return self.sync.execute(statement, *args, **kwargs)
+
+    async def commit(self) -> None:
+        self.sync.commit()
+
+    async def refresh(self, instance, *args, **kwargs) -> None:
+        self.sync.refresh(instance, *args, **kwargs)
+
+    async def delete(self, instance) -> None:
+        self.sync.delete(instance)
+
+    @asynccontextmanager
+    async def begin(self):
+        with self.sync.begin():
+            yield
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine("sqlite://")
+    install_query_counter(engine)
+    install_query_counter(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_counts_only_inside_block(sqlite_engine):
+    with sqlite_engine.connect() as connection:
+        connection.execute(text("SELECT 0"))
+        with count_queries() as stats:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+
+    assert stats.count == 2
+    assert stats.duration > 0
+    assert set(stats.statements) == {"SELECT 1", "SELECT 2"}
+
+
+def test_query_budget_fails_on_overflow(sqlite_engine):
+    with sqlite_engine.connect() as connection:
+        with query_budget(2):
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 1"))
+
+        with pytest.raises(QueryBudgetExceeded, match="3 SQL-выражений при бюджете 2"):
+            with query_budget(2):
+                for _ in range(3):
+                    connection.execute(text("SELECT 1"))
+
+
+def test_repeated_statements_flag_n_plus_one(sqlite_engine):
+    with sqlite_engine.connect() as connection, count_queries() as stats:
+        connection.execute(text("SELECT 0"))
+        for n in range(5):
+            connection.execute(text("SELECT :n"), {"n": n})
+
+    assert stats.repeated(5) == [("SELECT ?", 5)]
+
+
+@pytest.mark.asyncio
+async def test_middleware_sets_headers_and_route_metrics(sqlite_engine, caplog):
+    app = FastAPI()
+
+    @app.get("/items", name="items:list")
+    async def items():
+        with sqlite_engine.connect() as connection:
+            for n in range(3):
+                connection.execute(text("SELECT :n"), {"n": n})
+        return []
+
+    app.add_middleware(
+        QueryCounterMiddleware, budgets={"items:list": 2}, repeat_threshold=3
+    )
+    route_metrics.pop("items:list", None)
+
+    with caplog.at_level(logging.WARNING, logger="users.queries"):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.get("/items")
+
+    assert response.headers["X-DB-Queries"] == "3"
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+    assert route_metrics.pop("items:list").as_dict()["max_queries"] == 3
+    messages = [record.getMessage() for record in caplog.records]
+    assert "items:list: 3 SQL-выражений при бюджете 2" in messages
+    assert "items:list: возможный N+1, 3 x SELECT ?" in messages
+
+
+def test_budgets_refer_to_existing_routes(app):
+    names = {route.name for route in app.routes}
+
+    assert set(QUERY_BUDGETS) <= names
+
+
+@pytest.mark.asyncio
+async def test_queries_endpoint_hidden_outside_debug(client):
+    settings.debug = False
+
+    response = await client.get("/health/queries")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL не задан"
+)
+async def test_refresh_route_within_budget(app, monkeypatch):
+    from app.db.base import Base
+    from app.db.database import get_async_session
+    from app.db.models import RefreshToken, User
+    from app.routes import token as token_routes
+    from app.services.refresh_grace import RefreshGraceCache
+
+    monkeypatch.setattr(settings, "refresh_rotate_after_fraction", 0.5)
+    redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(
+        token_routes, "refresh_grace_cache", RefreshGraceCache(lambda: redis, ttl=10)
+    )
+    url = make_url(os.environ["TEST_DATABASE_URL"]).set(
+        drivername="postgresql+asyncpg"
+    )
+    schema = f"budget_{secrets.token_hex(4)}"
+    engine = create_async_engine(
+        url, connect_args={"server_settings": {"search_path": schema}}
+    )
+    install_query_counter(engine)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def override_get_async_session():
+        async with sessionmaker() as session:
+            yield session
+
+    async def refresh(client, token):
+        client.cookies.set(settings.refresh_token_name, token)
+        with query_budget(QUERY_BUDGETS["token:refresh_token"]) as stats:
+            response = await client.post("/api/auth/refresh")
+        client.cookies.clear()
+        assert response.status_code == 204
+        return stats.count
+
+    app.dependency_overrides[get_async_session] = override_get_async_session
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text(f"CREATE SCHEMA {schema}"))
+            await connection.run_sync(
+                Base.metadata.create_all,
+                tables=[User.__table__, RefreshToken.__table__],
+            )
+        now = datetime.now(timezone.utc)
+        async with sessionmaker() as session, session.begin():
+            user = User(
+                email="budget@example.com",
+                hashed_password="h",
+                is_active=True,
+                is_verified=True,
+            )
+            session.add(user)
+            await session.flush()
+            fresh = RefreshToken.create(user.id)
+            old = RefreshToken.create(
+                user.id,
+                session_started_at=now - timedelta(seconds=settings.refresh_token_expire_sec),
+            )
+            old.created_at = old.session_started_at
+            session.add_all([fresh, old])
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            assert await refresh(client, fresh.token) == 1
+            assert await refresh(client, old.token) <= 4
+    finally:
+        app.dependency_overrides.pop(get_async_session, None)
+        async with engine.begin() as connection:
+            await connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await engine.dispose()
+        await redis.aclose()
+
+
+PASSWORD = "correct-password-123"
+
+
+@pytest_asyncio.fixture
+async def budget_db(app, user_etag_cache, monkeypatch):
+    """sqlite с таблицами пользователей и refresh token вместо сессии запроса."""
+    from app.db.base import Base
+    from app.db.database import get_async_session
+    from app.db.models import OAuthAccount, RefreshToken, User
+    from app.routes import token as token_routes
+    from app.services.passwords import password_hasher
+    from app.services.refresh_grace import RefreshGraceCache
+    from app.services.revocation import token_denylist
+
+    monkeypatch.setattr(settings, "refresh_rotate_after_fraction", 0.5)
+    monkeypatch.setattr(token_denylist, "is_revoked", AsyncMock(return_value=False))
+    monkeypatch.setattr(token_denylist, "revoke", AsyncMock())
+    redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(
+        token_routes, "refresh_grace_cache", RefreshGraceCache(lambda: redis, ttl=10)
+    )
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(
+        engine,
+        tables=[User.__table__, OAuthAccount.__table__, RefreshToken.__table__],
+    )
+    install_query_counter(engine)
+
+    async def override_get_async_session():
+        with Session(engine, expire_on_commit=False) as session:
+            yield SyncBackedSession(session)
+
+    hashed = await password_hasher.hash(PASSWORD)
+    with Session(engine) as session:
+        session.add_all(
+            [
+                User(
+                    id=1,
+                    email="admin@example.com",
+                    hashed_password=hashed,
+                    is_superuser=True,
+                    is_verified=True,
+                ),
+                User(
+                    id=2,
+                    email="user@example.com",
+                    hashed_password=hashed,
+                    is_verified=True,
+                ),
+            ]
+        )
+        session.commit()
+
+    app.dependency_overrides[get_async_session] = override_get_async_session
+    for name in ("load", "refresh"):
+        event.listen(Base, name, _as_utc, propagate=True)
+    try:
+        yield engine
+    finally:
+        for name in ("load", "refresh"):
+            event.remove(Base, name, _as_utc)
+        app.dependency_overrides.pop(get_async_session, None)
+        engine.dispose()
+        await redis.aclose()
+
+
+@pytest_asyncio.fixture
+async def budget_client(app, budget_db):
+    # Cookie токенов выставляются с Secure
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="https://test"
+    ) as client:
+        yield client
+
+
+async def _login(client, email: str = "user@example.com") -> None:
+    response = await client.post(
+        "/api/auth/login", data={"username": email, "password": PASSWORD}
+    )
+    assert response.status_code == 204
+
+
+async def _measure(name: str, request) -> int:
+    """Выполняет запрос под бюджетом маршрута ``name``; возвращает число выражений."""
+    with query_budget(QUERY_BUDGETS[name]) as stats:
+        response = await request
+    assert response.status_code < 400, response.text
+    return stats.count
+
+
+async def _login_budget(client, db):
+    return await _measure(
+        "auth:cookie.login",
+        client.post(
+            "/api/auth/login",
+            data={"username": "user@example.com", "password": PASSWORD},
+        ),
+    )
+
+
+async def _logout_budget(client, db):
+    await _login(client)
+    return await _measure("auth:cookie.logout", client.post("/api/auth/logout"))
+
+
+async def _register_budget(client, db):
+    with patch("app.services.users.send_email", new_callable=AsyncMock):
+        return await _measure(
+            "register:register",
+            client.post(
+                "/api/auth/register",
+                json={"email": "new@example.com", "password": PASSWORD},
+            ),
+        )
+
+
+async def _verify_budget(client, db):
+    token = generate_jwt(
+        {
+            "email": "new@example.com",
+            "hashed_password": "hashed",
+            "aud": VERIFY_USER_TOKEN_AUDIENCE,
+        },
+        settings.jwt_secret,
+        lifetime_seconds=600,
+    )
+    return await _measure(
+        "verify:verify", client.post("/api/auth/verify", json={"token": token})
+    )
+
+
+async def _me_budget(client, db):
+    await _login(client)
+    return await _measure("users:me", client.get("/api/users/me"))
+
+
+async def _user_budget(client, db):
+    await _login(client, "admin@example.com")
+    return await _measure("users:user", client.get("/api/users/2"))
+
+
+async def _refresh_budget(client, db):
+    from app.db.models import RefreshToken
+
+    await _login(client)
+    fresh = await _measure("token:refresh_token", client.post("/api/auth/refresh"))
+
+    # Токен старше порога ротации: блокировка, DELETE и INSERT
+    with Session(db) as session:
+        old = session.execute(text("SELECT token FROM refresh_tokens")).scalar()
+        session.execute(
+            RefreshToken.__table__.update().values(
+                created_at=datetime.now(timezone.utc)
+                - timedelta(seconds=settings.refresh_token_expire_sec)
+            )
+        )
+        session.commit()
+    client.cookies.set(settings.refresh_token_name, old, path="/api/auth/refresh")
+    rotated = await _measure("token:refresh_token", client.post("/api/auth/refresh"))
+    assert fresh < rotated
+    return rotated
+
+
+BUDGET_SCENARIOS = {
+    "auth:cookie.login": _login_budget,
+    "auth:cookie.logout": _logout_budget,
+    "register:register": _register_budget,
+    "verify:verify": _verify_budget,
+    "users:me": _me_budget,
+    "users:user": _user_budget,
+    "token:refresh_token": _refresh_budget,
+}
+
+
+def test_every_budget_is_checked():
+    assert set(BUDGET_SCENARIOS) == set(QUERY_BUDGETS)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", sorted(BUDGET_SCENARIOS))
+async def test_route_within_budget(name, budget_client, budget_db):
+    count = await BUDGET_SCENARIOS[name](budget_client, budget_db)
+
+    assert 0 < count <= QUERY_BUDGETS[name]
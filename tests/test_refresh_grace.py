@@ -0,0 +1,120 @@
+"""Тесты окна refresh: параллельные запросы с одной cookie получают одну пару."""
+
+import os
+import sys
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.routes.token as token_routes  # noqa: E402
+from app.services.refresh_grace import RefreshGraceCache  # noqa: E402
+from config import settings  # noqa: E402
+
+# Старше порога ротации: каждый refresh меняет токен
+OLD_AGE = settings.refresh_token_expire_sec * 0.9
+
+
+@pytest_asyncio.fixture
+async def grace_cache(monkeypatch):
+    redis = fakeredis.FakeAsyncRedis()
+    cache = RefreshGraceCache(lambda: redis, ttl=10)
+    monkeypatch.setattr(token_routes, "refresh_grace_cache", cache)
+    yield cache
+    await redis.aclose()
+
+
+@pytest.fixture
+def old_token(refresh_session, refresh_user, issue_refresh_token):
+    refresh_session.rows["old-token"] = issue_refresh_token(
+        "old-token", refresh_user, age_sec=OLD_AGE
+    )
+    return refresh_session
+
+
+async def _refresh(client, token: str):
+    client.cookies.set(settings.refresh_token_name, token)
+    try:
+        return await client.post("/api/auth/refresh")
+    finally:
+        client.cookies.clear()
+
+
+@pytest.mark.asyncio
+async def test_cache_roundtrip_and_disabled():
+    redis = fakeredis.FakeAsyncRedis()
+    cache = RefreshGraceCache(lambda: redis, ttl=10)
+
+    await cache.put("old", "access", "new")
+    assert await cache.get("old") == ("access", "new")
+    assert 0 < await redis.ttl(next(iter(await redis.keys("*")))) <= 10
+    await cache.discard("old")
+    assert await cache.get("old") is None
+
+    disabled = RefreshGraceCache(lambda: redis, ttl=0)
+    await disabled.put("old", "access", "new")
+    assert await disabled.get("old") is None
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_repeated_refresh_in_window_returns_same_pair(
+    client, old_token, grace_cache
+):
+    first = await _refresh(client, "old-token")
+    second = await _refresh(client, "old-token")
+
+    assert first.status_code == second.status_code == 204
+    assert first.cookies["access_token"] == second.cookies["access_token"]
+    assert (
+        first.cookies[settings.refresh_token_name]
+        == second.cookies[settings.refresh_token_name]
+    )
+    assert old_token.log == ["select", "select for update", "delete", "add"]
+
+
+@pytest.mark.asyncio
+async def test_waiter_on_row_lock_gets_successors(client, old_token, grace_cache):
+    """Запрос, не нашедший строку после чужой ротации, берёт пару из кэша."""
+    await grace_cache.put("old-token", "access", "successor")
+    old_token.rotated_concurrently = True
+    real_get = grace_cache.get
+    calls = []
+
+    async def get(token):
+        calls.append(token)
+        # Первая проверка — до блокировки, когда ротация ещё не закончилась
+        return None if len(calls) == 1 else await real_get(token)
+
+    grace_cache.get = get
+    response = await _refresh(client, "old-token")
+
+    assert response.status_code == 204
+    assert response.cookies[settings.refresh_token_name] == "successor"
+    assert old_token.log.count("select for update") == 1
+
+
+@pytest.mark.asyncio
+async def test_old_token_is_single_use_after_window(
+    client, old_token, grace_cache
+):
+    await _refresh(client, "old-token")
+    await grace_cache.discard("old-token")
+
+    response = await _refresh(client, "old-token")
+
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_discards_successors(client, old_token, grace_cache):
+    old_token.fail_commit = True
+
+    with pytest.raises(ConnectionError):
+        await _refresh(client, "old-token")
+
+    assert await grace_cache.get("old-token") is None
@@ -0,0 +1,129 @@
+"""Тесты ротации refresh token по порогу и предела длительности сессии."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.crud.refresh_tokens import select_refresh_token  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.models import RefreshToken, User  # noqa: E402
+from config import settings  # noqa: E402
+
+LIFETIME = settings.refresh_token_expire_sec
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    monkeypatch.setattr(settings, "refresh_rotate_after_fraction", 0.5)
+    monkeypatch.setattr(settings, "refresh_session_max_sec", LIFETIME * 3)
+
+
+async def _refresh(client, token: str):
+    client.cookies.set(settings.refresh_token_name, token)
+    try:
+        return await client.post("/api/auth/refresh")
+    finally:
+        client.cookies.clear()
+
+
+def test_create_uses_configured_lifetime(policy):
+    token = RefreshToken.create(1)
+
+    assert token.session_started_at == token.created_at
+    assert token.expires_at - token.created_at == timedelta(seconds=LIFETIME)
+
+
+def test_successor_keeps_session_start_and_is_capped(policy):
+    started = datetime.now(timezone.utc) - timedelta(seconds=LIFETIME * 2.5)
+    token = RefreshToken.create(1, session_started_at=started)
+
+    successor = token.successor()
+
+    assert successor.session_started_at == started
+    assert successor.expires_at == started + timedelta(seconds=LIFETIME * 3)
+
+
+def test_rotation_due_after_threshold(policy, refresh_user, issue_refresh_token):
+    now = datetime.now(timezone.utc)
+
+    assert not issue_refresh_token("t", refresh_user, LIFETIME * 0.4).rotation_due(now)
+    assert issue_refresh_token("t", refresh_user, LIFETIME * 0.6).rotation_due(now)
+
+
+def test_no_rotation_when_session_cap_reached(policy):
+    """Преемник истёк бы не позже текущего токена — ротировать незачем."""
+    now = datetime.now(timezone.utc)
+    started = now - timedelta(seconds=LIFETIME * 3 - 60)
+    token = RefreshToken.create(1, session_started_at=started)
+    token.created_at = now - timedelta(seconds=30)
+
+    assert not token.rotation_due(now)
+
+
+@pytest.mark.asyncio
+async def test_fresh_token_refresh_has_no_writes(
+    policy, client, refresh_session, refresh_user, issue_refresh_token
+):
+    refresh_session.rows["fresh"] = issue_refresh_token(
+        "fresh", refresh_user, LIFETIME * 0.1
+    )
+
+    response = await _refresh(client, "fresh")
+
+    assert response.status_code == 204
+    assert response.cookies["access_token"]
+    assert response.cookies[settings.refresh_token_name] == "fresh"
+    assert refresh_session.log == ["select"]
+
+
+@pytest.mark.asyncio
+async def test_old_token_is_rotated(
+    policy, client, refresh_session, refresh_user, issue_refresh_token
+):
+    refresh_session.rows["old"] = issue_refresh_token(
+        "old", refresh_user, LIFETIME * 0.9
+    )
+
+    response = await _refresh(client, "old")
+
+    assert response.status_code == 204
+    new_token = response.cookies[settings.refresh_token_name]
+    assert new_token != "old"
+    assert set(refresh_session.rows) == {new_token}
+    assert refresh_session.log == ["select", "select for update", "delete", "add"]
+
+
+@pytest.mark.parametrize(
+    "user_state, found",
+    [
+        ({}, True),
+        ({"is_active": False}, False),
+        ({"deleted_at": datetime(2026, 1, 1, tzinfo=timezone.utc)}, False),
+    ],
+)
+def test_refresh_lookup_skips_inactive_and_deleted_users(user_state, found):
+    """Иначе удалённый пользователь выпускал бы access токены до конца сессии."""
+    engine = sa.create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, RefreshToken.__table__])
+    with Session(engine) as session:
+        user = User(email="u@example.com", hashed_password="h", **user_state)
+        session.add(user)
+        session.flush()
+        token = RefreshToken.create(user.id)
+        session.add(token)
+        session.commit()
+
+        row = session.execute(select_refresh_token(token.token)).scalars().first()
+
+    engine.dispose()
+    assert (row is not None) is found
+    if found:
+        assert row.user.email == "u@example.com"
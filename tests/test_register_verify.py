@@ -162,21 +162,48 @@ async def test_verify_expired_token(client, mock_user_db):
 
 @pytest.mark.asyncio
 async def test_verify_user_already_exists(client, mock_user_db):
-    """Токен валидный, но пользователь с таким email уже есть → ошибка, пользователь не создаётся."""
-    from fastapi_users import exceptions as fu_exceptions
-
+    """Токен валидный, но пользователь с таким email уже есть → 400, пользователь не создаётся."""
     email = "existing@example.com"
     token = _make_verify_token(email, "hash")
     existing_user = type("User", (), {"id": 1, "email": email})()
     mock_user_db.get_by_email_result = existing_user
     mock_user_db.create_called = False
 
-    try:
-        response = await client.post("/api/auth/verify", json={"token": token})
-        # Роутер не ловит UserAlreadyExists → 500
-        assert response.status_code in (400, 500)
-    except fu_exceptions.UserAlreadyExists:
-        # В некоторых тестовых запусках исключение может пробрасываться
-        pass
+    response = await client.post("/api/auth/verify", json={"token": token})
 
+    assert response.status_code == 400
+    assert response.json()["detail"] == ErrorCode.VERIFY_USER_ALREADY_VERIFIED
     assert not mock_user_db.create_called
+
+
+@pytest.mark.asyncio
+async def test_verify_creates_user_with_single_upsert():
+    """Создание при verify — один INSERT ... ON CONFLICT (lower(email)) DO NOTHING."""
+    from sqlalchemy.dialects import postgresql
+
+    from app.db.database import UserDatabase
+    from app.db.models import OAuthAccount, User
+
+    class Session:
+        statements = []
+
+        async def execute(self, statement):
+            self.statements.append(statement)
+            result = type("Result", (), {"scalar_one_or_none": lambda self: None})
+            return result()
+
+        async def commit(self):
+            pass
+
+    session = Session()
+    user_db = UserDatabase(session, User, OAuthAccount)
+
+    created = await user_db.create_if_not_exists(
+        {"email": "a@example.com", "hashed_password": "h", "is_verified": True}
+    )
+
+    assert created is None
+    assert len(session.statements) == 1
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (lower(email)) WHERE deleted_at IS NULL DO NOTHING" in sql
+    assert "RETURNING" in sql
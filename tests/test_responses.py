@@ -0,0 +1,93 @@
+"""Тесты быстрой сериализации: UserRead, заготовленные ошибки и /api/users/me."""
+
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi_users.router.common import ErrorCode
+from starlette.exceptions import HTTPException
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.schemas.users import UserRead  # noqa: E402
+from app.services.users import current_active_user  # noqa: E402
+from app.utils.responses import (  # noqa: E402
+    ERROR_PAYLOADS,
+    FastJSONResponse,
+    http_exception_handler,
+    model_response,
+)
+
+USER = SimpleNamespace(
+    id=5,
+    email="user@example.com",
+    is_active=True,
+    is_superuser=False,
+    is_verified=True,
+    hashed_password="hash",
+    updated_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+)
+
+
+def test_model_response_matches_default_encoding():
+    """Тело совпадает с тем, что FastAPI отдал бы для response_model=UserRead."""
+    response = model_response(UserRead, USER)
+
+    expected = jsonable_encoder(UserRead.model_validate(USER))
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == expected
+    assert "hashed_password" not in json.loads(response.body)
+
+
+def test_fast_json_response_renders_compact_utf8():
+    response = FastJSONResponse({"detail": "Ошибка", "n": [1, 2]})
+    assert json.loads(response.body) == {"detail": "Ошибка", "n": [1, 2]}
+    assert b" " not in response.body
+
+
+def test_error_payloads_cover_error_codes():
+    for code in ErrorCode:
+        assert json.loads(ERROR_PAYLOADS[code]) == {"detail": code.value}
+
+
+@pytest.mark.asyncio
+async def test_static_error_payload_keeps_status_and_headers(client):
+    """401 без токена отдаёт заготовленное тело и стандартный формат ошибки."""
+    response = await client.post("/api/auth/refresh")
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Missing token or inactive user."}
+
+
+@pytest.mark.asyncio
+async def test_handler_falls_back_for_dynamic_detail():
+    """Заготовка берётся только для известных строк, headers сохраняются."""
+    static = await http_exception_handler(
+        None,
+        HTTPException(401, detail=ErrorCode.LOGIN_BAD_CREDENTIALS, headers={"X-A": "1"}),
+    )
+    dynamic = await http_exception_handler(
+        None, HTTPException(400, detail={"code": "X", "reason": "причина"})
+    )
+
+    assert static.body == ERROR_PAYLOADS[ErrorCode.LOGIN_BAD_CREDENTIALS]
+    assert static.headers["x-a"] == "1"
+    assert json.loads(dynamic.body) == {"detail": {"code": "X", "reason": "причина"}}
+
+
+@pytest.mark.asyncio
+async def test_users_me_returns_user_read(auth_app, client, user_etag_cache):
+    auth_app.dependency_overrides[current_active_user] = lambda: USER
+    try:
+        response = await client.get("/api/users/me")
+    finally:
+        auth_app.dependency_overrides.pop(current_active_user, None)
+
+    assert response.status_code == 200
+    assert response.json() == jsonable_encoder(UserRead.model_validate(USER))
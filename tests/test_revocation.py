@@ -0,0 +1,164 @@
+"""Тесты отзыва access токенов: фильтр Блума, Redis denylist и стратегия JWT."""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.services.users as users_module  # noqa: E402
+from app.services.revocation import (  # noqa: E402
+    KEY_PREFIX,
+    BloomFilter,
+    TokenDenylist,
+)
+from app.services.users import get_strategy  # noqa: E402
+
+
+class CountingRedis:
+    """Обёртка над fakeredis, считающая обращения EXISTS."""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self.exists_calls = 0
+
+    async def exists(self, *keys):
+        self.exists_calls += 1
+        return await self._redis.exists(*keys)
+
+    def __getattr__(self, item):
+        return getattr(self._redis, item)
+
+
+class StubUserManager:
+    def parse_id(self, value):
+        return int(value)
+
+    async def get(self, user_id):
+        return SimpleNamespace(id=user_id)
+
+
+def _denylist(redis) -> TokenDenylist:
+    return TokenDenylist(
+        lambda: redis,
+        channel="test:revoked",
+        capacity=1000,
+        error_rate=0.001,
+        rebuild_interval=3600,
+    )
+
+
+async def _wait_synced(*denylists) -> None:
+    for _ in range(100):
+        if all(denylist._synced for denylist in denylists):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("фильтр не синхронизировался")
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest_asyncio.fixture
+async def redis(server):
+    client = CountingRedis(fakeredis.FakeAsyncRedis(server=server))
+    yield client
+    await client.aclose()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_revoke_sets_key_with_ttl(redis):
+    denylist = _denylist(redis)
+
+    await denylist.revoke("abc", 120)
+    await denylist.revoke("expired", 0)
+
+    assert 0 < await redis.ttl(KEY_PREFIX + "abc") <= 120
+    assert not await redis.exists(KEY_PREFIX + "expired")
+    assert await denylist.is_revoked("abc")
+
+
+@pytest.mark.asyncio
+async def test_revoke_survives_redis_outage(redis, caplog):
+    class BrokenRedis:
+        async def set(self, *args, **kwargs):
+            raise RedisConnectionError("redis is down")
+
+    denylist = _denylist(BrokenRedis())
+
+    await denylist.revoke("abc", 120)
+
+    assert "Не удалось отозвать токен abc" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_synced_filter_skips_redis_for_live_tokens(redis):
+    await redis.set(KEY_PREFIX + "old", 1, ex=60)
+    denylist = _denylist(redis)
+    await denylist.start()
+    try:
+        await _wait_synced(denylist)
+        redis.exists_calls = 0
+
+        assert not await denylist.is_revoked("live-token")
+        assert redis.exists_calls == 0
+        assert await denylist.is_revoked("old")
+        assert redis.exists_calls == 1
+    finally:
+        await denylist.stop()
+
+
+@pytest.mark.asyncio
+async def test_revocation_reaches_other_worker_via_pubsub(server, redis):
+    other_redis = CountingRedis(fakeredis.FakeAsyncRedis(server=server))
+    revoking, other = _denylist(redis), _denylist(other_redis)
+    await other.start()
+    try:
+        await _wait_synced(other)
+        await revoking.revoke("stolen", 60)
+
+        for _ in range(100):
+            if "stolen" in other._bloom:
+                break
+            await asyncio.sleep(0.01)
+        assert await other.is_revoked("stolen")
+    finally:
+        await other.stop()
+        await other_redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_access_token(redis, monkeypatch):
+    monkeypatch.setattr(users_module, "token_denylist", _denylist(redis))
+    user = SimpleNamespace(id=7, is_verified=True, is_superuser=False)
+    strategy = get_strategy(request=None, session=None)
+    token = await strategy.write_token(user)
+    other_token = await strategy.write_token(user)
+
+    assert (await strategy.read_token(token, StubUserManager())).id == 7
+
+    await strategy.destroy_token(token, user)
+
+    assert await strategy.read_token(token, StubUserManager()) is None
+    assert (await strategy.read_token(other_token, StubUserManager())).id == 7
@@ -0,0 +1,102 @@
+"""Тесты production запуска: число воркеров и деление пула соединений."""
+
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import server  # noqa: E402
+from config import settings  # noqa: E402
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """Подменяет пути cgroup на временные файлы."""
+    paths = {
+        "CGROUP_V2_CPU_MAX": tmp_path / "cpu.max",
+        "CGROUP_V1_QUOTA": tmp_path / "cpu.cfs_quota_us",
+        "CGROUP_V1_PERIOD": tmp_path / "cpu.cfs_period_us",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(server, name, str(path))
+    return paths
+
+
+def test_cgroup_v2_quota(cgroup):
+    cgroup["CGROUP_V2_CPU_MAX"].write_text("250000 100000\n")
+    assert server.cgroup_cpu_limit() == 2.5
+
+
+def test_cgroup_v2_unlimited(cgroup):
+    cgroup["CGROUP_V2_CPU_MAX"].write_text("max 100000\n")
+    assert server.cgroup_cpu_limit() is None
+
+
+def test_cgroup_v1_quota(cgroup):
+    cgroup["CGROUP_V1_QUOTA"].write_text("200000\n")
+    cgroup["CGROUP_V1_PERIOD"].write_text("100000\n")
+    assert server.cgroup_cpu_limit() == 2.0
+
+
+def test_cgroup_v1_unlimited(cgroup):
+    cgroup["CGROUP_V1_QUOTA"].write_text("-1\n")
+    cgroup["CGROUP_V1_PERIOD"].write_text("100000\n")
+    assert server.cgroup_cpu_limit() is None
+
+
+def test_available_cpus_respects_quota(cgroup, monkeypatch):
+    """Квота 1.5 ядра на 8-ядерной машине даёт одного воркера."""
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: set(range(8)))
+    cgroup["CGROUP_V2_CPU_MAX"].write_text("150000 100000\n")
+    assert server.available_cpus() == 1
+
+
+def test_worker_count_override(monkeypatch):
+    monkeypatch.setattr(settings, "web_concurrency", 3)
+    assert server.worker_count() == 3
+
+
+def test_split_pool_budget(monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_budget", 20)
+    assert server.split_pool_budget(4) == 5
+    assert server.split_pool_budget(40) == 1
+
+
+def test_pool_settings_derived_when_unset(monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_budget", 20)
+    monkeypatch.setattr(settings, "__pydantic_fields_set__", set())
+    assert server.pool_settings(4) == (5, 0)
+
+
+def test_pool_settings_keep_explicit_values(monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_size", 7)
+    monkeypatch.setattr(settings, "db_max_overflow", 3)
+    monkeypatch.setattr(
+        settings, "__pydantic_fields_set__", {"db_pool_size", "db_max_overflow"}
+    )
+    assert server.pool_settings(4) == (7, 3)
+
+
+def test_single_worker_runs_under_supervisor(monkeypatch):
+    """Без супервизора у одного воркера не было бы SIGHUP-перезапуска."""
+    runs = []
+
+    class Supervisor:
+        def __init__(self, config, target, sockets):
+            runs.append(config.workers)
+
+        def run(self):
+            pass
+
+    monkeypatch.setattr(settings, "web_concurrency", 1)
+    monkeypatch.setattr(server, "Multiprocess", Supervisor)
+    monkeypatch.setattr(server.uvicorn.Config, "bind_socket", lambda self: None)
+    monkeypatch.setattr(os, "environ", dict(os.environ))
+
+    server.main()
+
+    assert runs == [1]
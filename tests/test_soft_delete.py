@@ -0,0 +1,83 @@
+"""Тесты мягкого удаления: живые запросы, частичные индексы и перенос в архив."""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.crud.archive import move_rows, select_expired_ids  # noqa: E402
+from app.crud.refresh_tokens import select_active_refresh_token  # noqa: E402
+from app.db.database import UserDatabase  # noqa: E402
+from app.db.models import OAuthAccount, User, UserArchive  # noqa: E402
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class CapturingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+        class Result:
+            def unique(self):
+                return self
+
+            def scalar_one_or_none(self):
+                return None
+
+        return Result()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "call",
+    [
+        lambda db: db.get(1),
+        lambda db: db.get_by_email("User@Example.com"),
+        lambda db: db.get_by_oauth_account("google", "42"),
+    ],
+)
+async def test_user_db_skips_soft_deleted(call):
+    session = CapturingSession()
+    await call(UserDatabase(session, User, OAuthAccount))
+
+    assert '"user".deleted_at IS NULL' in _sql(session.statements[0])
+
+
+def test_refresh_lookup_skips_soft_deleted():
+    assert "refresh_tokens.deleted_at IS NULL" in _sql(
+        select_active_refresh_token("token")
+    )
+
+
+def test_email_unique_index_is_partial_and_case_insensitive():
+    index = next(i for i in User.__table__.indexes if i.name == "ix_user_email_lower_live")
+    sql = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("CREATE UNIQUE INDEX")
+    assert "(lower(email)) WHERE deleted_at IS NULL" in sql
+
+
+def test_archive_moves_rows_in_one_statement():
+    table = User.__table__
+    cutoff = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    ids = select_expired_ids(table, cutoff, 100).scalar_subquery()
+
+    sql = _sql(move_rows(table, UserArchive, table.c.id.in_(ids)))
+
+    assert sql.startswith("WITH moved AS \n(DELETE FROM \"user\"")
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "RETURNING" in sql
+    assert "INSERT INTO user_archive" in sql
+    assert set(UserArchive.c.keys()) == set(table.c.keys()) | {"archived_at"}
@@ -0,0 +1,59 @@
+"""Тесты быстрого старта: ленивые импорты и OpenAPI схема из файла."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.utils.openapi import use_prebuilt_openapi  # noqa: E402
+
+
+def test_import_main_does_not_load_optional_subsystems():
+    """Импорт main не подтягивает fastapi_mail и Google OAuth клиент."""
+    code = (
+        "import sys, main; "
+        "print([m for m in sys.modules "
+        "if m.startswith(('fastapi_mail', 'httpx_oauth.clients'))])"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BASE_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert out.strip().splitlines()[-1] == "[]"
+
+
+@pytest.mark.asyncio
+async def test_openapi_served_from_prebuilt_file(tmp_path):
+    """Если файл схемы есть, /openapi.json отдаёт его содержимое."""
+    schema = {"openapi": "3.1.0", "info": {"title": "prebuilt", "version": "1"}}
+    path = tmp_path / "openapi.json"
+    path.write_text(json.dumps(schema))
+
+    app = FastAPI()
+    use_prebuilt_openapi(app, str(path))
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/openapi.json")
+
+    assert response.json() == schema
+
+
+def test_openapi_generated_when_file_missing(tmp_path):
+    """Без файла схема генерируется как обычно."""
+    app = FastAPI(title="generated")
+    use_prebuilt_openapi(app, str(tmp_path / "missing.json"))
+
+    assert app.openapi()["info"]["title"] == "generated"
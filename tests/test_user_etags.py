@@ -0,0 +1,231 @@
+"""Тесты ETag и условного GET для /api/users/me и /api/users/{id}."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.services.etags import etag_matches, user_etag  # noqa: E402
+from app.services.passwords import password_helper  # noqa: E402
+from app.services.revocation import token_denylist  # noqa: E402
+from app.services.users import (  # noqa: E402
+    UserManager,
+    current_active_user,
+    current_superuser,
+    get_strategy,
+)
+
+UPDATED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _user(id=5, updated_at=UPDATED_AT):
+    return SimpleNamespace(
+        id=id,
+        email=f"user{id}@example.com",
+        is_active=True,
+        is_superuser=False,
+        is_verified=True,
+        updated_at=updated_at,
+    )
+
+
+@pytest.fixture
+def current_user(auth_app):
+    user = _user()
+    auth_app.dependency_overrides[current_active_user] = lambda: user
+    yield user
+    auth_app.dependency_overrides.pop(current_active_user, None)
+
+
+@pytest.fixture
+def superuser(auth_app):
+    auth_app.dependency_overrides[current_superuser] = lambda: _user(id=1)
+    yield
+    auth_app.dependency_overrides.pop(current_superuser, None)
+
+
+def test_etag_is_weak_and_follows_updated_at():
+    etag = user_etag(_user())
+
+    assert etag.startswith('W/"5-')
+    assert user_etag(_user(updated_at=UPDATED_AT + timedelta(microseconds=1))) != etag
+
+
+def test_etag_matches_weak_comparison():
+    etag = 'W/"5-abc"'
+
+    assert etag_matches('W/"5-abc"', etag)
+    assert etag_matches('"5-abc"', etag)
+    assert etag_matches('W/"1-x", W/"5-abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"5-abd"', etag)
+    assert not etag_matches(None, etag)
+
+
+@pytest.mark.asyncio
+async def test_me_returns_etag_then_304(client, current_user, user_etag_cache):
+    first = await client.get("/api/users/me")
+    etag = first.headers["ETag"]
+
+    second = await client.get("/api/users/me", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+    assert await user_etag_cache.get(current_user.id) == etag
+
+
+@pytest.mark.asyncio
+async def test_me_changed_user_gets_full_response(client, current_user, user_etag_cache):
+    etag = (await client.get("/api/users/me")).headers["ETag"]
+    current_user.updated_at += timedelta(seconds=1)
+
+    response = await client.get("/api/users/me", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_me_cached_etag_skips_user_lookup(
+    auth_app, client, user_etag_cache, monkeypatch
+):
+    """Совпавший ETag из кэша — 304 без current_active_user и без БД."""
+    monkeypatch.setattr(token_denylist, "is_revoked", AsyncMock(return_value=False))
+    user = _user()
+    token = await get_strategy(request=None, session=None).write_token(user)
+    etag = user_etag(user)
+    await user_etag_cache.put(user.id, etag)
+
+    def no_user_lookup():
+        raise AssertionError("пользователь не должен загружаться")
+
+    auth_app.dependency_overrides[current_active_user] = no_user_lookup
+    client.cookies.set("access_token", token)
+    try:
+        response = await client.get("/api/users/me", headers={"If-None-Match": etag})
+    finally:
+        client.cookies.clear()
+        auth_app.dependency_overrides.pop(current_active_user, None)
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_id_with_etag(client, superuser, mock_user_db, user_etag_cache):
+    mock_user_db.users[7] = _user(id=7)
+
+    first = await client.get("/api/users/7")
+    second = await client.get(
+        "/api/users/7", headers={"If-None-Match": first.headers["ETag"]}
+    )
+
+    assert first.status_code == 200
+    assert first.json()["id"] == 7
+    assert second.status_code == 304
+    # Второй ответ — из кэша ETag, без загрузки пользователя
+    assert mock_user_db.get_calls == [7]
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_id_not_found(client, superuser, user_etag_cache):
+    assert (await client.get("/api/users/404")).status_code == 404
+    assert (await client.get("/api/users/abc")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_discard_cached_etag(mock_user_db, user_etag_cache):
+    manager = UserManager(mock_user_db, password_helper)
+    user = _user()
+
+    await user_etag_cache.put(user.id, user_etag(user))
+    await manager.on_after_update(user, {"email": "new@example.com"})
+    assert await user_etag_cache.get(user.id) is None
+
+    await user_etag_cache.put(user.id, user_etag(user))
+    await manager.on_after_delete(user)
+    assert await user_etag_cache.get(user.id) is None
+
+
+@pytest.mark.asyncio
+async def test_me_checks_token_once_and_skips_unchanged_etag_write(
+    client, mock_user_db, user_etag_cache, monkeypatch
+):
+    """Без совпадения /me не проверяет токен дважды и не перезаписывает кэш."""
+    is_revoked = AsyncMock(return_value=False)
+    monkeypatch.setattr(token_denylist, "is_revoked", is_revoked)
+    user = _user()
+    mock_user_db.users[user.id] = user
+    token = await get_strategy(request=None, session=None).write_token(user)
+    await user_etag_cache.put(user.id, user_etag(user))
+    put = AsyncMock()
+    monkeypatch.setattr(user_etag_cache, "put", put)
+
+    client.cookies.set("access_token", token)
+    try:
+        response = await client.get("/api/users/me", headers={"If-None-Match": 'W/"old"'})
+    finally:
+        client.cookies.clear()
+
+    assert response.status_code == 200
+    assert is_revoked.await_count == 1
+    put.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_inactive_user_etag_is_not_cached(
+    client, superuser, mock_user_db, user_etag_cache
+):
+    """Иначе /me отвечал бы 304 деактивированному пользователю по кэшу."""
+    mock_user_db.users[7] = _user(id=7)
+    mock_user_db.users[7].is_active = False
+
+    response = await client.get("/api/users/7")
+
+    assert response.status_code == 200
+    assert await user_etag_cache.get(7) is None
+
+
+
+def _get_routes(app, path):
+    return [
+        route
+        for route in app.routes
+        if getattr(route, "path", None) == path and "GET" in route.methods
+    ]
+
+
+def test_openapi_documents_etag_handler_for_user_by_id():
+    from fastapi import FastAPI
+
+    from main import app
+
+    (route,) = _get_routes(app, "/api/users/{id}")
+    schema = FastAPI.openapi(app)
+
+    assert route.name == "users:user"
+    assert "304" in schema["paths"]["/api/users/{id}"]["get"]["responses"]
+    assert {"patch", "delete"} <= set(schema["paths"]["/api/users/{id}"])
+
+
+def test_openapi_documents_etag_handler_for_me():
+    from fastapi import FastAPI
+
+    from main import app
+
+    (route,) = _get_routes(app, "/api/users/me")
+    schema = FastAPI.openapi(app)
+
+    assert route.name == "users:me"
+    assert "304" in schema["paths"]["/api/users/me"]["get"]["responses"]
+    assert "patch" in schema["paths"]["/api/users/me"]